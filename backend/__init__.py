@@ -1,30 +1,71 @@
-from flask import Flask, Blueprint, jsonify
+from flask import Flask, Blueprint, jsonify, Response
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
-from flask_cors import CORS
+from .config import obter_url_banco, obter_opcoes_engine, obter_binds, obter_config_instrumentacao, obter_config_saude, obter_config_tarefas, obter_config_login, obter_config_logs_acesso, obter_config_historico, obter_config_jwt
+from .utils.metricas_pool import registrar_metricas_pool, estatisticas_pool
+from .utils.replica import SessaoRoteada
+from .utils.instrumentacao import registrar_instrumentacao
+from .utils.metricas import registrar_metricas, gerar_metricas
+from .utils.saude import verificar_prontidao
+from .utils.tokens import registrar_jwt
+from .blueprints import registrar_blueprints
+from .cli import registrar_comandos
+from prometheus_client import CONTENT_TYPE_LATEST
 import os
 
 # Inicializar extensões
-db = SQLAlchemy()
-login_manager = LoginManager()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 def create_app(config=None):
     app = Flask(__name__)
     
     # Configuração do banco de dados
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///sistema_nutricao.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = obter_url_banco()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = obter_opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_BINDS'] = obter_binds()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'chave-secreta-temporaria')
+    app.config.update(obter_config_instrumentacao())
+    app.config.update(obter_config_saude())
+    app.config.update(obter_config_tarefas())
+    app.config.update(obter_config_login())
+    app.config.update(obter_config_logs_acesso())
+    app.config.update(obter_config_historico())
+    app.config.update(obter_config_jwt())
     
     # Aplicar configurações adicionais
     if config:
         app.config.update(config)
+        
+        # Recalcular as opções de pool quando a URL do banco for sobrescrita
+        if 'SQLALCHEMY_DATABASE_URI' in config and 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = obter_opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
     
     # Inicializar extensões com o app
     db.init_app(app)
-    login_manager.init_app(app)
+    
+    # Autenticação por token (JWT), sem sessão no servidor
+    registrar_jwt(app)
+    
+    # Importado aqui para não pesar no tempo de importação do pacote
+    from flask_cors import CORS
     CORS(app)
     
+    # Contadores de checkout/overflow do pool de conexões
+    with app.app_context():
+        registrar_metricas_pool(db)
+    
+    # Tempo por requisição e por SQL (Server-Timing + log estruturado)
+    registrar_instrumentacao(app)
+    
+    # Métricas de latência, SQL, cache e negócio no formato do Prometheus
+    registrar_metricas(app, db)
+    
+    # Blueprints da API (importados aqui, não ao importar o pacote)
+    registrar_blueprints(app)
+    
+    # Comandos de linha de comando (init-db)
+    registrar_comandos(app)
+    
     # Rota principal para verificar se o sistema está funcionando
     @app.route('/', methods=['GET'])
     def index():
@@ -34,6 +75,27 @@ def create_app(config=None):
             "versao": "1.0.0"
         })
     
+    # O processo está de pé (não consulta dependências)
+    @app.route('/health/live', methods=['GET'])
+    def health_live():
+        return jsonify({"status": "ok"}), 200
+    
+    # O processo consegue atender: banco, pool, migração e cache
+    @app.route('/health/ready', methods=['GET'])
+    def health_ready():
+        resultado = verificar_prontidao(app, db)
+        return jsonify(resultado), 200 if resultado['status'] == 'pronto' else 503
+    
+    # Métricas no formato do Prometheus (agregadas entre os workers)
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(gerar_metricas(), content_type=CONTENT_TYPE_LATEST)
+    
+    # Estado do pool de conexões para ajuste de concorrência
+    @app.route('/metrics/pool', methods=['GET'])
+    def metrics_pool():
+        return jsonify({"pool": estatisticas_pool(db)})
+    
     # Rota de teste para módulos
     @app.route('/api/teste', methods=['GET'])
     def teste():
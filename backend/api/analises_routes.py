@@ -0,0 +1,83 @@
+from flask import Blueprint, request, jsonify
+from marshmallow import ValidationError
+from ..models.fechamento_models import db
+from ..services.analises_service import (
+    criar_analise, atualizar_analise, recalcular_analise, buscar_analise, listar_analises, consultar_analises, excluir_analise
+)
+from ..utils.exportacao import resposta_exportacao
+
+# Blueprint
+analise_bp = Blueprint('analise', __name__, url_prefix='/api/analise')
+
+# Rotas para Análises Comparativas
+@analise_bp.route('', methods=['GET'])
+def get_analises():
+    try:
+        filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_analises(filtros), formato, 'analises')
+        analises = listar_analises(filtros)
+        return jsonify([analise.to_dict() for analise in analises]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@analise_bp.route('', methods=['POST'])
+def post_analise():
+    try:
+        data = request.json
+        analise = criar_analise(data)
+        return jsonify(analise.to_dict()), 201
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@analise_bp.route('/<int:analise_id>', methods=['GET'])
+def get_analise(analise_id):
+    try:
+        analise = buscar_analise(analise_id)
+        if not analise:
+            return jsonify({"error": "Análise não encontrada"}), 404
+        return jsonify(analise.to_dict()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@analise_bp.route('/<int:analise_id>', methods=['PUT'])
+def put_analise(analise_id):
+    try:
+        data = request.json
+        analise = atualizar_analise(analise_id, data)
+        if not analise:
+            return jsonify({"error": "Análise não encontrada"}), 404
+        return jsonify(analise.to_dict()), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@analise_bp.route('/<int:analise_id>/recalcular', methods=['POST'])
+def post_recalcular_analise(analise_id):
+    try:
+        analise = recalcular_analise(analise_id)
+        if not analise:
+            return jsonify({"error": "Análise não encontrada"}), 404
+        return jsonify(analise.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@analise_bp.route('/<int:analise_id>', methods=['DELETE'])
+def delete_analise(analise_id):
+    try:
+        resultado = excluir_analise(analise_id)
+        if not resultado:
+            return jsonify({"error": "Análise não encontrada"}), 404
+        return jsonify({"message": "Análise excluída com sucesso"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
@@ -1,12 +1,14 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_login import login_user, logout_user, login_required, current_user
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from marshmallow import ValidationError
 from ..models.auth_models import db, Usuario, LogAcesso
 from ..services.auth_service import (
     criar_usuario, atualizar_usuario, buscar_usuario, listar_usuarios, 
-    ativar_desativar_usuario, autenticar_usuario, registrar_log_acesso
+    ativar_desativar_usuario, autenticar_usuario, registrar_log_acesso, tempo_bloqueio_login
 )
-import datetime
+from ..services.tokens_service import emitir_tokens, renovar_token_acesso, revogar_tokens
+from ..utils.senhas import gerar_hash_senha, verificar_senha
+from ..utils.tokens import usuario_do_token
 
 # Blueprint
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -23,35 +25,52 @@ def login():
         email = data['email']
         senha = data['senha']
         
+        # Muitas falhas recentes: recusa antes de consultar o banco ou calcular o hash
+        espera = tempo_bloqueio_login(email, request.remote_addr)
+        if espera:
+            resposta = jsonify({"error": "Muitas tentativas de login. Tente novamente mais tarde."})
+            resposta.headers['Retry-After'] = str(espera)
+            return resposta, 429
+        
         usuario, mensagem = autenticar_usuario(email, senha, request.remote_addr)
         
         if not usuario:
             return jsonify({"error": mensagem}), 401
         
-        # Login do usuário
-        login_user(usuario)
-        
-        # Atualizar último acesso
-        usuario.ultimo_acesso = datetime.datetime.utcnow()
-        db.session.commit()
-        
+        # Tokens de acesso e de renovação (enviar como "Authorization: Bearer <token>")
         return jsonify({
             "message": "Login realizado com sucesso",
-            "usuario": usuario.to_dict()
+            "usuario": usuario.to_dict(),
+            **emitir_tokens(usuario)
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    try:
+        access_token = renovar_token_acesso(int(get_jwt_identity()))
+        
+        if not access_token:
+            return jsonify({"error": "Usuário não encontrado ou inativo"}), 401
+        
+        return jsonify({"access_token": access_token}), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @auth_bp.route('/logout', methods=['POST'])
-@login_required
+@jwt_required()
 def logout():
     try:
-        # Registrar log de logout
-        registrar_log_acesso(current_user.id, 'logout', request.remote_addr)
+        # Revogar o token de acesso e, se enviado, o de renovação
+        data = request.get_json(silent=True) or {}
+        revogar_tokens(get_jwt(), data.get('refresh_token'))
         
-        # Logout do usuário
-        logout_user()
+        # Registrar log de logout
+        registrar_log_acesso(usuario_do_token().id, 'logout', request.remote_addr)
         
         return jsonify({"message": "Logout realizado com sucesso"}), 200
         
@@ -59,16 +78,21 @@ def logout():
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/perfil', methods=['GET'])
-@login_required
+@jwt_required()
 def get_perfil():
     try:
-        return jsonify(current_user.to_dict()), 200
+        usuario = buscar_usuario(usuario_do_token().id)
+        
+        if not usuario:
+            return jsonify({"error": "Usuário não encontrado"}), 404
+            
+        return jsonify(usuario.to_dict()), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/perfil', methods=['PUT'])
-@login_required
+@jwt_required()
 def update_perfil():
     try:
         data = request.json
@@ -77,7 +101,7 @@ def update_perfil():
         if 'nivel_acesso' in data:
             del data['nivel_acesso']
         
-        usuario = atualizar_usuario(current_user.id, data)
+        usuario = atualizar_usuario(usuario_do_token().id, data)
         
         return jsonify(usuario.to_dict()), 200
         
@@ -89,11 +113,11 @@ def update_perfil():
 
 # Rotas para Gerenciamento de Usuários (apenas admin)
 @auth_bp.route('/usuarios', methods=['GET'])
-@login_required
+@jwt_required()
 def get_usuarios():
     try:
         # Verificar se o usuário é admin
-        if current_user.nivel_acesso != 'admin':
+        if usuario_do_token().nivel_acesso != 'admin':
             return jsonify({"error": "Acesso não autorizado"}), 403
         
         filtros = request.args.to_dict()
@@ -105,11 +129,11 @@ def get_usuarios():
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/usuarios', methods=['POST'])
-@login_required
+@jwt_required()
 def post_usuario():
     try:
         # Verificar se o usuário é admin
-        if current_user.nivel_acesso != 'admin':
+        if usuario_do_token().nivel_acesso != 'admin':
             return jsonify({"error": "Acesso não autorizado"}), 403
         
         data = request.json
@@ -124,11 +148,11 @@ def post_usuario():
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/usuarios/<int:usuario_id>', methods=['GET'])
-@login_required
+@jwt_required()
 def get_usuario(usuario_id):
     try:
         # Verificar se o usuário é admin ou é o próprio usuário
-        if current_user.nivel_acesso != 'admin' and current_user.id != usuario_id:
+        if usuario_do_token().nivel_acesso != 'admin' and usuario_do_token().id != usuario_id:
             return jsonify({"error": "Acesso não autorizado"}), 403
         
         usuario = buscar_usuario(usuario_id)
@@ -142,17 +166,17 @@ def get_usuario(usuario_id):
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/usuarios/<int:usuario_id>', methods=['PUT'])
-@login_required
+@jwt_required()
 def put_usuario(usuario_id):
     try:
         # Verificar se o usuário é admin ou é o próprio usuário
-        if current_user.nivel_acesso != 'admin' and current_user.id != usuario_id:
+        if usuario_do_token().nivel_acesso != 'admin' and usuario_do_token().id != usuario_id:
             return jsonify({"error": "Acesso não autorizado"}), 403
         
         data = request.json
         
         # Se não for admin e estiver tentando alterar o nível de acesso
-        if current_user.nivel_acesso != 'admin' and 'nivel_acesso' in data:
+        if usuario_do_token().nivel_acesso != 'admin' and 'nivel_acesso' in data:
             del data['nivel_acesso']
         
         usuario = atualizar_usuario(usuario_id, data)
@@ -169,11 +193,11 @@ def put_usuario(usuario_id):
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/usuarios/<int:usuario_id>/ativar', methods=['POST'])
-@login_required
+@jwt_required()
 def post_ativar_usuario(usuario_id):
     try:
         # Verificar se o usuário é admin
-        if current_user.nivel_acesso != 'admin':
+        if usuario_do_token().nivel_acesso != 'admin':
             return jsonify({"error": "Acesso não autorizado"}), 403
         
         usuario = ativar_desativar_usuario(usuario_id, True)
@@ -188,15 +212,15 @@ def post_ativar_usuario(usuario_id):
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/usuarios/<int:usuario_id>/desativar', methods=['POST'])
-@login_required
+@jwt_required()
 def post_desativar_usuario(usuario_id):
     try:
         # Verificar se o usuário é admin
-        if current_user.nivel_acesso != 'admin':
+        if usuario_do_token().nivel_acesso != 'admin':
             return jsonify({"error": "Acesso não autorizado"}), 403
         
         # Não permitir desativar o próprio usuário
-        if current_user.id == usuario_id:
+        if usuario_do_token().id == usuario_id:
             return jsonify({"error": "Não é possível desativar o próprio usuário"}), 400
         
         usuario = ativar_desativar_usuario(usuario_id, False)
@@ -212,7 +236,7 @@ def post_desativar_usuario(usuario_id):
 
 # Rota para alterar senha
 @auth_bp.route('/alterar-senha', methods=['POST'])
-@login_required
+@jwt_required()
 def post_alterar_senha():
     try:
         data = request.json
@@ -223,12 +247,17 @@ def post_alterar_senha():
         senha_atual = data['senha_atual']
         nova_senha = data['nova_senha']
         
+        usuario = Usuario.query.get(usuario_do_token().id)
+        if not usuario:
+            return jsonify({"error": "Usuário não encontrado"}), 404
+        
         # Verificar senha atual
-        if not current_user.verificar_senha(senha_atual):
+        correta, _ = verificar_senha(usuario.senha_hash, senha_atual)
+        if not correta:
             return jsonify({"error": "Senha atual incorreta"}), 400
         
         # Alterar senha
-        current_user.set_senha(nova_senha)
+        usuario.senha_hash = gerar_hash_senha(nova_senha)
         db.session.commit()
         
         return jsonify({"message": "Senha alterada com sucesso"}), 200
@@ -0,0 +1,20 @@
+from flask import Blueprint, request, jsonify
+from ..services.busca_service import buscar, LIMITE_PADRAO
+
+# Blueprint
+busca_bp = Blueprint('busca', __name__, url_prefix='/api/search')
+
+# Rota de busca (autocomplete) de insumos e fornecedores
+@busca_bp.route('', methods=['GET'])
+def get_busca():
+    try:
+        termo = request.args.get('q', '')
+        tipos = request.args.get('tipos')
+        limite = request.args.get('limite', LIMITE_PADRAO, type=int)
+
+        resultados = buscar(termo, tipos.split(',') if tipos else None, limite)
+        return jsonify(resultados), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -2,10 +2,11 @@ from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
 from ..models.contratos_models import db, Contrato, ItemContrato, Cotacao, PlanejamentoCompra
 from ..services.contratos_service import (
-    criar_contrato, atualizar_contrato, buscar_contrato, listar_contratos, excluir_contrato,
-    criar_cotacao, atualizar_cotacao, buscar_cotacao, listar_cotacoes, excluir_cotacao,
-    criar_planejamento, atualizar_planejamento, buscar_planejamento, listar_planejamentos, excluir_planejamento
+    criar_contrato, atualizar_contrato, buscar_contrato, listar_contratos, consultar_contratos, excluir_contrato,
+    criar_cotacao, atualizar_cotacao, buscar_cotacao, listar_cotacoes, consultar_cotacoes, excluir_cotacao,
+    criar_planejamento, atualizar_planejamento, buscar_planejamento, listar_planejamentos, consultar_planejamentos, excluir_planejamento
 )
+from ..utils.exportacao import resposta_exportacao
 
 # Blueprints
 contratos_bp = Blueprint('contratos', __name__, url_prefix='/api/contratos')
@@ -17,8 +18,13 @@ planejamento_bp = Blueprint('planejamento', __name__, url_prefix='/api/planejame
 def get_contratos():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_contratos(filtros), formato, 'contratos')
         contratos = listar_contratos(filtros)
         return jsonify([contrato.to_dict() for contrato in contratos]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -90,8 +96,13 @@ def get_cronograma():
 def get_cotacoes():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_cotacoes(filtros), formato, 'cotacoes')
         cotacoes = listar_cotacoes(filtros)
         return jsonify([cotacao.to_dict() for cotacao in cotacoes]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -164,8 +175,13 @@ def get_evolucao_precos():
 def get_planejamentos():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_planejamentos(filtros), formato, 'planejamentos')
         planejamentos = listar_planejamentos(filtros)
         return jsonify([planejamento.to_dict() for planejamento in planejamentos]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2,10 +2,11 @@ from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
 from ..models.controle_mensal_models import db, RegistroMensal, EntregaMensal, ProgramacaoFutura
 from ..services.controle_mensal_service import (
-    criar_registro_mensal, atualizar_registro_mensal, buscar_registro_mensal, listar_registros_mensais, excluir_registro_mensal,
-    criar_entrega_mensal, atualizar_entrega_mensal, buscar_entrega_mensal, listar_entregas_mensais, excluir_entrega_mensal,
-    criar_programacao_futura, atualizar_programacao_futura, buscar_programacao_futura, listar_programacoes_futuras, excluir_programacao_futura
+    criar_registro_mensal, atualizar_registro_mensal, buscar_registro_mensal, listar_registros_mensais, consultar_registros_mensais, excluir_registro_mensal,
+    criar_entrega_mensal, registrar_entregas_em_lote, atualizar_entrega_mensal, buscar_entrega_mensal, listar_entregas_mensais, iterar_entregas_mensais, excluir_entrega_mensal,
+    criar_programacao_futura, atualizar_programacao_futura, buscar_programacao_futura, listar_programacoes_futuras, consultar_programacoes_futuras, excluir_programacao_futura
 )
+from ..utils.exportacao import resposta_exportacao
 
 # Blueprints
 controle_mensal_bp = Blueprint('controle_mensal', __name__, url_prefix='/api/controle-mensal')
@@ -16,8 +17,13 @@ programacao_bp = Blueprint('programacao', __name__, url_prefix='/api/programacao
 def get_registros_mensais():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_registros_mensais(filtros), formato, 'registros_mensais')
         registros = listar_registros_mensais(filtros)
         return jsonify([registro.to_dict() for registro in registros]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -72,8 +78,13 @@ def delete_registro_mensal(registro_id):
 @controle_mensal_bp.route('/registros/<int:registro_id>/entregas', methods=['GET'])
 def get_entregas_mensais(registro_id):
     try:
+        formato = request.args.get('format')
+        if formato:
+            return resposta_exportacao(iterar_entregas_mensais(registro_id), formato, 'entregas_mensais')
         entregas = listar_entregas_mensais(registro_id)
         return jsonify([entrega.to_dict() for entrega in entregas]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -90,6 +101,26 @@ def post_entrega_mensal(registro_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# Várias entregas em uma transação; reenvios com a mesma chave_idempotencia não duplicam
+@controle_mensal_bp.route('/entregas/lote', methods=['POST'])
+def post_entregas_lote():
+    try:
+        data = request.json
+        entregas = data.get('entregas') if isinstance(data, dict) else data
+        resultados = registrar_entregas_em_lote(entregas)
+        criadas = sum(1 for resultado in resultados if resultado['status'] == 'criada')
+        resposta = {
+            "entregas": resultados,
+            "criadas": criadas,
+            "duplicadas": len(resultados) - criadas
+        }
+        return jsonify(resposta), 201 if criadas else 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @controle_mensal_bp.route('/entregas/<int:entrega_id>', methods=['GET'])
 def get_entrega_mensal(entrega_id):
     try:
@@ -146,8 +177,13 @@ def get_evolucao_estoque():
 def get_programacoes_futuras():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_programacoes_futuras(filtros), formato, 'programacoes_futuras')
         programacoes = listar_programacoes_futuras(filtros)
         return jsonify([programacao.to_dict() for programacao in programacoes]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1,24 +1,28 @@
 from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
-from ..models.fechamento_models import db, CustoMedio, FechamentoMensal, DetalhesFechamento, AnaliseComparativa
+from ..models.fechamento_models import db
 from ..services.fechamento_service import (
-    calcular_custo_medio, buscar_custo_medio, listar_custos_medios,
-    criar_fechamento, buscar_fechamento, listar_fechamentos, fechar_fechamento, reabrir_fechamento,
-    criar_analise, atualizar_analise, buscar_analise, listar_analises, excluir_analise,
-    gerar_relatorio_custo_medio, gerar_relatorio_tendencia_precos
+    calcular_custo_medio, buscar_custo_medio, listar_custos_medios, consultar_custos_medios,
+    criar_fechamento, buscar_fechamento, listar_fechamentos, consultar_fechamentos, fechar_fechamento, reabrir_fechamento
 )
+from ..services.resumos_service import listar_resumos_mensais, consultar_resumos_mensais
+from ..utils.exportacao import resposta_exportacao, resposta_exportacao_linhas
 
-# Blueprints
+# Blueprint
 fechamento_bp = Blueprint('fechamento', __name__, url_prefix='/api/fechamento')
-analise_bp = Blueprint('analise', __name__, url_prefix='/api/analise')
 
 # Rotas para Custos Médios
 @fechamento_bp.route('/custo-medio', methods=['GET'])
 def get_custos_medios():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_custos_medios(filtros), formato, 'custos_medios')
         custos = listar_custos_medios(filtros)
         return jsonify([custo.to_dict() for custo in custos]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -49,8 +53,13 @@ def get_custo_medio(custo_medio_id):
 def get_fechamentos():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_fechamentos(filtros), formato, 'fechamentos')
         fechamentos = listar_fechamentos(filtros)
         return jsonify([fechamento.to_dict() for fechamento in fechamentos]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -102,9 +111,25 @@ def post_reabrir_fechamento(fechamento_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-# Rotas para Relatórios
+# Totais mensais por insumo, fornecedor e contrato (para painéis)
+@fechamento_bp.route('/resumos', methods=['GET'])
+def get_resumos_mensais():
+    try:
+        filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            return resposta_exportacao(consultar_resumos_mensais(filtros), formato, 'resumos_mensais')
+        resumos = listar_resumos_mensais(filtros)
+        return jsonify([resumo.to_dict() for resumo in resumos]), 200
+    except (ValidationError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Rotas para Relatórios (o serviço de relatórios é importado no primeiro uso)
 @fechamento_bp.route('/relatorio/custo-medio', methods=['GET'])
 def get_relatorio_custo_medio():
+    from ..services.relatorios_service import gerar_relatorio_custo_medio
     try:
         filtros = request.args.to_dict()
         relatorio = gerar_relatorio_custo_medio(filtros)
@@ -114,66 +139,16 @@ def get_relatorio_custo_medio():
 
 @fechamento_bp.route('/relatorio/tendencia-precos', methods=['GET'])
 def get_relatorio_tendencia_precos():
+    from ..services.relatorios_service import gerar_relatorio_tendencia_precos, linhas_relatorio_tendencia_precos
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            # Só as linhas (uma por entrega), em fluxo
+            return resposta_exportacao_linhas(linhas_relatorio_tendencia_precos(filtros), formato, 'tendencia_precos')
         relatorio = gerar_relatorio_tendencia_precos(filtros)
         return jsonify(relatorio), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-# Rotas para Análises Comparativas
-@analise_bp.route('', methods=['GET'])
-def get_analises():
-    try:
-        filtros = request.args.to_dict()
-        analises = listar_analises(filtros)
-        return jsonify([analise.to_dict() for analise in analises]), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@analise_bp.route('', methods=['POST'])
-def post_analise():
-    try:
-        data = request.json
-        analise = criar_analise(data)
-        return jsonify(analise.to_dict()), 201
-    except ValidationError as e:
+    except (ValidationError, ValueError) as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 500
-
-@analise_bp.route('/<int:analise_id>', methods=['GET'])
-def get_analise(analise_id):
-    try:
-        analise = buscar_analise(analise_id)
-        if not analise:
-            return jsonify({"error": "Análise não encontrada"}), 404
-        return jsonify(analise.to_dict()), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@analise_bp.route('/<int:analise_id>', methods=['PUT'])
-def put_analise(analise_id):
-    try:
-        data = request.json
-        analise = atualizar_analise(analise_id, data)
-        if not analise:
-            return jsonify({"error": "Análise não encontrada"}), 404
-        return jsonify(analise.to_dict()), 200
-    except ValidationError as e:
-        return jsonify({"error": str(e)}), 400
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 500
-
-@analise_bp.route('/<int:analise_id>', methods=['DELETE'])
-def delete_analise(analise_id):
-    try:
-        resultado = excluir_analise(analise_id)
-        if not resultado:
-            return jsonify({"error": "Análise não encontrada"}), 404
-        return jsonify({"message": "Análise excluída com sucesso"}), 200
-    except Exception as e:
-        db.session.rollback()
         return jsonify({"error": str(e)}), 500
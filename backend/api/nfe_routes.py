@@ -2,23 +2,38 @@ from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
 from ..models.nfe_models import db, Fornecedor, Insumo, NotaFiscal, ItemNotaFiscal
 from ..services.nfe_service import (
-    criar_fornecedor, atualizar_fornecedor, buscar_fornecedor, listar_fornecedores, excluir_fornecedor,
-    criar_insumo, atualizar_insumo, buscar_insumo, listar_insumos, excluir_insumo,
-    criar_nota_fiscal, atualizar_nota_fiscal, buscar_nota_fiscal, listar_notas_fiscais, excluir_nota_fiscal
+    criar_fornecedor, atualizar_fornecedor, buscar_fornecedor, listar_fornecedores, consultar_fornecedores, excluir_fornecedor,
+    criar_insumo, atualizar_insumo, buscar_insumo, listar_insumos, consultar_insumos, excluir_insumo,
+    criar_nota_fiscal, atualizar_nota_fiscal, buscar_nota_fiscal, listar_notas_fiscais, iterar_notas_fiscais, excluir_nota_fiscal
 )
+from ..services.estoque_service import consultar_estoque_em
+import io
 
-# Blueprints
+# Blueprints (a importação de CSV e a exportação são importadas no primeiro uso)
 fornecedor_bp = Blueprint('fornecedor', __name__, url_prefix='/api/fornecedores')
 insumo_bp = Blueprint('insumo', __name__, url_prefix='/api/insumos')
 nfe_bp = Blueprint('nfe', __name__, url_prefix='/api/nfe')
 
+def _arquivo_csv():
+    # Arquivo enviado como multipart ("arquivo") ou o próprio corpo da requisição (text/csv),
+    # lido em fluxo sem carregar tudo na memória
+    arquivo = request.files.get('arquivo')
+    fluxo = arquivo.stream if arquivo else request.stream
+    return io.TextIOWrapper(fluxo, encoding='utf-8-sig', newline='')
+
 # Rotas para Fornecedores
 @fornecedor_bp.route('', methods=['GET'])
 def get_fornecedores():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            from ..utils.exportacao import resposta_exportacao
+            return resposta_exportacao(consultar_fornecedores(filtros), formato, 'fornecedores')
         fornecedores = listar_fornecedores(filtros)
         return jsonify([fornecedor.to_dict() for fornecedor in fornecedores]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -34,6 +49,19 @@ def post_fornecedor():
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# Importação em massa (CSV): cria ou atualiza pelo CNPJ
+@fornecedor_bp.route('/importar', methods=['POST'])
+def importar_fornecedores():
+    from ..services.importacao_service import importar_csv
+    try:
+        resultado = importar_csv('fornecedores', _arquivo_csv())
+        return jsonify(resultado), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @fornecedor_bp.route('/<int:fornecedor_id>', methods=['GET'])
 def get_fornecedor(fornecedor_id):
     try:
@@ -74,8 +102,14 @@ def delete_fornecedor(fornecedor_id):
 def get_insumos():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            from ..utils.exportacao import resposta_exportacao
+            return resposta_exportacao(consultar_insumos(filtros), formato, 'insumos')
         insumos = listar_insumos(filtros)
         return jsonify([insumo.to_dict() for insumo in insumos]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -91,6 +125,30 @@ def post_insumo():
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# Importação em massa (CSV): cria ou atualiza pelo código
+@insumo_bp.route('/importar', methods=['POST'])
+def importar_insumos():
+    from ..services.importacao_service import importar_csv
+    try:
+        resultado = importar_csv('insumos', _arquivo_csv())
+        return jsonify(resultado), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# Estoque de vários insumos em uma data (?data=AAAA-MM-DD&insumo_ids=1,2,3)
+@insumo_bp.route('/estoque', methods=['GET'])
+def get_estoque_insumos():
+    try:
+        resultado = consultar_estoque_em(request.args.to_dict())
+        return jsonify(resultado), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @insumo_bp.route('/<int:insumo_id>', methods=['GET'])
 def get_insumo(insumo_id):
     try:
@@ -131,8 +189,14 @@ def delete_insumo(insumo_id):
 def get_notas_fiscais():
     try:
         filtros = request.args.to_dict()
+        formato = filtros.pop('format', None)
+        if formato:
+            from ..utils.exportacao import resposta_exportacao
+            return resposta_exportacao(iterar_notas_fiscais(filtros), formato, 'notas_fiscais')
         notas_fiscais = listar_notas_fiscais(filtros)
         return jsonify([nf.to_dict() for nf in notas_fiscais]), 200
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
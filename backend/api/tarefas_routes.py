@@ -0,0 +1,37 @@
+from flask import Blueprint, request, jsonify, url_for
+from flask_jwt_extended import verify_jwt_in_request
+from marshmallow import ValidationError
+from ..models.tarefas_models import db
+from ..services.tarefas_service import criar_tarefa, buscar_tarefa
+from ..utils.tokens import usuario_do_token
+
+# Blueprint
+tarefas_bp = Blueprint('tarefas', __name__, url_prefix='/api/jobs')
+
+# Enfileira uma operação demorada (fechamento, relatórios, importação de NF-e)
+@tarefas_bp.route('', methods=['POST'])
+def post_tarefa():
+    # O token é opcional, como nas demais rotas de dados; se enviado, a tarefa fica com o usuário.
+    # Fora do try: token inválido ou expirado é respondido pelos handlers do JWT (401)
+    usuario_id = usuario_do_token().id if verify_jwt_in_request(optional=True) else None
+    try:
+        data = request.json
+        tarefa = criar_tarefa(data, usuario_id=usuario_id)
+        resposta = jsonify({"id": tarefa.id, "status": tarefa.status})
+        return resposta, 202, {"Location": url_for('tarefas.get_tarefa', tarefa_id=tarefa.id)}
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# Status, progresso e resultado de uma tarefa
+@tarefas_bp.route('/<int:tarefa_id>', methods=['GET'])
+def get_tarefa(tarefa_id):
+    try:
+        tarefa = buscar_tarefa(tarefa_id)
+        if not tarefa:
+            return jsonify({"error": "Tarefa não encontrada"}), 404
+        return jsonify(tarefa.to_dict()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
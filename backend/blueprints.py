@@ -0,0 +1,42 @@
+import importlib
+
+# Registro dos blueprints da API: (módulo, nome do blueprint).
+# Os módulos só são importados em registrar_blueprints, nunca ao importar o pacote.
+BLUEPRINTS = [
+    ('backend.api.auth_routes', 'auth_bp'),
+    ('backend.api.nfe_routes', 'fornecedor_bp'),
+    ('backend.api.nfe_routes', 'insumo_bp'),
+    ('backend.api.nfe_routes', 'nfe_bp'),
+    ('backend.api.busca_routes', 'busca_bp'),
+    ('backend.api.tarefas_routes', 'tarefas_bp'),
+    ('backend.api.contratos_routes', 'contratos_bp'),
+    ('backend.api.contratos_routes', 'cotacoes_bp'),
+    ('backend.api.contratos_routes', 'planejamento_bp'),
+    ('backend.api.controle_mensal_routes', 'controle_mensal_bp'),
+    ('backend.api.controle_mensal_routes', 'programacao_bp'),
+    ('backend.api.fechamento_routes', 'fechamento_bp'),
+    ('backend.api.analises_routes', 'analise_bp'),
+]
+
+
+def registrar_blueprints(app):
+    """Importa e registra todos os blueprints da API"""
+    registrados = []
+    falhas = set()
+
+    for modulo, nome in BLUEPRINTS:
+        if modulo in falhas:
+            continue
+
+        try:
+            blueprint = getattr(importlib.import_module(modulo), nome)
+        except (ImportError, AttributeError):
+            # Um módulo com problema não deve derrubar os demais
+            app.logger.exception("Não foi possível carregar os blueprints de %s", modulo)
+            falhas.add(modulo)
+            continue
+
+        app.register_blueprint(blueprint)
+        registrados.append(blueprint.name)
+
+    return registrados
@@ -0,0 +1,147 @@
+import click
+import importlib
+import logging
+import os
+
+# Módulos de modelos que precisam estar importados antes do create_all
+MODELOS = [
+    'backend.models.auth_models',
+    'backend.models.nfe_models',
+    'backend.models.contratos_models',
+    'backend.models.controle_mensal_models',
+    'backend.models.fechamento_models',
+    'backend.models.catalogo_models',
+    'backend.models.tarefas_models',
+    'backend.models.estoque_models',
+]
+
+
+def inicializar_banco():
+    """Cria as tabelas (e as colunas novas), o índice de busca e o usuário admin (executar a cada deploy)"""
+    from . import db
+    from .models.auth_models import Usuario
+    from .migracoes import aplicar_migracoes, converter_colunas_json
+    from .services.busca_service import preparar_busca, reindexar_busca
+    from .services.catalogo_service import criar_versoes_catalogo
+    from .services.estoque_service import abrir_razao_estoque
+
+    for modulo in MODELOS:
+        importlib.import_module(modulo)
+
+    # Criar todas as tabelas e incluir as colunas novas nas que já existiam
+    db.create_all()
+    for coluna in aplicar_migracoes(db):
+        print(f"Coluna {coluna} incluída.")
+    for coluna in converter_colunas_json(db):
+        print(f"Coluna {coluna} convertida para JSONB.")
+
+    # Verificar se já existe um usuário admin
+    admin = Usuario.query.filter_by(email='admin@sistema.com').first()
+    if not admin:
+        try:
+            admin = Usuario(
+                nome='Administrador',
+                email='admin@sistema.com',
+                nivel_acesso='admin',
+                ativo=True
+            )
+            admin.set_password(os.getenv('ADMIN_SENHA', 'admin123'))
+            db.session.add(admin)
+            db.session.commit()
+            print("Usuário admin criado com sucesso!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erro ao criar usuário admin: {e}")
+    else:
+        print("Usuário admin já existe!")
+
+    # Linhas de versão do catálogo em memória, incluídas aqui e não na primeira alteração
+    criar_versoes_catalogo()
+
+    # Criar e popular o índice de busca de insumos e fornecedores
+    try:
+        preparar_busca()
+        reindexar_busca()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro ao preparar o índice de busca: {e}")
+
+    # Estoque atual dos insumos cadastrados antes da razão de estoque
+    try:
+        abertas = abrir_razao_estoque()
+        if abertas:
+            print(f"Razão de estoque aberta para {abertas} insumos.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro ao abrir a razão de estoque: {e}")
+
+
+def registrar_comandos(app):
+    """Registra os comandos de linha de comando (flask --app backend.run ...)"""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Cria as tabelas, o índice de busca e o usuário admin"""
+        inicializar_banco()
+        click.echo("Banco de dados inicializado.")
+
+    @app.cli.command('worker')
+    @click.option('--threads', type=int, default=None, help='Tarefas em paralelo (padrão: TAREFAS_THREADS)')
+    @click.option('--intervalo', type=float, default=None, help='Espera com a fila vazia, em segundos')
+    def worker(threads, intervalo):
+        """Executa as tarefas em segundo plano da fila (POST /api/jobs)"""
+        from .worker import executar_worker
+
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+        executar_worker(app, threads, intervalo)
+
+    @app.cli.command('rebuild-resumos')
+    def rebuild_resumos():
+        """Recalcula os totais mensais de todos os meses (carga inicial)"""
+        from .services.resumos_service import reconstruir_resumos_mensais
+
+        meses = reconstruir_resumos_mensais()
+        click.echo(f"Totais mensais recalculados para {meses} meses.")
+
+    @app.cli.command('snapshot-estoque')
+    def snapshot_estoque():
+        """Grava snapshots do estoque dos insumos movimentados (executar periodicamente)"""
+        from .services.estoque_service import gerar_snapshots_estoque
+
+        snapshots = gerar_snapshots_estoque()
+        click.echo(f"{snapshots} snapshots de estoque gravados.")
+
+    @app.cli.command('rebuild-estoque')
+    def rebuild_estoque():
+        """Recalcula o estoque atual dos insumos a partir da razão de estoque"""
+        from .services.estoque_service import reconstruir_estoque_atual
+
+        corrigidos = reconstruir_estoque_atual()
+        click.echo(f"Estoque atual corrigido em {corrigidos} insumos.")
+
+    @app.cli.command('manter-historico')
+    @click.option('--arquivar/--sem-arquivar', default=True, help='Arquiva e remove os meses além da retenção')
+    def manter_historico_comando(arquivar):
+        """Cria as partições mensais das tabelas de histórico e arquiva os meses antigos"""
+        from .services.historico_service import manter_historico
+
+        for tabela, resultado in manter_historico(arquivar).items():
+            if resultado.get('particionada_agora'):
+                click.echo(f"{tabela}: convertida em tabela particionada por mês.")
+            for nome in resultado.get('rotacionadas', []):
+                click.echo(f"{tabela}: mês encerrado movido para {nome}.")
+            for arquivo in resultado['arquivadas']:
+                click.echo(f"{tabela}: arquivado em {arquivo}.")
+
+    @app.cli.command('import-csv')
+    @click.argument('tipo', type=click.Choice(['fornecedores', 'insumos']))
+    @click.argument('arquivo', type=click.File('r', encoding='utf-8-sig'))
+    def import_csv(tipo, arquivo):
+        """Cria ou atualiza fornecedores/insumos a partir de um arquivo CSV"""
+        from .services.importacao_service import importar_csv
+
+        resultado = importar_csv(tipo, arquivo)
+        click.echo(f"{resultado['criados']} criados, {resultado['atualizados']} atualizados, "
+                   f"{resultado['total_erros']} linhas com erro.")
+        for erro in resultado['erros']:
+            click.echo(f"  linha {erro['linha']}: {erro['erros']}")
@@ -0,0 +1,158 @@
+import os
+from datetime import timedelta
+from sqlalchemy.pool import NullPool
+
+
+def _env_int(nome, padrao=None):
+    valor = os.getenv(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def _env_bool(nome, padrao=False):
+    valor = os.getenv(nome)
+    if valor in (None, ''):
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'sim', 'yes', 'on')
+
+
+def _env_float(nome, padrao=None):
+    valor = os.getenv(nome)
+    return float(valor) if valor not in (None, '') else padrao
+
+
+def obter_config_instrumentacao():
+    """Configuração do perfilamento por amostragem (PROFILING_*)"""
+    return {
+        # Fração das requisições perfiladas (0 desativa, 1 perfila todas)
+        'PROFILING_AMOSTRAGEM': _env_float('PROFILING_AMOSTRAGEM', 0),
+        # Apenas requisições mais lentas que o limiar têm o perfil salvo
+        'PROFILING_LIMIAR_MS': _env_float('PROFILING_LIMIAR_MS', 500),
+        'PROFILING_DIR': os.getenv('PROFILING_DIR', 'perfis'),
+        # "cprofile" (padrão) ou "pyinstrument", se instalado
+        'PROFILING_FERRAMENTA': os.getenv('PROFILING_FERRAMENTA', 'cprofile'),
+    }
+
+
+def obter_config_saude():
+    """Configuração das verificações de /health/ready (HEALTH_*)"""
+    return {
+        # Tempo máximo aceitável para o "SELECT 1", em milissegundos
+        'HEALTH_ORCAMENTO_MS': _env_float('HEALTH_ORCAMENTO_MS', 500),
+        # Fração do pool em uso a partir da qual o worker se declara indisponível
+        'HEALTH_LIMITE_POOL': _env_float('HEALTH_LIMITE_POOL', 0.9),
+        # Por quanto tempo o resultado da verificação é reaproveitado
+        'HEALTH_CACHE_SEGUNDOS': _env_float('HEALTH_CACHE_SEGUNDOS', 5),
+    }
+
+
+def obter_config_tarefas():
+    """Configuração da fila de tarefas em segundo plano (TAREFAS_*)"""
+    return {
+        # Tarefas executadas em paralelo por processo worker
+        'TAREFAS_THREADS': _env_int('TAREFAS_THREADS', 2),
+        # Intervalo entre consultas à fila quando não há tarefas pendentes, em segundos
+        'TAREFAS_INTERVALO': _env_float('TAREFAS_INTERVALO', 1.0),
+        # Intervalo entre os sinais de atividade do worker em cada tarefa em execução, em segundos
+        'TAREFAS_BATIMENTO': _env_float('TAREFAS_BATIMENTO', 30.0),
+        # Tarefas "executando" sem sinal de atividade há mais tempo que isso são consideradas abandonadas
+        'TAREFAS_TIMEOUT': _env_int('TAREFAS_TIMEOUT', 300),
+        'TAREFAS_MAX_TENTATIVAS': _env_int('TAREFAS_MAX_TENTATIVAS', 3),
+    }
+
+
+def obter_config_login():
+    """Configuração do hash de senhas e do limite de tentativas de login (SENHA_*, LOGIN_*)"""
+    return {
+        # Método do werkzeug com o fator de custo ("pbkdf2:sha256:600000", "scrypt:32768:8:1");
+        # hashes de outro método ou custo são refeitos no próximo login bem-sucedido
+        'SENHA_METODO': os.getenv('SENHA_METODO', 'pbkdf2:sha256:600000'),
+        # Falhas de login aceitas por email + IP dentro da janela, antes de responder 429
+        'LOGIN_MAX_FALHAS': _env_int('LOGIN_MAX_FALHAS', 5),
+        'LOGIN_JANELA_SEGUNDOS': _env_int('LOGIN_JANELA_SEGUNDOS', 300),
+    }
+
+
+def obter_config_jwt():
+    """Configuração dos tokens de acesso (JWT_*)"""
+    return {
+        # Sem JWT_SECRET_KEY, os tokens são assinados com a SECRET_KEY
+        'JWT_SECRET_KEY': os.getenv('JWT_SECRET_KEY'),
+        'JWT_TOKEN_LOCATION': ['headers'],
+        # Validade curta: o token de acesso não é conferido no banco a cada requisição
+        'JWT_ACCESS_TOKEN_EXPIRES': timedelta(minutes=_env_int('JWT_ACESSO_MINUTOS', 15)),
+        'JWT_REFRESH_TOKEN_EXPIRES': timedelta(days=_env_int('JWT_RENOVACAO_DIAS', 7)),
+        # Intervalo, em segundos, para cada processo recarregar a lista de tokens revogados
+        'JWT_REVOGACAO_INTERVALO': _env_float('JWT_REVOGACAO_INTERVALO', 30),
+    }
+
+
+def obter_config_logs_acesso():
+    """Configuração do gravador de logs de acesso em segundo plano (LOG_ACESSO_*)"""
+    return {
+        # Desligado, o log é gravado na transação da própria requisição
+        'LOG_ACESSO_ASSINCRONO': _env_bool('LOG_ACESSO_ASSINCRONO', True),
+        # Logs aguardando gravação por processo; com a fila cheia, a requisição grava o seu
+        'LOG_ACESSO_FILA': _env_int('LOG_ACESSO_FILA', 10000),
+        # Um lote é gravado ao juntar LOG_ACESSO_LOTE logs ou a cada LOG_ACESSO_INTERVALO segundos
+        'LOG_ACESSO_LOTE': _env_int('LOG_ACESSO_LOTE', 500),
+        'LOG_ACESSO_INTERVALO': _env_float('LOG_ACESSO_INTERVALO', 1.0),
+    }
+
+
+def obter_config_historico():
+    """Configuração da retenção das tabelas de histórico (HISTORICO_*, *_RETENCAO_MESES)"""
+    return {
+        # Diretório dos meses arquivados (<tabela>_AAAAMM.csv.gz); use um disco persistente
+        'HISTORICO_DIR': os.getenv('HISTORICO_DIR', 'arquivo_historico'),
+        # Meses de logs de acesso mantidos no banco, além do mês atual
+        'LOG_ACESSO_RETENCAO_MESES': _env_int('LOG_ACESSO_RETENCAO_MESES', 12),
+    }
+
+
+def obter_url_banco():
+    """Retorna a URL do banco a partir de DATABASE_URL"""
+    url = os.getenv('DATABASE_URL', 'sqlite:///sistema_nutricao.db')
+
+    # O Render fornece "postgres://", que o SQLAlchemy 2 não reconhece
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+
+    return url
+
+
+def obter_binds():
+    """Monta SQLALCHEMY_BINDS com a réplica de leitura, se DATABASE_REPLICA_URL estiver definida"""
+    url = os.getenv('DATABASE_REPLICA_URL')
+    if not url:
+        return {}
+
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+
+    return {'replica': {'url': url, **obter_opcoes_engine(url)}}
+
+
+def obter_opcoes_engine(url):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS a partir das variáveis de ambiente DB_*"""
+    if url.startswith('sqlite'):
+        return {}
+
+    if _env_bool('DB_NULLPOOL'):
+        # Modo compatível com PgBouncer: o pool fica no PgBouncer, não no processo
+        opcoes = {'poolclass': NullPool}
+    else:
+        opcoes = {
+            'pool_size': _env_int('DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        }
+
+    opcoes['pool_pre_ping'] = _env_bool('DB_POOL_PRE_PING', True)
+
+    # Tempo máximo de execução de cada comando, em milissegundos
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT')
+    if statement_timeout:
+        opcoes['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+
+    return opcoes
@@ -0,0 +1,125 @@
+from sqlalchemy import inspect
+from sqlalchemy.schema import AddConstraint, CreateColumn
+
+# Colunas incluídas em tabelas que já existiam: db.create_all cria as tabelas novas, mas
+# não altera as existentes. Cada coluna precisa aceitar NULL ou ter server_default, para
+# que as linhas já gravadas recebam um valor.
+COLUNAS_INCLUIDAS = [
+    ('insumos', 'estoque_atual'),
+    ('notas_fiscais', 'status'),
+    ('registros_mensais', 'insumo_id'),
+    ('registros_mensais', 'estoque_inicial'),
+    ('registros_mensais', 'quantidade_entregue'),
+    ('registros_mensais', 'quantidade_contratada'),
+    ('registros_mensais', 'quantidade_paga'),
+    ('registros_mensais', 'estoque_final'),
+    ('entregas_mensais', 'contrato_id'),
+    ('entregas_mensais', 'status_pagamento'),
+    ('fechamentos', 'quantidade_total'),
+    ('fechamentos', 'custo_medio_geral'),
+    ('movimentacoes_estoque', 'registrado_em'),
+]
+
+# Colunas que eram texto com JSON serializado e passaram a usar TipoJSON. No SQLite o JSON
+# já é gravado como texto e as linhas existentes são lidas sem conversão; no PostgreSQL a
+# coluna precisa virar JSONB, senão os valores voltam como string.
+COLUNAS_JSON = [
+    ('tarefas', 'parametros'),
+    ('tarefas', 'resultado'),
+]
+
+
+def aplicar_migracoes(db):
+    """Inclui nas tabelas existentes as colunas de COLUNAS_INCLUIDAS que ainda não estão no banco
+
+    Executar depois do db.create_all. Devolve as colunas incluídas ("tabela.coluna").
+    """
+    conexao = db.session.connection()
+    inspetor = inspect(conexao)
+    incluidas = []
+
+    for tabela, coluna in COLUNAS_INCLUIDAS:
+        if not inspetor.has_table(tabela):
+            continue
+        if coluna in {c['name'] for c in inspetor.get_columns(tabela)}:
+            continue
+
+        definicao = db.metadata.tables[tabela].c[coluna]
+        ddl = CreateColumn(definicao).compile(dialect=conexao.dialect)
+        conexao.exec_driver_sql(f"ALTER TABLE {tabela} ADD COLUMN {ddl}")
+
+        # O SQLite não inclui restrições em tabelas existentes; a chave estrangeira fica só no modelo
+        if conexao.dialect.name == 'postgresql':
+            for restricao in definicao.table.foreign_key_constraints:
+                if definicao in restricao.columns.values():
+                    conexao.execute(AddConstraint(restricao))
+
+        incluidas.append(f"{tabela}.{coluna}")
+
+    db.session.commit()
+
+    return incluidas
+
+
+def converter_colunas_json(db):
+    """Converte para JSONB as colunas de COLUNAS_JSON que ainda são texto (apenas no PostgreSQL)
+
+    Executar depois do db.create_all. Devolve as colunas convertidas ("tabela.coluna").
+    """
+    conexao = db.session.connection()
+    if conexao.dialect.name != 'postgresql':
+        return []
+
+    from sqlalchemy.dialects.postgresql import JSONB
+
+    inspetor = inspect(conexao)
+    convertidas = []
+
+    for tabela, coluna in COLUNAS_JSON:
+        if not inspetor.has_table(tabela):
+            continue
+        tipo = next(c['type'] for c in inspetor.get_columns(tabela) if c['name'] == coluna)
+        if isinstance(tipo, JSONB):
+            continue
+
+        conexao.exec_driver_sql(
+            f"ALTER TABLE {tabela} ALTER COLUMN {coluna} TYPE JSONB USING {coluna}::jsonb"
+        )
+        convertidas.append(f"{tabela}.{coluna}")
+
+    db.session.commit()
+
+    return convertidas
+
+
+def migracoes_pendentes(conexao):
+    """Colunas de COLUNAS_INCLUIDAS ausentes e de COLUNAS_JSON ainda não convertidas ("tabela.coluna")
+
+    Só consulta o banco; quem aplica as pendências é o init-db.
+    """
+    inspetor = inspect(conexao)
+    colunas = {}
+
+    def colunas_da_tabela(tabela):
+        if tabela not in colunas:
+            colunas[tabela] = {}
+            if inspetor.has_table(tabela):
+                colunas[tabela] = {c['name']: c['type'] for c in inspetor.get_columns(tabela)}
+        return colunas[tabela]
+
+    pendentes = [
+        f"{tabela}.{coluna}"
+        for tabela, coluna in COLUNAS_INCLUIDAS
+        if coluna not in colunas_da_tabela(tabela)
+    ]
+
+    if conexao.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import JSONB
+
+        pendentes += [
+            f"{tabela}.{coluna}"
+            for tabela, coluna in COLUNAS_JSON
+            if not isinstance(colunas_da_tabela(tabela).get(coluna), JSONB)
+        ]
+
+    return pendentes
@@ -1,9 +1,8 @@
 from backend import db
-from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from backend.utils.senhas import gerar_hash_senha, verificar_senha
 from datetime import datetime
 
-class Usuario(UserMixin, db.Model):
+class Usuario(db.Model):
     __tablename__ = 'usuarios'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -19,7 +18,54 @@ class Usuario(UserMixin, db.Model):
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     def set_password(self, senha):
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = gerar_hash_senha(senha)
         
     def check_password(self, senha):
-        return check_password_hash(self.senha_hash, senha)
+        return verificar_senha(self.senha_hash, senha)[0]
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'email': self.email,
+            'cargo': self.cargo,
+            'departamento': self.departamento,
+            'nivel_acesso': self.nivel_acesso,
+            'ativo': self.ativo,
+            'ultimo_acesso': self.ultimo_acesso.isoformat() if self.ultimo_acesso else None,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
+
+class LogAcesso(db.Model):
+    """Login, logout e tentativas recusadas (gravados em lotes por logs_acesso_service)"""
+    __tablename__ = 'logs_acesso'
+    __table_args__ = (
+        db.Index('ix_logs_acesso_data_hora', 'data_hora'),
+        db.Index('ix_logs_acesso_usuario_data_hora', 'usuario_id', 'data_hora'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    data_hora = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ip = db.Column(db.String(45))
+    # login, logout ou falha_login
+    acao = db.Column(db.String(30), nullable=False)
+    detalhes = db.Column(db.Text)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'usuario_id': self.usuario_id,
+            'data_hora': self.data_hora.isoformat() if self.data_hora else None,
+            'ip': self.ip,
+            'acao': self.acao,
+            'detalhes': self.detalhes
+        }
+
+class TokenRevogado(db.Model):
+    """Tokens revogados no logout, mantidos até a data em que expirariam"""
+    __tablename__ = 'tokens_revogados'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expira_em = db.Column(db.DateTime, nullable=False, index=True)
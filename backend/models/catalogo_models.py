@@ -0,0 +1,9 @@
+from backend import db
+from datetime import datetime
+
+class VersaoCatalogo(db.Model):
+    __tablename__ = 'versoes_catalogo'
+
+    nome = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
@@ -18,6 +18,21 @@ class Contrato(db.Model):
     itens = db.relationship('ItemContrato', backref='contrato', lazy=True, cascade="all, delete-orphan")
     cotacoes = db.relationship('Cotacao', backref='contrato', lazy=True)
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'numero': self.numero,
+            'fornecedor_id': self.fornecedor_id,
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_fim': self.data_fim.isoformat() if self.data_fim else None,
+            'valor_total': self.valor_total,
+            'status': self.status,
+            'observacoes': self.observacoes,
+            'itens': [item.to_dict() for item in self.itens],
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
 class ItemContrato(db.Model):
     __tablename__ = 'itens_contrato'
     
@@ -31,6 +46,19 @@ class ItemContrato(db.Model):
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'contrato_id': self.contrato_id,
+            'insumo_id': self.insumo_id,
+            'quantidade': self.quantidade,
+            'valor_unitario': self.valor_unitario,
+            'valor_total': self.valor_total,
+            'cronograma_entrega': self.cronograma_entrega,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
 class Cotacao(db.Model):
     __tablename__ = 'cotacoes'
     
@@ -44,3 +72,45 @@ class Cotacao(db.Model):
     observacoes = db.Column(db.Text)
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'contrato_id': self.contrato_id,
+            'fornecedor_id': self.fornecedor_id,
+            'insumo_id': self.insumo_id,
+            'data_cotacao': self.data_cotacao.isoformat() if self.data_cotacao else None,
+            'valor_unitario': self.valor_unitario,
+            'validade': self.validade.isoformat() if self.validade else None,
+            'observacoes': self.observacoes,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
+class PlanejamentoCompra(db.Model):
+    __tablename__ = 'planejamentos_compra'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mes_referencia = db.Column(db.Date, nullable=False, index=True)
+    insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'), nullable=False)
+    quantidade_prevista = db.Column(db.Float, nullable=False)
+    valor_unitario_previsto = db.Column(db.Float)
+    valor_total_previsto = db.Column(db.Float)
+    status = db.Column(db.String(20), default='pendente')
+    observacoes = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mes_referencia': self.mes_referencia.strftime('%Y-%m') if self.mes_referencia else None,
+            'insumo_id': self.insumo_id,
+            'quantidade_prevista': self.quantidade_prevista,
+            'valor_unitario_previsto': self.valor_unitario_previsto,
+            'valor_total_previsto': self.valor_total_previsto,
+            'status': self.status,
+            'observacoes': self.observacoes,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
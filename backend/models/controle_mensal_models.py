@@ -7,12 +7,37 @@ class RegistroMensal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     mes = db.Column(db.Integer, nullable=False)
     ano = db.Column(db.Integer, nullable=False)
+    insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'))
+    # Contadores do mês, incrementados pelo banco a cada entrega (col = col + delta)
+    estoque_inicial = db.Column(db.Numeric(12, 3), nullable=False, default=0, server_default='0')
+    quantidade_entregue = db.Column(db.Numeric(12, 3), nullable=False, default=0, server_default='0')
+    quantidade_contratada = db.Column(db.Numeric(12, 3), nullable=False, default=0, server_default='0')
+    quantidade_paga = db.Column(db.Numeric(12, 3), nullable=False, default=0, server_default='0')
+    estoque_final = db.Column(db.Numeric(12, 3), nullable=False, default=0, server_default='0')
     status = db.Column(db.String(20), default='aberto')
     observacoes = db.Column(db.Text)
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     entregas = db.relationship('EntregaMensal', backref='registro_mensal', lazy=True, cascade="all, delete-orphan")
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mes': self.mes,
+            'ano': self.ano,
+            'mes_referencia': f"{self.ano:04d}-{self.mes:02d}",
+            'insumo_id': self.insumo_id,
+            'estoque_inicial': float(self.estoque_inicial or 0),
+            'quantidade_entregue': float(self.quantidade_entregue or 0),
+            'quantidade_contratada': float(self.quantidade_contratada or 0),
+            'quantidade_paga': float(self.quantidade_paga or 0),
+            'estoque_final': float(self.estoque_final or 0),
+            'status': self.status,
+            'observacoes': self.observacoes,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
 
 class EntregaMensal(db.Model):
     __tablename__ = 'entregas_mensais'
@@ -25,6 +50,57 @@ class EntregaMensal(db.Model):
     quantidade = db.Column(db.Float, nullable=False)
     valor_unitario = db.Column(db.Float, nullable=False)
     valor_total = db.Column(db.Float, nullable=False)
+    contrato_id = db.Column(db.Integer, db.ForeignKey('contratos.id'))
+    # "pago" soma a quantidade à quantidade_paga do registro
+    status_pagamento = db.Column(db.String(20), default='pendente', server_default='pendente')
+    observacoes = db.Column(db.Text)
+    # Chave enviada pelo cliente para que reenvios da mesma entrega não a dupliquem
+    chave_idempotencia = db.Column(db.String(100), unique=True)
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'registro_mensal_id': self.registro_mensal_id,
+            'nota_fiscal_id': self.nota_fiscal_id,
+            'contrato_id': self.contrato_id,
+            'insumo_id': self.insumo_id,
+            'data_entrega': self.data_entrega.isoformat() if self.data_entrega else None,
+            'quantidade': self.quantidade,
+            'valor_unitario': self.valor_unitario,
+            'valor_total': self.valor_total,
+            'status_pagamento': self.status_pagamento,
+            'observacoes': self.observacoes,
+            'chave_idempotencia': self.chave_idempotencia,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
+class ProgramacaoFutura(db.Model):
+    __tablename__ = 'programacoes_futuras'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    mes_referencia = db.Column(db.Date, nullable=False)
+    insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'), nullable=False)
+    contrato_id = db.Column(db.Integer, db.ForeignKey('contratos.id'))
+    quantidade_prevista = db.Column(db.Float, nullable=False)
+    valor_unitario_previsto = db.Column(db.Float)
+    status = db.Column(db.String(20), default='pendente')
     observacoes = db.Column(db.Text)
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mes_referencia': self.mes_referencia.strftime('%Y-%m') if self.mes_referencia else None,
+            'insumo_id': self.insumo_id,
+            'contrato_id': self.contrato_id,
+            'quantidade_prevista': self.quantidade_prevista,
+            'valor_unitario_previsto': self.valor_unitario_previsto,
+            'status': self.status,
+            'observacoes': self.observacoes,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
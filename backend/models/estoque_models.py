@@ -0,0 +1,45 @@
+from backend import db
+from datetime import datetime
+
+class MovimentacaoEstoque(db.Model):
+    """Razão de estoque: uma linha por variação, nunca alterada ou excluída"""
+    __tablename__ = 'movimentacoes_estoque'
+    __table_args__ = (
+        db.Index('ix_movimentacoes_estoque_insumo_data', 'insumo_id', 'data'),
+        db.Index('ix_movimentacoes_estoque_origem', 'origem', 'origem_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'), nullable=False)
+    # Data em que o estoque variou (data da entrega, da nota, mês do registro); pode ser anterior à gravação
+    data = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    # Quando a movimentação foi gravada (nulo nas linhas anteriores à coluna, gravadas na própria data)
+    registrado_em = db.Column(db.DateTime, default=datetime.now)
+    # Operação que moveu o estoque (entrega, nota_fiscal, registro_mensal, ajuste...) e o ID do objeto
+    origem = db.Column(db.String(30), nullable=False)
+    origem_id = db.Column(db.Integer)
+    quantidade = db.Column(db.Numeric(12, 3), nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'insumo_id': self.insumo_id,
+            'data': self.data.isoformat() if self.data else None,
+            'registrado_em': self.registrado_em.isoformat() if self.registrado_em else None,
+            'origem': self.origem,
+            'origem_id': self.origem_id,
+            'quantidade': float(self.quantidade)
+        }
+
+class SnapshotEstoque(db.Model):
+    """Estoque acumulado de um insumo até uma data (ponto de partida das consultas por data)"""
+    __tablename__ = 'snapshots_estoque'
+    __table_args__ = (
+        db.Index('ix_snapshots_estoque_insumo_data', 'insumo_id', 'data'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'), nullable=False)
+    # Soma das movimentações do insumo com data e gravação até esta (inclusive)
+    data = db.Column(db.DateTime, nullable=False)
+    quantidade = db.Column(db.Numeric(12, 3), nullable=False)
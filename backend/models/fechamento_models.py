@@ -1,4 +1,5 @@
 from backend import db
+from .tipos import TipoJSON
 from datetime import datetime
 
 class CustoMedio(db.Model):
@@ -13,6 +14,20 @@ class CustoMedio(db.Model):
     custo_medio = db.Column(db.Float, nullable=False)
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'insumo_id': self.insumo_id,
+            'mes': self.mes,
+            'ano': self.ano,
+            'mes_referencia': f"{self.ano:04d}-{self.mes:02d}",
+            'quantidade_total': self.quantidade_total,
+            'valor_total': self.valor_total,
+            'custo_medio': self.custo_medio,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
 
 class Fechamento(db.Model):
     __tablename__ = 'fechamentos'
@@ -22,7 +37,128 @@ class Fechamento(db.Model):
     ano = db.Column(db.Integer, nullable=False)
     data_fechamento = db.Column(db.Date, nullable=False)
     valor_total = db.Column(db.Float, nullable=False)
+    quantidade_total = db.Column(db.Float)
+    custo_medio_geral = db.Column(db.Float)
     status = db.Column(db.String(20), default='fechado')
     observacoes = db.Column(db.Text)
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    detalhes = db.relationship('DetalhesFechamento', backref='fechamento', lazy=True, cascade="all, delete-orphan")
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mes': self.mes,
+            'ano': self.ano,
+            'mes_referencia': f"{self.ano:04d}-{self.mes:02d}",
+            'data_fechamento': self.data_fechamento.isoformat() if self.data_fechamento else None,
+            'valor_total': self.valor_total,
+            'quantidade_total': self.quantidade_total,
+            'custo_medio_geral': self.custo_medio_geral,
+            'status': self.status,
+            'observacoes': self.observacoes,
+            'detalhes': [detalhe.to_dict() for detalhe in self.detalhes],
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
+class DetalhesFechamento(db.Model):
+    __tablename__ = 'detalhes_fechamento'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fechamento_id = db.Column(db.Integer, db.ForeignKey('fechamentos.id'), nullable=False)
+    insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'), nullable=False)
+    quantidade = db.Column(db.Float, nullable=False)
+    valor_total = db.Column(db.Float, nullable=False)
+    custo_medio = db.Column(db.Float, nullable=False)
+    observacoes = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'fechamento_id': self.fechamento_id,
+            'insumo_id': self.insumo_id,
+            'quantidade': self.quantidade,
+            'valor_total': self.valor_total,
+            'custo_medio': self.custo_medio,
+            'observacoes': self.observacoes
+        }
+
+# Totais mensais por insumo, fornecedor e contrato, recalculados a cada fechamento
+class ResumoMensal(db.Model):
+    __tablename__ = 'resumos_mensais'
+    __table_args__ = (
+        db.Index('ix_resumos_mensais_mes_insumo', 'mes_referencia', 'insumo_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    mes_referencia = db.Column(db.Date, nullable=False)
+    insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'), nullable=False)
+    fornecedor_id = db.Column(db.Integer, db.ForeignKey('fornecedores.id'))
+    contrato_id = db.Column(db.Integer, db.ForeignKey('contratos.id'))
+    quantidade_total = db.Column(db.Float, nullable=False, default=0)
+    valor_total = db.Column(db.Float, nullable=False, default=0)
+    custo_medio = db.Column(db.Float)
+    entregas = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'mes_referencia': self.mes_referencia.strftime('%Y-%m'),
+            'insumo_id': self.insumo_id,
+            'fornecedor_id': self.fornecedor_id,
+            'contrato_id': self.contrato_id,
+            'quantidade_total': self.quantidade_total,
+            'valor_total': self.valor_total,
+            'custo_medio': self.custo_medio,
+            'entregas': self.entregas
+        }
+
+# Chaves de "parametros" usadas como filtro nas análises (indexadas)
+CAMPOS_PARAMETROS = ('insumo_id', 'fornecedor_id', 'contrato_id')
+
+class AnaliseComparativa(db.Model):
+    __tablename__ = 'analises_comparativas'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    titulo = db.Column(db.String(200), nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    data_inicio = db.Column(db.Date, nullable=False)
+    data_fim = db.Column(db.Date, nullable=False)
+    parametros = db.Column(TipoJSON)
+    resultados = db.Column(TipoJSON)
+    observacoes = db.Column(db.Text)
+    # Hash de (tipo, período, parâmetros) e dos dados usados no cálculo, para reaproveitar resultados
+    chave = db.Column(db.String(64), index=True)
+    assinatura_dados = db.Column(db.String(64))
+    calculado_em = db.Column(db.DateTime)
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'titulo': self.titulo,
+            'tipo': self.tipo,
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_fim': self.data_fim.isoformat() if self.data_fim else None,
+            'parametros': self.parametros or {},
+            'resultados': self.resultados,
+            'observacoes': self.observacoes,
+            'calculado_em': self.calculado_em.isoformat() if self.calculado_em else None,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
+
+# Índices para filtrar pelas chaves de "parametros": GIN (consultas com @>) no PostgreSQL
+# e índices de expressão json_extract no SQLite
+db.Index(
+    'ix_analises_parametros', AnaliseComparativa.parametros, postgresql_using='gin'
+).ddl_if(dialect='postgresql')
+
+for _campo in CAMPOS_PARAMETROS:
+    db.Index(
+        f'ix_analises_parametros_{_campo}',
+        db.func.json_extract(AnaliseComparativa.parametros, db.literal_column(f"'$.{_campo}'"))
+    ).ddl_if(dialect='sqlite')
@@ -16,6 +16,20 @@ class Fornecedor(db.Model):
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     notas_fiscais = db.relationship('NotaFiscal', backref='fornecedor', lazy=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'cnpj': self.cnpj,
+            'endereco': self.endereco,
+            'telefone': self.telefone,
+            'email': self.email,
+            'contato': self.contato,
+            'ativo': self.ativo,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
 
 class Insumo(db.Model):
     __tablename__ = 'insumos'
@@ -26,11 +40,27 @@ class Insumo(db.Model):
     categoria = db.Column(db.String(50))
     unidade_medida = db.Column(db.String(20), nullable=False)
     descricao = db.Column(db.Text)
+    # Mantido pelos incrementos de estoque_service (a origem de cada variação fica na razão de estoque)
+    estoque_atual = db.Column(db.Numeric(12, 3), default=0, server_default='0')
     ativo = db.Column(db.Boolean, default=True)
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     itens_nf = db.relationship('ItemNotaFiscal', backref='insumo', lazy=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'codigo': self.codigo,
+            'categoria': self.categoria,
+            'unidade_medida': self.unidade_medida,
+            'descricao': self.descricao,
+            'estoque_atual': float(self.estoque_atual or 0),
+            'ativo': self.ativo,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
 
 class NotaFiscal(db.Model):
     __tablename__ = 'notas_fiscais'
@@ -43,10 +73,28 @@ class NotaFiscal(db.Model):
     valor_total = db.Column(db.Float, nullable=False)
     fornecedor_id = db.Column(db.Integer, db.ForeignKey('fornecedores.id'), nullable=False)
     observacoes = db.Column(db.Text)
+    # "ativo" ou "cancelado" (exclusão lógica; o estoque dos itens é revertido uma única vez)
+    status = db.Column(db.String(20), default='ativo', server_default='ativo')
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     itens = db.relationship('ItemNotaFiscal', backref='nota_fiscal', lazy=True, cascade="all, delete-orphan")
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'numero': self.numero,
+            'serie': self.serie,
+            'data_emissao': self.data_emissao.isoformat() if self.data_emissao else None,
+            'data_recebimento': self.data_recebimento.isoformat() if self.data_recebimento else None,
+            'valor_total': self.valor_total,
+            'fornecedor_id': self.fornecedor_id,
+            'observacoes': self.observacoes,
+            'status': self.status,
+            'itens': [item.to_dict() for item in self.itens],
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
 
 class ItemNotaFiscal(db.Model):
     __tablename__ = 'itens_nota_fiscal'
@@ -59,3 +107,13 @@ class ItemNotaFiscal(db.Model):
     valor_total = db.Column(db.Float, nullable=False)
     criado_em = db.Column(db.DateTime, default=datetime.now)
     atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nota_fiscal_id': self.nota_fiscal_id,
+            'insumo_id': self.insumo_id,
+            'quantidade': self.quantidade,
+            'valor_unitario': self.valor_unitario,
+            'valor_total': self.valor_total
+        }
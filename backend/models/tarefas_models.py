@@ -0,0 +1,36 @@
+from backend import db
+from .tipos import TipoJSON
+from datetime import datetime
+
+class Tarefa(db.Model):
+    __tablename__ = 'tarefas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    parametros = db.Column(TipoJSON)
+    status = db.Column(db.String(20), nullable=False, default='pendente', index=True)
+    progresso = db.Column(db.Integer, nullable=False, default=0)
+    resultado = db.Column(TipoJSON)
+    erro = db.Column(db.Text)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    iniciado_em = db.Column(db.DateTime)
+    concluido_em = db.Column(db.DateTime)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'parametros': self.parametros or {},
+            'status': self.status,
+            'progresso': self.progresso,
+            'resultado': self.resultado,
+            'erro': self.erro,
+            'tentativas': self.tentativas,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None
+        }
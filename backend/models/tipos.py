@@ -0,0 +1,5 @@
+from backend import db
+from sqlalchemy.dialects.postgresql import JSONB
+
+# JSONB no PostgreSQL, JSON (texto validado pelo JSON1) no SQLite
+TipoJSON = db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
@@ -0,0 +1,381 @@
+from ..models.fechamento_models import db, AnaliseComparativa, ResumoMensal, CAMPOS_PARAMETROS
+from ..models.contratos_models import ItemContrato, Cotacao
+from ..utils.replica import somente_leitura
+from ..utils.esquemas import obter_schema
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime, date
+from marshmallow import Schema, fields, ValidationError, validates, validates_schema
+import hashlib
+import json
+
+# Tipos de análise calculados no servidor a partir dos totais mensais (resumos_mensais)
+TIPOS_ANALISE = ('mes_a_mes', 'fornecedores', 'contrato_mercado', 'orcado_realizado')
+
+
+class AnaliseComparativaSchema(Schema):
+    titulo = fields.String(required=True)
+    tipo = fields.String(required=True)
+    data_inicio = fields.Date(required=True)
+    data_fim = fields.Date(required=True)
+    parametros = fields.Dict(allow_none=True)
+    # Calculados no servidor; aceito apenas por compatibilidade e ignorado
+    resultados = fields.Dict(allow_none=True)
+    observacoes = fields.String(allow_none=True)
+
+    @validates('tipo')
+    def validate_tipo(self, value):
+        if value not in TIPOS_ANALISE:
+            raise ValidationError(f"Tipo de análise inválido: {value} (use {', '.join(TIPOS_ANALISE)})")
+
+    @validates_schema
+    def validate_datas(self, data, **kwargs):
+        # Verificar se data_fim é posterior a data_inicio
+        if 'data_inicio' in data and 'data_fim' in data:
+            if data['data_fim'] < data['data_inicio']:
+                raise ValidationError("Data fim deve ser posterior à data início")
+
+    @validates_schema
+    def validate_parametros(self, data, **kwargs):
+        # Parâmetros obrigatórios de cada tipo de análise
+        parametros = data.get('parametros') or {}
+        tipo = data.get('tipo')
+
+        if tipo == 'fornecedores' and not parametros.get('insumo_id'):
+            raise ValidationError("A comparação entre fornecedores exige parametros.insumo_id", 'parametros')
+
+        if tipo == 'contrato_mercado' and not parametros.get('contrato_id'):
+            raise ValidationError("A comparação com o mercado exige parametros.contrato_id", 'parametros')
+
+        if tipo == 'orcado_realizado':
+            try:
+                float(parametros['orcamento'])
+            except (KeyError, TypeError, ValueError):
+                raise ValidationError("A comparação orçado x realizado exige parametros.orcamento numérico", 'parametros')
+
+
+def _variacao(anterior, atual):
+    if not anterior or atual is None:
+        return None
+    return round((atual - anterior) / anterior * 100, 2)
+
+
+def _custo_medio(valor, quantidade):
+    return valor / quantidade if quantidade else None
+
+
+def _inicio_mes(data):
+    return date(data.year, data.month, 1)
+
+
+def _filtrar_resumos(query, data_inicio, data_fim, parametros):
+    query = query.filter(
+        ResumoMensal.mes_referencia >= _inicio_mes(data_inicio),
+        ResumoMensal.mes_referencia <= data_fim
+    )
+    for campo in CAMPOS_PARAMETROS:
+        if parametros.get(campo):
+            query = query.filter(getattr(ResumoMensal, campo) == int(parametros[campo]))
+    return query
+
+
+def _analisar_mes_a_mes(data_inicio, data_fim, parametros):
+    linhas = _filtrar_resumos(db.session.query(
+        ResumoMensal.mes_referencia,
+        db.func.sum(ResumoMensal.quantidade_total),
+        db.func.sum(ResumoMensal.valor_total)
+    ), data_inicio, data_fim, parametros).group_by(
+        ResumoMensal.mes_referencia
+    ).order_by(ResumoMensal.mes_referencia).all()
+
+    meses = []
+    anterior = None
+    for mes, quantidade, valor in linhas:
+        atual = {
+            'mes': mes.strftime('%Y-%m'),
+            'quantidade': quantidade,
+            'valor_total': valor,
+            'custo_medio': _custo_medio(valor, quantidade)
+        }
+        atual['variacao_valor'] = _variacao(anterior['valor_total'], valor) if anterior else None
+        atual['variacao_custo_medio'] = _variacao(anterior['custo_medio'], atual['custo_medio']) if anterior else None
+        meses.append(atual)
+        anterior = atual
+
+    return {
+        'meses': meses,
+        'quantidade_total': sum(m['quantidade'] for m in meses),
+        'valor_total': sum(m['valor_total'] for m in meses)
+    }
+
+
+def _analisar_fornecedores(data_inicio, data_fim, parametros):
+    linhas = _filtrar_resumos(db.session.query(
+        ResumoMensal.fornecedor_id,
+        db.func.sum(ResumoMensal.quantidade_total),
+        db.func.sum(ResumoMensal.valor_total),
+        db.func.sum(ResumoMensal.entregas)
+    ), data_inicio, data_fim, parametros).group_by(ResumoMensal.fornecedor_id).all()
+
+    fornecedores = [{
+        'fornecedor_id': fornecedor_id,
+        'quantidade': quantidade,
+        'valor_total': valor,
+        'entregas': entregas,
+        'custo_medio': _custo_medio(valor, quantidade)
+    } for fornecedor_id, quantidade, valor, entregas in linhas]
+
+    # Do menor para o maior custo médio, com a diferença para o mais barato
+    fornecedores.sort(key=lambda f: (f['custo_medio'] is None, f['custo_medio'] or 0))
+    menor_custo = fornecedores[0]['custo_medio'] if fornecedores else None
+    for fornecedor in fornecedores:
+        fornecedor['diferenca_menor_custo'] = _variacao(menor_custo, fornecedor['custo_medio'])
+
+    return {'insumo_id': int(parametros['insumo_id']), 'fornecedores': fornecedores}
+
+
+def _analisar_contrato_mercado(data_inicio, data_fim, parametros):
+    contrato_id = int(parametros['contrato_id'])
+    itens = ItemContrato.query.filter_by(contrato_id=contrato_id).all()
+    insumos = [item.insumo_id for item in itens]
+
+    # Cotações do período fora deste contrato, agregadas por insumo
+    mercado = {
+        insumo_id: (media, minimo, cotacoes)
+        for insumo_id, media, minimo, cotacoes in db.session.query(
+            Cotacao.insumo_id,
+            db.func.avg(Cotacao.valor_unitario),
+            db.func.min(Cotacao.valor_unitario),
+            db.func.count(Cotacao.id)
+        ).filter(
+            Cotacao.insumo_id.in_(insumos),
+            Cotacao.data_cotacao >= data_inicio,
+            Cotacao.data_cotacao <= data_fim,
+            db.or_(Cotacao.contrato_id.is_(None), Cotacao.contrato_id != contrato_id)
+        ).group_by(Cotacao.insumo_id)
+    } if insumos else {}
+
+    # Custo médio efetivamente pago nas entregas do contrato
+    realizado = {
+        insumo_id: _custo_medio(valor, quantidade)
+        for insumo_id, quantidade, valor in _filtrar_resumos(db.session.query(
+            ResumoMensal.insumo_id,
+            db.func.sum(ResumoMensal.quantidade_total),
+            db.func.sum(ResumoMensal.valor_total)
+        ), data_inicio, data_fim, {'contrato_id': contrato_id}).group_by(ResumoMensal.insumo_id)
+    }
+
+    resultado_itens = []
+    for item in itens:
+        media, minimo, cotacoes = mercado.get(item.insumo_id, (None, None, 0))
+        resultado_itens.append({
+            'insumo_id': item.insumo_id,
+            'valor_contratado': item.valor_unitario,
+            'custo_medio_realizado': realizado.get(item.insumo_id),
+            'media_mercado': media,
+            'menor_cotacao': minimo,
+            'cotacoes': cotacoes,
+            'diferenca_mercado': _variacao(media, item.valor_unitario)
+        })
+
+    return {'contrato_id': contrato_id, 'itens': resultado_itens}
+
+
+def _analisar_orcado_realizado(data_inicio, data_fim, parametros):
+    orcamento = float(parametros['orcamento'])
+    mes_a_mes = _analisar_mes_a_mes(data_inicio, data_fim, parametros)
+    realizado = mes_a_mes['valor_total']
+
+    # O orçamento do período é distribuído igualmente entre os meses
+    quantidade_meses = (data_fim.year - data_inicio.year) * 12 + data_fim.month - data_inicio.month + 1
+    orcamento_mensal = orcamento / quantidade_meses
+
+    return {
+        'orcamento': orcamento,
+        'realizado': realizado,
+        'saldo': orcamento - realizado,
+        'percentual_executado': round(realizado / orcamento * 100, 2) if orcamento else None,
+        'meses': [{
+            'mes': mes['mes'],
+            'orcado': orcamento_mensal,
+            'realizado': mes['valor_total'],
+            'desvio': _variacao(orcamento_mensal, mes['valor_total'])
+        } for mes in mes_a_mes['meses']]
+    }
+
+
+CALCULOS = {
+    'mes_a_mes': _analisar_mes_a_mes,
+    'fornecedores': _analisar_fornecedores,
+    'contrato_mercado': _analisar_contrato_mercado,
+    'orcado_realizado': _analisar_orcado_realizado,
+}
+
+
+def _hash(valor):
+    return hashlib.sha256(json.dumps(valor, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _assinatura_dados(tipo, data_inicio, data_fim, parametros):
+    """Resume o estado dos dados usados pela análise; muda quando os totais do período são recalculados"""
+    partes = [_filtrar_resumos(db.session.query(
+        db.func.count(ResumoMensal.id), db.func.max(ResumoMensal.atualizado_em)
+    ), data_inicio, data_fim, {}).one()]
+
+    if tipo == 'contrato_mercado':
+        partes.append(db.session.query(
+            db.func.count(Cotacao.id), db.func.max(Cotacao.atualizado_em)
+        ).filter(Cotacao.data_cotacao >= data_inicio, Cotacao.data_cotacao <= data_fim).one())
+        partes.append(db.session.query(
+            db.func.count(ItemContrato.id), db.func.max(ItemContrato.atualizado_em)
+        ).filter(ItemContrato.contrato_id == int(parametros['contrato_id'])).one())
+
+    return _hash([list(parte) for parte in partes])
+
+
+def _normalizar_parametros(parametros):
+    # IDs sempre como inteiros, para que os filtros por chave de "parametros" os encontrem
+    parametros = dict(parametros or {})
+    for campo in CAMPOS_PARAMETROS:
+        if parametros.get(campo) not in (None, ''):
+            parametros[campo] = int(parametros[campo])
+    return parametros
+
+
+def _filtro_parametro(campo, valor):
+    # No PostgreSQL usa @> (atendido pelo índice GIN); no SQLite, o mesmo json_extract dos índices
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return AnaliseComparativa.parametros.op('@>')(db.literal({campo: valor}, JSONB))
+    return db.func.json_extract(AnaliseComparativa.parametros, db.literal_column(f"'$.{campo}'")) == valor
+
+
+def _calcular(analise):
+    """Preenche os resultados da análise, reaproveitando um cálculo anterior com a mesma chave e dados"""
+    parametros = analise.parametros or {}
+    chave = _hash([analise.tipo, analise.data_inicio, analise.data_fim, parametros])
+    assinatura = _assinatura_dados(analise.tipo, analise.data_inicio, analise.data_fim, parametros)
+
+    anterior = AnaliseComparativa.query.filter(
+        AnaliseComparativa.chave == chave,
+        AnaliseComparativa.assinatura_dados == assinatura,
+        AnaliseComparativa.resultados.isnot(None)
+    ).order_by(AnaliseComparativa.calculado_em.desc()).first()
+
+    if anterior:
+        analise.resultados = anterior.resultados
+        analise.calculado_em = anterior.calculado_em
+    else:
+        resultados = CALCULOS[analise.tipo](analise.data_inicio, analise.data_fim, parametros)
+        # Passa por JSON para converter datas e Decimal em tipos aceitos pela coluna
+        analise.resultados = json.loads(json.dumps(resultados, default=str))
+        analise.calculado_em = datetime.now()
+
+    analise.chave = chave
+    analise.assinatura_dados = assinatura
+
+    return analise
+
+
+def criar_analise(data):
+    """Cria uma nova análise comparativa com os resultados calculados no servidor"""
+    schema = obter_schema(AnaliseComparativaSchema)
+    validated_data = schema.load(data)
+
+    nova_analise = AnaliseComparativa(
+        titulo=validated_data['titulo'],
+        tipo=validated_data['tipo'],
+        data_inicio=validated_data['data_inicio'],
+        data_fim=validated_data['data_fim'],
+        parametros=_normalizar_parametros(validated_data.get('parametros')),
+        observacoes=validated_data.get('observacoes')
+    )
+    _calcular(nova_analise)
+
+    db.session.add(nova_analise)
+    db.session.commit()
+
+    return nova_analise
+
+
+def atualizar_analise(analise_id, data):
+    """Atualiza uma análise comparativa existente e recalcula os resultados"""
+    analise = AnaliseComparativa.query.get(analise_id)
+    if not analise:
+        return None
+
+    schema = obter_schema(AnaliseComparativaSchema)
+    validated_data = schema.load(data)
+    validated_data.pop('resultados', None)
+
+    if 'parametros' in validated_data:
+        validated_data['parametros'] = _normalizar_parametros(validated_data['parametros'])
+
+    # Atualizar campos
+    for key, value in validated_data.items():
+        setattr(analise, key, value)
+
+    _calcular(analise)
+    analise.atualizado_em = datetime.utcnow()
+    db.session.commit()
+
+    return analise
+
+
+def recalcular_analise(analise_id):
+    """Recalcula os resultados se os dados do período mudaram desde o último cálculo"""
+    analise = AnaliseComparativa.query.get(analise_id)
+    if not analise:
+        return None
+
+    _calcular(analise)
+    db.session.commit()
+
+    return analise
+
+
+@somente_leitura
+def buscar_analise(analise_id):
+    """Busca uma análise comparativa pelo ID"""
+    return AnaliseComparativa.query.get(analise_id)
+
+
+def consultar_analises(filtros=None):
+    """Consulta de análises com os filtros de listar_analises, sem executar (também usada na exportação)"""
+    query = AnaliseComparativa.query
+
+    if filtros:
+        if 'tipo' in filtros:
+            query = query.filter_by(tipo=filtros['tipo'])
+
+        if 'data_inicio' in filtros and 'data_fim' in filtros:
+            query = query.filter(
+                AnaliseComparativa.data_inicio >= datetime.strptime(filtros['data_inicio'], '%Y-%m-%d').date(),
+                AnaliseComparativa.data_fim <= datetime.strptime(filtros['data_fim'], '%Y-%m-%d').date()
+            )
+
+        # Filtros por chaves dentro de "parametros", resolvidos no banco
+        for campo in CAMPOS_PARAMETROS:
+            if campo in filtros:
+                query = query.filter(_filtro_parametro(campo, int(filtros[campo])))
+
+    # Ordenar por data de criação decrescente
+    query = query.order_by(AnaliseComparativa.criado_em.desc())
+
+    return query
+
+
+@somente_leitura
+def listar_analises(filtros=None):
+    """Lista análises comparativas com filtros opcionais"""
+    return consultar_analises(filtros).all()
+
+
+def excluir_analise(analise_id):
+    """Exclui uma análise comparativa"""
+    analise = AnaliseComparativa.query.get(analise_id)
+    if not analise:
+        return False
+
+    db.session.delete(analise)
+    db.session.commit()
+
+    return True
@@ -1,7 +1,16 @@
 from ..models.auth_models import db, Usuario, LogAcesso
+from ..utils.replica import somente_leitura
+from ..utils.esquemas import obter_schema
+from ..utils.metricas import FALHAS_LOGIN
+from ..utils.senhas import gerar_hash_senha, verificar_senha
+from ..utils.limitador import LimitadorJanela
+from .logs_acesso_service import enfileirar_log_acesso
 from datetime import datetime
+from flask import current_app
 from marshmallow import Schema, fields, ValidationError, validates
-from werkzeug.security import generate_password_hash, check_password_hash
+
+# Falhas de login recentes por email + IP (limite em LOGIN_MAX_FALHAS / LOGIN_JANELA_SEGUNDOS)
+_falhas_login = LimitadorJanela()
 
 class UsuarioSchema(Schema):
     nome = fields.String(required=True)
@@ -30,7 +39,7 @@ class UsuarioSchema(Schema):
 
 def criar_usuario(data):
     """Cria um novo usuário"""
-    schema = UsuarioSchema()
+    schema = obter_schema(UsuarioSchema)
     validated_data = schema.load(data)
     
     # Verificar se a senha foi fornecida
@@ -46,7 +55,7 @@ def criar_usuario(data):
     )
     
     # Definir senha
-    novo_usuario.set_senha(validated_data['senha'])
+    novo_usuario.senha_hash = gerar_hash_senha(validated_data['senha'])
     
     db.session.add(novo_usuario)
     db.session.commit()
@@ -60,7 +69,7 @@ def atualizar_usuario(usuario_id, data):
     if not usuario:
         return None
     
-    schema = UsuarioSchema(context={'usuario_id': usuario_id})
+    schema = obter_schema(UsuarioSchema, usuario_id=usuario_id)
     validated_data = schema.load(data)
     
     # Atualizar campos
@@ -70,7 +79,7 @@ def atualizar_usuario(usuario_id, data):
     
     # Atualizar senha se fornecida
     if 'senha' in validated_data and validated_data['senha']:
-        usuario.set_senha(validated_data['senha'])
+        usuario.senha_hash = gerar_hash_senha(validated_data['senha'])
     
     usuario.atualizado_em = datetime.utcnow()
     db.session.commit()
@@ -78,11 +87,13 @@ def atualizar_usuario(usuario_id, data):
     return usuario
 
 
+@somente_leitura
 def buscar_usuario(usuario_id):
     """Busca um usuário pelo ID"""
     return Usuario.query.get(usuario_id)
 
 
+@somente_leitura
 def listar_usuarios(filtros=None):
     """Lista usuários com filtros opcionais"""
     query = Usuario.query
@@ -120,42 +131,84 @@ def ativar_desativar_usuario(usuario_id, ativar=True):
     return usuario
 
 
+def _chave_login(email, ip):
+    return f"{(email or '').strip().lower()}|{ip}"
+
+
+def tempo_bloqueio_login(email, ip=None):
+    """Segundos que o email + IP ainda deve esperar por ter excedido as falhas de login (0 se liberado)
+
+    Consultado antes de autenticar_usuario, sem acessar o banco nem calcular hash.
+    """
+    return _falhas_login.espera(
+        _chave_login(email, ip),
+        current_app.config['LOGIN_MAX_FALHAS'],
+        current_app.config['LOGIN_JANELA_SEGUNDOS']
+    )
+
+
+def _recusar_login(usuario_id, email, ip, motivo, detalhes, mensagem):
+    if _adicionar_log_acesso(usuario_id, 'falha_login', ip, detalhes):
+        db.session.commit()
+    FALHAS_LOGIN.labels(motivo).inc()
+    _falhas_login.registrar(_chave_login(email, ip), current_app.config['LOGIN_MAX_FALHAS'])
+    return None, mensagem
+
+
 def autenticar_usuario(email, senha, ip=None):
-    """Autentica um usuário"""
+    """Autentica um usuário
+
+    O último acesso e, se o hash da senha usa outro método ou custo que SENHA_METODO, o
+    novo hash são gravados em uma única transação; o log de acesso vai para o gravador em
+    segundo plano (ou para a mesma transação, se a fila estiver cheia).
+    """
     usuario = Usuario.query.filter_by(email=email).first()
     
     # Verificar se o usuário existe
     if not usuario:
-        registrar_log_acesso(None, 'falha_login', ip, f"Usuário não encontrado: {email}")
-        return None, "Usuário não encontrado"
+        return _recusar_login(None, email, ip, 'usuario_nao_encontrado', f"Usuário não encontrado: {email}", "Usuário não encontrado")
     
     # Verificar se o usuário está ativo
     if not usuario.ativo:
-        registrar_log_acesso(usuario.id, 'falha_login', ip, "Usuário inativo")
-        return None, "Usuário inativo"
+        return _recusar_login(usuario.id, email, ip, 'usuario_inativo', "Usuário inativo", "Usuário inativo")
     
     # Verificar senha
-    if not usuario.verificar_senha(senha):
-        registrar_log_acesso(usuario.id, 'falha_login', ip, "Senha incorreta")
-        return None, "Senha incorreta"
+    correta, refazer_hash = verificar_senha(usuario.senha_hash, senha)
+    if not correta:
+        return _recusar_login(usuario.id, email, ip, 'senha_incorreta', "Senha incorreta", "Senha incorreta")
+    
+    if refazer_hash:
+        usuario.senha_hash = gerar_hash_senha(senha)
     
     # Registrar login bem-sucedido
-    registrar_log_acesso(usuario.id, 'login', ip)
+    usuario.ultimo_acesso = datetime.utcnow()
+    _adicionar_log_acesso(usuario.id, 'login', ip)
+    db.session.commit()
+    _falhas_login.limpar(_chave_login(email, ip))
     
     return usuario, "Login bem-sucedido"
 
 
+def _adicionar_log_acesso(usuario_id, acao, ip=None, detalhes=None):
+    """Envia o log ao gravador em segundo plano ou, se não for possível, à sessão atual
+
+    Retorna True quando o log ficou na sessão e depende de um commit de quem chamou.
+    """
+    registro = {
+        'usuario_id': usuario_id,
+        'data_hora': datetime.utcnow(),
+        'ip': ip,
+        'acao': acao,
+        'detalhes': detalhes
+    }
+    if enfileirar_log_acesso(registro):
+        return False
+    
+    db.session.add(LogAcesso(**registro))
+    return True
+
+
 def registrar_log_acesso(usuario_id, acao, ip=None, detalhes=None):
     """Registra um log de acesso"""
-    log = LogAcesso(
-        usuario_id=usuario_id,
-        data_hora=datetime.utcnow(),
-        ip=ip,
-        acao=acao,
-        detalhes=detalhes
-    )
-    
-    db.session.add(log)
-    db.session.commit()
-    
-    return log
+    if _adicionar_log_acesso(usuario_id, acao, ip, detalhes):
+        db.session.commit()
@@ -0,0 +1,195 @@
+from ..models.nfe_models import db, Fornecedor, Insumo
+from ..utils.replica import somente_leitura
+from sqlalchemy import text, bindparam
+import unicodedata
+import re
+
+TIPOS_BUSCA = ('insumo', 'fornecedor')
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+def normalizar_termo(valor):
+    """Remove acentos e pontuação e converte para minúsculas ("Feijão" -> "feijao")"""
+    if not valor:
+        return ''
+
+    texto = unicodedata.normalize('NFKD', str(valor))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+
+    # Termos formados apenas por dígitos e pontuação (CNPJ, códigos) viram só dígitos
+    if re.fullmatch(r'[\d\s./-]+', texto):
+        return re.sub(r'\D', '', texto)
+
+    texto = re.sub(r'[^\w\s]', ' ', texto.lower())
+    return ' '.join(texto.split())
+
+
+def _dialeto():
+    return db.engine.dialect.name
+
+
+def _rowid(tipo, ref_id):
+    # Chave numérica estável para a tabela FTS5 (permite excluir por rowid)
+    return ref_id * len(TIPOS_BUSCA) + TIPOS_BUSCA.index(tipo)
+
+
+def preparar_busca():
+    """Cria a estrutura de busca de acordo com o banco em uso"""
+    if _dialeto() == 'postgresql':
+        db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        db.session.execute(text(
+            "CREATE TABLE IF NOT EXISTS busca_indice ("
+            "tipo VARCHAR(20) NOT NULL, ref_id INTEGER NOT NULL, "
+            "nome VARCHAR(100), codigo VARCHAR(50), texto TEXT NOT NULL, "
+            "PRIMARY KEY (tipo, ref_id))"
+        ))
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_busca_indice_texto_trgm "
+            "ON busca_indice USING GIN (texto gin_trgm_ops)"
+        ))
+    else:
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS busca_indice USING fts5("
+            "tipo UNINDEXED, ref_id UNINDEXED, nome UNINDEXED, codigo UNINDEXED, texto, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+
+    db.session.commit()
+
+
+def _indexar(tipo, ref_id, nome, codigo, termos):
+    texto = ' '.join(normalizar_termo(t) for t in termos if t)
+
+    if _dialeto() == 'postgresql':
+        db.session.execute(text(
+            "INSERT INTO busca_indice (tipo, ref_id, nome, codigo, texto) "
+            "VALUES (:tipo, :ref_id, :nome, :codigo, :texto) "
+            "ON CONFLICT (tipo, ref_id) DO UPDATE SET "
+            "nome = EXCLUDED.nome, codigo = EXCLUDED.codigo, texto = EXCLUDED.texto"
+        ), {'tipo': tipo, 'ref_id': ref_id, 'nome': nome, 'codigo': codigo, 'texto': texto})
+    else:
+        remover_do_indice(tipo, ref_id)
+        db.session.execute(text(
+            "INSERT INTO busca_indice (rowid, tipo, ref_id, nome, codigo, texto) "
+            "VALUES (:rowid, :tipo, :ref_id, :nome, :codigo, :texto)"
+        ), {'rowid': _rowid(tipo, ref_id), 'tipo': tipo, 'ref_id': ref_id,
+            'nome': nome, 'codigo': codigo, 'texto': texto})
+
+
+
+def indexar_em_lote(tipo, registros):
+    """Atualiza o índice de busca de vários registros (ref_id, nome, codigo) com executemany (não faz commit)"""
+    linhas = [
+        {'tipo': tipo, 'ref_id': ref_id, 'rowid': _rowid(tipo, ref_id), 'nome': nome, 'codigo': codigo,
+         'texto': ' '.join(normalizar_termo(t) for t in (nome, codigo) if t)}
+        for ref_id, nome, codigo in registros
+    ]
+    if not linhas:
+        return
+
+    if _dialeto() == 'postgresql':
+        db.session.execute(text(
+            "INSERT INTO busca_indice (tipo, ref_id, nome, codigo, texto) "
+            "VALUES (:tipo, :ref_id, :nome, :codigo, :texto) "
+            "ON CONFLICT (tipo, ref_id) DO UPDATE SET "
+            "nome = EXCLUDED.nome, codigo = EXCLUDED.codigo, texto = EXCLUDED.texto"
+        ), linhas)
+    else:
+        db.session.execute(text("DELETE FROM busca_indice WHERE rowid = :rowid"), linhas)
+        db.session.execute(text(
+            "INSERT INTO busca_indice (rowid, tipo, ref_id, nome, codigo, texto) "
+            "VALUES (:rowid, :tipo, :ref_id, :nome, :codigo, :texto)"
+        ), linhas)
+
+def indexar_insumo(insumo):
+    """Atualiza o índice de busca de um insumo (não faz commit)"""
+    _indexar('insumo', insumo.id, insumo.nome, insumo.codigo, [insumo.nome, insumo.codigo])
+
+
+def indexar_fornecedor(fornecedor):
+    """Atualiza o índice de busca de um fornecedor (não faz commit)"""
+    _indexar('fornecedor', fornecedor.id, fornecedor.nome, fornecedor.cnpj, [fornecedor.nome, fornecedor.cnpj])
+
+
+def remover_do_indice(tipo, ref_id):
+    """Remove um registro do índice de busca (não faz commit)"""
+    if _dialeto() == 'postgresql':
+        db.session.execute(
+            text("DELETE FROM busca_indice WHERE tipo = :tipo AND ref_id = :ref_id"),
+            {'tipo': tipo, 'ref_id': ref_id}
+        )
+    else:
+        db.session.execute(
+            text("DELETE FROM busca_indice WHERE rowid = :rowid"),
+            {'rowid': _rowid(tipo, ref_id)}
+        )
+
+
+def reindexar_busca():
+    """Reconstrói o índice de busca com todos os insumos e fornecedores ativos"""
+    db.session.execute(text("DELETE FROM busca_indice"))
+
+    for insumo in Insumo.query.filter(Insumo.ativo.is_(True)):
+        indexar_insumo(insumo)
+
+    for fornecedor in Fornecedor.query.filter(Fornecedor.ativo.is_(True)):
+        indexar_fornecedor(fornecedor)
+
+    db.session.commit()
+
+
+@somente_leitura
+def buscar(termo, tipos=None, limite=LIMITE_PADRAO):
+    """Busca insumos e fornecedores por nome, código ou CNPJ, ordenados por relevância"""
+    termo = normalizar_termo(termo)
+    if not termo:
+        return []
+
+    tipos = list(tipos or TIPOS_BUSCA)
+    invalidos = [t for t in tipos if t not in TIPOS_BUSCA]
+    if invalidos:
+        raise ValueError(f"Tipo de busca inválido: {', '.join(invalidos)}")
+
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+
+    if _dialeto() == 'postgresql':
+        # Similaridade por trigramas; o prefixo exato tem prioridade na ordenação
+        consulta = text(
+            "SELECT tipo, ref_id, nome, codigo, word_similarity(:termo, texto) AS relevancia "
+            "FROM busca_indice "
+            "WHERE tipo IN :tipos AND (:termo <% texto OR texto LIKE :contem) "
+            "ORDER BY (texto LIKE :prefixo) DESC, relevancia DESC, nome "
+            "LIMIT :limite"
+        ).bindparams(bindparam('tipos', expanding=True))
+        parametros = {
+            'termo': termo,
+            'contem': f"%{termo}%",
+            'prefixo': f"{termo}%",
+            'tipos': tipos,
+            'limite': limite
+        }
+    else:
+        # Cada palavra vira uma consulta de prefixo do FTS5: "feij"* "pre"*
+        expressao = ' '.join('"{}"*'.format(palavra.replace('"', '')) for palavra in termo.split())
+        consulta = text(
+            "SELECT tipo, ref_id, nome, codigo, -bm25(busca_indice) AS relevancia "
+            "FROM busca_indice "
+            "WHERE busca_indice MATCH :expressao AND tipo IN :tipos "
+            "ORDER BY bm25(busca_indice), nome "
+            "LIMIT :limite"
+        ).bindparams(bindparam('tipos', expanding=True))
+        parametros = {'expressao': expressao, 'tipos': tipos, 'limite': limite}
+
+    linhas = db.session.execute(consulta, parametros)
+
+    return [
+        {
+            'tipo': linha.tipo,
+            'id': int(linha.ref_id),
+            'nome': linha.nome,
+            'codigo': linha.codigo,
+            'relevancia': float(linha.relevancia or 0)
+        }
+        for linha in linhas
+    ]
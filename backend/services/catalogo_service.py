@@ -0,0 +1,193 @@
+from ..models.catalogo_models import db, VersaoCatalogo
+from ..models.nfe_models import Fornecedor, Insumo
+from ..utils.metricas import registrar_cache
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+import threading
+import time
+
+CATALOGOS = ('insumos', 'fornecedores')
+
+
+class InsumoResumo:
+    __slots__ = ('id', 'codigo', 'nome', 'unidade_medida')
+
+    def __init__(self, id, codigo, nome, unidade_medida):
+        self.id = id
+        self.codigo = codigo
+        self.nome = nome
+        self.unidade_medida = unidade_medida
+
+
+class FornecedorResumo:
+    __slots__ = ('id', 'cnpj', 'nome')
+
+    def __init__(self, id, cnpj, nome):
+        self.id = id
+        self.cnpj = cnpj
+        self.nome = nome
+
+
+class Catalogo:
+    """Cópia em memória dos insumos e fornecedores ativos, recarregada quando a versão muda"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versoes = None
+        self._verificado_em = 0
+        self.insumos = {}
+        self.insumos_por_codigo = {}
+        self.fornecedores = {}
+        self.fornecedores_por_cnpj = {}
+
+    def invalidar(self):
+        """Força a recarga na próxima consulta"""
+        self._versoes = None
+
+    def _versoes_atuais(self):
+        linhas = db.session.query(VersaoCatalogo.nome, VersaoCatalogo.versao).all()
+        return {nome: versao for nome, versao in linhas}
+
+    def _recarregar(self, versoes):
+        insumos = {}
+        insumos_por_codigo = {}
+        for id, codigo, nome, unidade_medida in db.session.query(
+            Insumo.id, Insumo.codigo, Insumo.nome, Insumo.unidade_medida
+        ).filter(Insumo.ativo.is_(True)):
+            resumo = InsumoResumo(id, codigo, nome, unidade_medida)
+            insumos[id] = resumo
+            if codigo:
+                insumos_por_codigo[codigo] = resumo
+
+        fornecedores = {}
+        fornecedores_por_cnpj = {}
+        for id, cnpj, nome in db.session.query(
+            Fornecedor.id, Fornecedor.cnpj, Fornecedor.nome
+        ).filter(Fornecedor.ativo.is_(True)):
+            resumo = FornecedorResumo(id, cnpj, nome)
+            fornecedores[id] = resumo
+            fornecedores_por_cnpj[cnpj] = resumo
+
+        # Troca os índices de uma vez para que leitores concorrentes nunca vejam um estado parcial
+        self.insumos = insumos
+        self.insumos_por_codigo = insumos_por_codigo
+        self.fornecedores = fornecedores
+        self.fornecedores_por_cnpj = fornecedores_por_cnpj
+        self._versoes = versoes
+
+    def atualizar_se_necessario(self):
+        """Consulta o contador de versões (no máximo uma vez por intervalo) e recarrega se mudou"""
+        intervalo = current_app.config.get('CATALOGO_INTERVALO_VERIFICACAO', 5)
+        agora = time.monotonic()
+
+        if self._versoes is not None and agora - self._verificado_em < intervalo:
+            return
+
+        with self._lock:
+            if self._versoes is not None and agora - self._verificado_em < intervalo:
+                return
+
+            versoes = self._versoes_atuais()
+            if versoes != self._versoes:
+                self._recarregar(versoes)
+            self._verificado_em = agora
+
+
+catalogo = Catalogo()
+
+
+def incrementar_versao_catalogo(nome):
+    """Incrementa a versão de um catálogo na transação atual (não faz commit)
+
+    O catálogo deste processo é invalidado no commit; os outros processos percebem a
+    nova versão na próxima verificação.
+    """
+    if nome not in CATALOGOS:
+        raise ValueError(f"Catálogo inválido: {nome}")
+
+    atualizados = _somar_versao(nome)
+    if not atualizados:
+        # Banco sem as linhas do init-db: outra requisição pode incluir a mesma ao mesmo tempo
+        try:
+            with db.session.begin_nested():
+                db.session.add(VersaoCatalogo(nome=nome, versao=1))
+        except IntegrityError:
+            _somar_versao(nome)
+
+    db.session.info['invalidar_catalogo'] = True
+
+
+def _somar_versao(nome):
+    return VersaoCatalogo.query.filter_by(nome=nome).update(
+        {VersaoCatalogo.versao: VersaoCatalogo.versao + 1},
+        synchronize_session=False
+    )
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_apos_commit(sessao):
+    # Invalidado só depois do commit, para a recarga não ler (ou deixar de ler) a alteração antes da hora
+    if sessao.info.pop('invalidar_catalogo', False):
+        catalogo.invalidar()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_invalidacao(sessao):
+    sessao.info.pop('invalidar_catalogo', None)
+
+
+def criar_versoes_catalogo():
+    """Inclui a linha de versão dos catálogos que ainda não a têm (executado pelo init-db)"""
+    existentes = {nome for (nome,) in db.session.query(VersaoCatalogo.nome)}
+    novas = [VersaoCatalogo(nome=nome, versao=0) for nome in CATALOGOS if nome not in existentes]
+    db.session.add_all(novas)
+    db.session.commit()
+
+    return len(novas)
+
+
+def obter_insumo(insumo_id):
+    """Retorna o resumo de um insumo ativo pelo ID (ou None)"""
+    catalogo.atualizar_se_necessario()
+    resumo = catalogo.insumos.get(int(insumo_id))
+    registrar_cache('catalogo_insumos', resumo is not None)
+    return resumo
+
+
+def obter_insumo_por_codigo(codigo):
+    """Retorna o resumo de um insumo ativo pelo código (ou None)"""
+    catalogo.atualizar_se_necessario()
+    resumo = catalogo.insumos_por_codigo.get(codigo)
+    registrar_cache('catalogo_insumos', resumo is not None)
+    return resumo
+
+
+def obter_fornecedor(fornecedor_id):
+    """Retorna o resumo de um fornecedor ativo pelo ID (ou None)"""
+    catalogo.atualizar_se_necessario()
+    resumo = catalogo.fornecedores.get(int(fornecedor_id))
+    registrar_cache('catalogo_fornecedores', resumo is not None)
+    return resumo
+
+
+def obter_fornecedor_por_cnpj(cnpj):
+    """Retorna o resumo de um fornecedor ativo pelo CNPJ (ou None)"""
+    catalogo.atualizar_se_necessario()
+    resumo = catalogo.fornecedores_por_cnpj.get(cnpj)
+    registrar_cache('catalogo_fornecedores', resumo is not None)
+    return resumo
+
+
+def insumo_existe(insumo_id):
+    """Verifica se o insumo existe, consultando o banco apenas quando não está no catálogo"""
+    if obter_insumo(insumo_id):
+        return True
+    return db.session.query(Insumo.id).filter_by(id=insumo_id).first() is not None
+
+
+def fornecedor_existe(fornecedor_id):
+    """Verifica se o fornecedor existe, consultando o banco apenas quando não está no catálogo"""
+    if obter_fornecedor(fornecedor_id):
+        return True
+    return db.session.query(Fornecedor.id).filter_by(id=fornecedor_id).first() is not None
@@ -1,5 +1,7 @@
 from ..models.contratos_models import db, Contrato, ItemContrato, Cotacao, PlanejamentoCompra
-from ..models.nfe_models import Fornecedor, Insumo
+from .catalogo_service import fornecedor_existe, insumo_existe
+from ..utils.replica import somente_leitura
+from ..utils.esquemas import obter_schema
 from datetime import datetime
 from marshmallow import Schema, fields, ValidationError, validates, validates_schema
 from decimal import Decimal
@@ -9,13 +11,11 @@ class ItemContratoSchema(Schema):
     quantidade = fields.Decimal(required=True)
     valor_unitario = fields.Decimal(required=True)
     valor_total = fields.Decimal(required=True)
-    data_entrega_prevista = fields.Date(allow_none=True)
-    observacoes = fields.String(allow_none=True)
+    cronograma_entrega = fields.String(allow_none=True)
     
     @validates('insumo_id')
     def validate_insumo(self, value):
-        insumo = Insumo.query.get(value)
-        if not insumo:
+        if not insumo_existe(value):
             raise ValidationError(f"Insumo com ID {value} não encontrado")
     
     @validates_schema
@@ -39,8 +39,7 @@ class ContratoSchema(Schema):
     
     @validates('fornecedor_id')
     def validate_fornecedor(self, value):
-        fornecedor = Fornecedor.query.get(value)
-        if not fornecedor:
+        if not fornecedor_existe(value):
             raise ValidationError(f"Fornecedor com ID {value} não encontrado")
     
     @validates('numero')
@@ -68,25 +67,22 @@ class ContratoSchema(Schema):
 
 
 class CotacaoSchema(Schema):
-    data = fields.Date(required=True)
+    data_cotacao = fields.Date(required=True)
+    contrato_id = fields.Integer(allow_none=True)
     fornecedor_id = fields.Integer(required=True)
     insumo_id = fields.Integer(required=True)
-    preco_unitario = fields.Decimal(required=True)
-    quantidade = fields.Decimal(allow_none=True)
-    prazo_entrega = fields.Integer(allow_none=True)
+    valor_unitario = fields.Decimal(required=True)
     validade = fields.Date(allow_none=True)
     observacoes = fields.String(allow_none=True)
     
     @validates('fornecedor_id')
     def validate_fornecedor(self, value):
-        fornecedor = Fornecedor.query.get(value)
-        if not fornecedor:
+        if not fornecedor_existe(value):
             raise ValidationError(f"Fornecedor com ID {value} não encontrado")
     
     @validates('insumo_id')
     def validate_insumo(self, value):
-        insumo = Insumo.query.get(value)
-        if not insumo:
+        if not insumo_existe(value):
             raise ValidationError(f"Insumo com ID {value} não encontrado")
 
 
@@ -101,8 +97,7 @@ class PlanejamentoCompraSchema(Schema):
     
     @validates('insumo_id')
     def validate_insumo(self, value):
-        insumo = Insumo.query.get(value)
-        if not insumo:
+        if not insumo_existe(value):
             raise ValidationError(f"Insumo com ID {value} não encontrado")
     
     @validates_schema
@@ -121,7 +116,7 @@ class PlanejamentoCompraSchema(Schema):
 
 def criar_contrato(data):
     """Cria um novo contrato"""
-    schema = ContratoSchema()
+    schema = obter_schema(ContratoSchema)
     validated_data = schema.load(data)
     
     novo_contrato = Contrato(
@@ -146,8 +141,7 @@ def criar_contrato(data):
                 quantidade=item_data['quantidade'],
                 valor_unitario=item_data['valor_unitario'],
                 valor_total=item_data['valor_total'],
-                data_entrega_prevista=item_data.get('data_entrega_prevista'),
-                observacoes=item_data.get('observacoes')
+                cronograma_entrega=item_data.get('cronograma_entrega')
             )
             db.session.add(item)
     
@@ -162,7 +156,7 @@ def atualizar_contrato(contrato_id, data):
     if not contrato:
         return None
     
-    schema = ContratoSchema(context={'contrato_id': contrato_id})
+    schema = obter_schema(ContratoSchema, contrato_id=contrato_id)
     validated_data = schema.load(data)
     
     # Atualizar campos do contrato
@@ -185,8 +179,7 @@ def atualizar_contrato(contrato_id, data):
                 quantidade=item_data['quantidade'],
                 valor_unitario=item_data['valor_unitario'],
                 valor_total=item_data['valor_total'],
-                data_entrega_prevista=item_data.get('data_entrega_prevista'),
-                observacoes=item_data.get('observacoes')
+                cronograma_entrega=item_data.get('cronograma_entrega')
             )
             db.session.add(item)
     
@@ -195,13 +188,14 @@ def atualizar_contrato(contrato_id, data):
     return contrato
 
 
+@somente_leitura
 def buscar_contrato(contrato_id):
     """Busca um contrato pelo ID"""
     return Contrato.query.get(contrato_id)
 
 
-def listar_contratos(filtros=None):
-    """Lista contratos com filtros opcionais"""
+def consultar_contratos(filtros=None):
+    """Consulta de contratos com os filtros de listar_contratos, sem executar (também usada na exportação)"""
     query = Contrato.query
     
     if filtros:
@@ -223,7 +217,13 @@ def listar_contratos(filtros=None):
     # Ordenar por data de início decrescente
     query = query.order_by(Contrato.data_inicio.desc())
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_contratos(filtros=None):
+    """Lista contratos com filtros opcionais"""
+    return consultar_contratos(filtros).all()
 
 
 def excluir_contrato(contrato_id):
@@ -242,16 +242,15 @@ def excluir_contrato(contrato_id):
 
 def criar_cotacao(data):
     """Cria uma nova cotação"""
-    schema = CotacaoSchema()
+    schema = obter_schema(CotacaoSchema)
     validated_data = schema.load(data)
     
     nova_cotacao = Cotacao(
-        data=validated_data['data'],
+        data_cotacao=validated_data['data_cotacao'],
+        contrato_id=validated_data.get('contrato_id'),
         fornecedor_id=validated_data['fornecedor_id'],
         insumo_id=validated_data['insumo_id'],
-        preco_unitario=validated_data['preco_unitario'],
-        quantidade=validated_data.get('quantidade'),
-        prazo_entrega=validated_data.get('prazo_entrega'),
+        valor_unitario=validated_data['valor_unitario'],
         validade=validated_data.get('validade'),
         observacoes=validated_data.get('observacoes')
     )
@@ -268,7 +267,7 @@ def atualizar_cotacao(cotacao_id, data):
     if not cotacao:
         return None
     
-    schema = CotacaoSchema()
+    schema = obter_schema(CotacaoSchema)
     validated_data = schema.load(data)
     
     # Atualizar campos
@@ -281,13 +280,14 @@ def atualizar_cotacao(cotacao_id, data):
     return cotacao
 
 
+@somente_leitura
 def buscar_cotacao(cotacao_id):
     """Busca uma cotação pelo ID"""
     return Cotacao.query.get(cotacao_id)
 
 
-def listar_cotacoes(filtros=None):
-    """Lista cotações com filtros opcionais"""
+def consultar_cotacoes(filtros=None):
+    """Consulta de cotações com os filtros de listar_cotacoes, sem executar (também usada na exportação)"""
     query = Cotacao.query
     
     if filtros:
@@ -299,14 +299,20 @@ def listar_cotacoes(filtros=None):
         
         if 'data_inicio' in filtros and 'data_fim' in filtros:
             query = query.filter(
-                Cotacao.data >= datetime.strptime(filtros['data_inicio'], '%Y-%m-%d').date(),
-                Cotacao.data <= datetime.strptime(filtros['data_fim'], '%Y-%m-%d').date()
+                Cotacao.data_cotacao >= datetime.strptime(filtros['data_inicio'], '%Y-%m-%d').date(),
+                Cotacao.data_cotacao <= datetime.strptime(filtros['data_fim'], '%Y-%m-%d').date()
             )
     
     # Ordenar por data decrescente
-    query = query.order_by(Cotacao.data.desc())
+    query = query.order_by(Cotacao.data_cotacao.desc())
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_cotacoes(filtros=None):
+    """Lista cotações com filtros opcionais"""
+    return consultar_cotacoes(filtros).all()
 
 
 def excluir_cotacao(cotacao_id):
@@ -323,7 +329,7 @@ def excluir_cotacao(cotacao_id):
 
 def criar_planejamento(data):
     """Cria um novo planejamento de compra"""
-    schema = PlanejamentoCompraSchema()
+    schema = obter_schema(PlanejamentoCompraSchema)
     validated_data = schema.load(data)
     
     # Calcular valor total se não fornecido
@@ -357,7 +363,7 @@ def atualizar_planejamento(planejamento_id, data):
     if not planejamento:
         return None
     
-    schema = PlanejamentoCompraSchema()
+    schema = obter_schema(PlanejamentoCompraSchema)
     validated_data = schema.load(data)
     
     # Calcular valor total se não fornecido
@@ -379,13 +385,14 @@ def atualizar_planejamento(planejamento_id, data):
     return planejamento
 
 
+@somente_leitura
 def buscar_planejamento(planejamento_id):
     """Busca um planejamento de compra pelo ID"""
     return PlanejamentoCompra.query.get(planejamento_id)
 
 
-def listar_planejamentos(filtros=None):
-    """Lista planejamentos de compra com filtros opcionais"""
+def consultar_planejamentos(filtros=None):
+    """Consulta de planejamentos de compra com os filtros de listar_planejamentos, sem executar (também usada na exportação)"""
     query = PlanejamentoCompra.query
     
     if filtros:
@@ -406,7 +413,13 @@ def listar_planejamentos(filtros=None):
     # Ordenar por mês de referência decrescente
     query = query.order_by(PlanejamentoCompra.mes_referencia.desc())
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_planejamentos(filtros=None):
+    """Lista planejamentos de compra com filtros opcionais"""
+    return consultar_planejamentos(filtros).all()
 
 
 def excluir_planejamento(planejamento_id):
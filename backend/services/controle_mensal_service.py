@@ -1,9 +1,19 @@
 from ..models.controle_mensal_models import db, RegistroMensal, EntregaMensal, ProgramacaoFutura
 from ..models.nfe_models import Insumo, NotaFiscal
 from ..models.contratos_models import Contrato
-from datetime import datetime
+from .catalogo_service import insumo_existe
+from .estoque_service import ajustar_estoque_insumos, definir_estoque_insumo
+from ..utils.replica import somente_leitura
+from ..utils.esquemas import obter_schema
+from ..utils.exportacao import iterar_consulta
+from ..utils.metricas import ENTREGAS_REGISTRADAS
+from datetime import date, datetime
 from marshmallow import Schema, fields, ValidationError, validates, validates_schema
 from decimal import Decimal
+from sqlalchemy.exc import IntegrityError
+
+# Número máximo de entregas aceitas em um lote
+LIMITE_LOTE_ENTREGAS = 500
 
 class EntregaMensalSchema(Schema):
     registro_mensal_id = fields.Integer(required=True)
@@ -14,6 +24,7 @@ class EntregaMensalSchema(Schema):
     valor_total = fields.Decimal(required=True)
     status_pagamento = fields.String(allow_none=True)
     observacoes = fields.String(allow_none=True)
+    chave_idempotencia = fields.String(allow_none=True)
     
     @validates('registro_mensal_id')
     def validate_registro_mensal(self, value):
@@ -36,6 +47,19 @@ class EntregaMensalSchema(Schema):
                 raise ValidationError(f"Contrato com ID {value} não encontrado")
 
 
+class EntregaLoteSchema(EntregaMensalSchema):
+    # Em um lote, as referências são verificadas de uma vez (uma consulta por tabela)
+    # em registrar_entregas_em_lote; os métodos abaixo substituem os validadores por item
+    def validate_registro_mensal(self, value):
+        pass
+    
+    def validate_nota_fiscal(self, value):
+        pass
+    
+    def validate_contrato(self, value):
+        pass
+
+
 class RegistroMensalSchema(Schema):
     mes_referencia = fields.Date(required=True)
     insumo_id = fields.Integer(required=True)
@@ -50,32 +74,25 @@ class RegistroMensalSchema(Schema):
     
     @validates('insumo_id')
     def validate_insumo(self, value):
-        insumo = Insumo.query.get(value)
-        if not insumo:
+        if not insumo_existe(value):
             raise ValidationError(f"Insumo com ID {value} não encontrado")
     
     @validates_schema
     def validate_mes_referencia_insumo(self, data, **kwargs):
         # Verificar se já existe um registro para o mesmo mês e insumo
         if 'mes_referencia' in data and 'insumo_id' in data:
-            # Extrair apenas o ano e mês da data
-            mes_ref = datetime.strptime(data['mes_referencia'].strftime('%Y-%m-01'), '%Y-%m-%d').date()
+            mes_ref = data['mes_referencia']
+            query = RegistroMensal.query.filter(
+                RegistroMensal.mes == mes_ref.month,
+                RegistroMensal.ano == mes_ref.year,
+                RegistroMensal.insumo_id == data['insumo_id']
+            )
             
             if self.context.get('registro_id'):
                 # Caso de atualização, ignorar o próprio registro
-                existing = RegistroMensal.query.filter(
-                    db.func.date_trunc('month', RegistroMensal.mes_referencia) == mes_ref,
-                    RegistroMensal.insumo_id == data['insumo_id'],
-                    RegistroMensal.id != self.context.get('registro_id')
-                ).first()
-            else:
-                # Caso de criação
-                existing = RegistroMensal.query.filter(
-                    db.func.date_trunc('month', RegistroMensal.mes_referencia) == mes_ref,
-                    RegistroMensal.insumo_id == data['insumo_id']
-                ).first()
+                query = query.filter(RegistroMensal.id != self.context.get('registro_id'))
                 
-            if existing:
+            if query.first():
                 raise ValidationError(f"Já existe um registro para o mês {mes_ref.strftime('%Y-%m')} e insumo {data['insumo_id']}")
 
 
@@ -90,8 +107,7 @@ class ProgramacaoFuturaSchema(Schema):
     
     @validates('insumo_id')
     def validate_insumo(self, value):
-        insumo = Insumo.query.get(value)
-        if not insumo:
+        if not insumo_existe(value):
             raise ValidationError(f"Insumo com ID {value} não encontrado")
     
     @validates('contrato_id')
@@ -102,9 +118,62 @@ class ProgramacaoFuturaSchema(Schema):
                 raise ValidationError(f"Contrato com ID {value} não encontrado")
 
 
+def _efeito_entrega(entrega_id, registro_id, quantidade, status_pagamento, data_entrega, sinal=1):
+    """Variação que uma entrega causa no registro: (entrega, registro, quantidade entregue, quantidade paga, data)"""
+    # A quantidade gravada é float; str() evita levar o erro de representação para os contadores
+    quantidade = Decimal(str(quantidade)) * sinal
+    return entrega_id, registro_id, quantidade, quantidade if status_pagamento == 'pago' else Decimal(0), data_entrega
+
+
+def _valor_unitario(quantidade, valor_total):
+    """Valor unitário da entrega, a partir do valor total informado"""
+    return float(valor_total) / float(quantidade) if quantidade else 0.0
+
+
+def _insumos_dos_registros(registro_ids):
+    """Insumo de cada registro mensal, em uma única consulta"""
+    return dict(db.session.query(RegistroMensal.id, RegistroMensal.insumo_id).filter(
+        RegistroMensal.id.in_(set(registro_ids))
+    ))
+
+
+def _ajustar_registros(efeitos):
+    """Aplica as variações de entregas aos registros e ao estoque dos insumos (sem commit)
+
+    Os contadores são incrementados pelo banco (col = col + delta) em vez de lidos e
+    regravados pelo Python, então entregas registradas ao mesmo tempo não se perdem.
+    Cada efeito vira uma movimentação da entrega na razão de estoque, na data da entrega.
+    """
+    deltas = {}
+    for _, registro_id, entregue, pago, _ in efeitos:
+        entregue_atual, pago_atual = deltas.get(registro_id, (Decimal(0), Decimal(0)))
+        deltas[registro_id] = (entregue_atual + entregue, pago_atual + pago)
+    
+    deltas = {registro_id: delta for registro_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    
+    # Ordem fixa de IDs para que transações concorrentes travem as linhas na mesma sequência
+    for registro_id in sorted(deltas):
+        entregue, pago = deltas[registro_id]
+        RegistroMensal.query.filter(RegistroMensal.id == registro_id).update({
+            RegistroMensal.quantidade_entregue: RegistroMensal.quantidade_entregue + entregue,
+            RegistroMensal.quantidade_paga: RegistroMensal.quantidade_paga + pago,
+            RegistroMensal.estoque_final: RegistroMensal.estoque_inicial + RegistroMensal.quantidade_entregue + entregue
+        }, synchronize_session=False)
+    
+    # O estoque do insumo varia o mesmo que o estoque final dos seus registros
+    insumos = _insumos_dos_registros(deltas)
+    ajustar_estoque_insumos([
+        (insumos[registro_id], entregue, 'entrega', entrega_id, data_entrega)
+        for entrega_id, registro_id, entregue, _, data_entrega in efeitos
+        if insumos.get(registro_id)
+    ])
+
+
 def criar_registro_mensal(data):
     """Cria um novo registro mensal"""
-    schema = RegistroMensalSchema()
+    schema = obter_schema(RegistroMensalSchema)
     validated_data = schema.load(data)
     
     # Calcular valores padrão se não fornecidos
@@ -122,7 +191,8 @@ def criar_registro_mensal(data):
         validated_data['estoque_final'] = Decimal(validated_data['estoque_inicial']) + Decimal(validated_data['quantidade_entregue'])
     
     novo_registro = RegistroMensal(
-        mes_referencia=validated_data['mes_referencia'],
+        mes=validated_data['mes_referencia'].month,
+        ano=validated_data['mes_referencia'].year,
         insumo_id=validated_data['insumo_id'],
         estoque_inicial=validated_data['estoque_inicial'],
         quantidade_entregue=validated_data['quantidade_entregue'],
@@ -137,35 +207,55 @@ def criar_registro_mensal(data):
     db.session.flush()  # Para obter o ID do registro
     
     # Adicionar entregas do registro mensal
+    # criar_entrega_mensal valida cada entrega de novo: recebe os dados enviados, não os já convertidos
     if 'entregas' in validated_data and isinstance(validated_data['entregas'], list):
-        for entrega_data in validated_data['entregas']:
-            entrega_data['registro_mensal_id'] = novo_registro.id
-            entrega = criar_entrega_mensal(entrega_data, commit=False)
-            
-    db.session.commit()
+        for entrega_data in data['entregas']:
+            entrega = criar_entrega_mensal(dict(entrega_data, registro_mensal_id=novo_registro.id), commit=False)
+    
+    # O estoque atual do insumo passa a ser o estoque final do novo registro (já com as entregas)
+    estoque_final = db.session.query(RegistroMensal.estoque_final).filter(
+        RegistroMensal.id == novo_registro.id
+    ).scalar()
+    # O estoque inicial vale no primeiro dia do mês de referência
+    definir_estoque_insumo(
+        validated_data['insumo_id'], estoque_final, 'registro_mensal', novo_registro.id,
+        date(novo_registro.ano, novo_registro.mes, 1)
+    )
     
-    # Atualizar o estoque atual do insumo
-    insumo = Insumo.query.get(validated_data['insumo_id'])
-    if insumo:
-        insumo.estoque_atual = validated_data['estoque_final']
-        db.session.commit()
+    db.session.commit()
     
     return novo_registro
 
 
 def atualizar_registro_mensal(registro_id, data):
     """Atualiza um registro mensal existente"""
-    registro = RegistroMensal.query.get(registro_id)
+    # Trava o registro até o commit: entregas concorrentes esperam em vez de serem sobrescritas
+    registro = RegistroMensal.query.with_for_update().filter(RegistroMensal.id == registro_id).first()
     if not registro:
         return None
     
-    schema = RegistroMensalSchema(context={'registro_id': registro_id})
+    schema = obter_schema(RegistroMensalSchema, registro_id=registro_id)
     validated_data = schema.load(data)
     
-    # Salvar estoque final antigo para ajustar o estoque do insumo
+    # Remover entregas antigas, desfazendo o efeito de cada uma nos contadores e no estoque
+    _ajustar_registros([
+        _efeito_entrega(
+            entrega.id, registro.id, entrega.quantidade, entrega.status_pagamento, entrega.data_entrega, sinal=-1
+        )
+        for entrega in registro.entregas
+    ])
+    for entrega in registro.entregas:
+        db.session.delete(entrega)
+    # Os contadores foram alterados pelo banco; recarregar antes de aplicar os campos novos
+    db.session.flush()
+    db.session.expire(registro, ['quantidade_entregue', 'quantidade_paga', 'estoque_final'])
+    
+    # Salvar estoque final antigo (já sem as entregas) para ajustar o estoque do insumo
     estoque_final_antigo = registro.estoque_final
     
-    # Atualizar campos do registro
+    # Atualizar campos do registro (o mês de referência é gravado como mês e ano)
+    mes_ref = validated_data.pop('mes_referencia')
+    registro.mes, registro.ano = mes_ref.month, mes_ref.year
     for key, value in validated_data.items():
         if key != 'entregas':
             setattr(registro, key, value)
@@ -176,36 +266,32 @@ def atualizar_registro_mensal(registro_id, data):
     
     registro.atualizado_em = datetime.utcnow()
     
-    # Remover entregas antigas
-    for entrega in registro.entregas:
-        db.session.delete(entrega)
+    # Ajustar o estoque atual do insumo com a diferença entre o estoque final novo e antigo
+    # (as novas entregas abaixo ajustam o próprio efeito)
+    diferenca = Decimal(registro.estoque_final) - Decimal(estoque_final_antigo or 0)
+    ajustar_estoque_insumos([
+        (registro.insumo_id, diferenca, 'registro_mensal', registro.id, date(registro.ano, registro.mes, 1))
+    ])
     
     # Adicionar novas entregas
+    # criar_entrega_mensal valida cada entrega de novo: recebe os dados enviados, não os já convertidos
     if 'entregas' in validated_data and isinstance(validated_data['entregas'], list):
-        for entrega_data in validated_data['entregas']:
-            entrega_data['registro_mensal_id'] = registro.id
-            entrega = criar_entrega_mensal(entrega_data, commit=False)
+        for entrega_data in data['entregas']:
+            entrega = criar_entrega_mensal(dict(entrega_data, registro_mensal_id=registro.id), commit=False)
     
     db.session.commit()
     
-    # Atualizar o estoque atual do insumo
-    insumo = Insumo.query.get(registro.insumo_id)
-    if insumo:
-        # Ajustar o estoque atual do insumo com a diferença entre o estoque final novo e antigo
-        diferenca = Decimal(registro.estoque_final) - Decimal(estoque_final_antigo)
-        insumo.estoque_atual = (Decimal(insumo.estoque_atual) + diferenca) if insumo.estoque_atual else diferenca
-        db.session.commit()
-    
     return registro
 
 
+@somente_leitura
 def buscar_registro_mensal(registro_id):
     """Busca um registro mensal pelo ID"""
     return RegistroMensal.query.get(registro_id)
 
 
-def listar_registros_mensais(filtros=None):
-    """Lista registros mensais com filtros opcionais"""
+def consultar_registros_mensais(filtros=None):
+    """Consulta de registros mensais com os filtros de listar_registros_mensais, sem executar (também usada na exportação)"""
     query = RegistroMensal.query
     
     if filtros:
@@ -218,15 +304,18 @@ def listar_registros_mensais(filtros=None):
         if 'mes_referencia' in filtros:
             # Filtrar pelo mês de referência (formato: YYYY-MM)
             ano, mes = filtros['mes_referencia'].split('-')
-            query = query.filter(
-                db.extract('year', RegistroMensal.mes_referencia) == int(ano),
-                db.extract('month', RegistroMensal.mes_referencia) == int(mes)
-            )
+            query = query.filter(RegistroMensal.ano == int(ano), RegistroMensal.mes == int(mes))
     
     # Ordenar por mês de referência decrescente
-    query = query.order_by(RegistroMensal.mes_referencia.desc())
+    query = query.order_by(RegistroMensal.ano.desc(), RegistroMensal.mes.desc())
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_registros_mensais(filtros=None):
+    """Lista registros mensais com filtros opcionais"""
+    return consultar_registros_mensais(filtros).all()
 
 
 def excluir_registro_mensal(registro_id):
@@ -248,102 +337,198 @@ def excluir_registro_mensal(registro_id):
 
 def criar_entrega_mensal(data, commit=True):
     """Cria uma nova entrega mensal"""
-    schema = EntregaMensalSchema()
+    schema = obter_schema(EntregaMensalSchema)
     validated_data = schema.load(data)
     
+    # Reenvio de uma entrega já registrada
+    chave = validated_data.get('chave_idempotencia')
+    if chave:
+        existente = EntregaMensal.query.filter_by(chave_idempotencia=chave).first()
+        if existente:
+            return existente
+    
+    registro = db.session.get(RegistroMensal, validated_data['registro_mensal_id'])
     nova_entrega = EntregaMensal(
-        registro_mensal_id=validated_data['registro_mensal_id'],
+        registro_mensal_id=registro.id,
+        insumo_id=registro.insumo_id,
         data_entrega=validated_data['data_entrega'],
         quantidade=validated_data['quantidade'],
         nota_fiscal_id=validated_data.get('nota_fiscal_id'),
         contrato_id=validated_data.get('contrato_id'),
+        valor_unitario=_valor_unitario(validated_data['quantidade'], validated_data['valor_total']),
         valor_total=validated_data['valor_total'],
         status_pagamento=validated_data.get('status_pagamento', 'pendente'),
-        observacoes=validated_data.get('observacoes')
+        observacoes=validated_data.get('observacoes'),
+        chave_idempotencia=chave
     )
     
     db.session.add(nova_entrega)
-    
-    # Atualizar o registro mensal
-    registro = RegistroMensal.query.get(validated_data['registro_mensal_id'])
-    if registro:
-        registro.quantidade_entregue = Decimal(registro.quantidade_entregue) + Decimal(validated_data['quantidade'])
-        
-        # Atualizar quantidade paga se o status for 'pago'
-        if validated_data.get('status_pagamento') == 'pago':
-            registro.quantidade_paga = Decimal(registro.quantidade_paga) + Decimal(validated_data['quantidade'])
-        
-        # Recalcular estoque final
-        registro.estoque_final = Decimal(registro.estoque_inicial) + Decimal(registro.quantidade_entregue)
-        
-        # Atualizar o estoque atual do insumo
-        insumo = Insumo.query.get(registro.insumo_id)
-        if insumo:
-            insumo.estoque_atual = registro.estoque_final
+    try:
+        db.session.flush()  # Para obter o ID da entrega
+    except IntegrityError:
+        # Outra requisição gravou a mesma chave ao mesmo tempo: a entrega é a que ela gravou.
+        # Dentro da transação de um registro (commit=False) o erro fica para quem a abriu.
+        if not (chave and commit):
+            raise
+        db.session.rollback()
+        return EntregaMensal.query.filter_by(chave_idempotencia=chave).one()
+    
+    # Atualizar o registro mensal e o estoque do insumo
+    _ajustar_registros([_efeito_entrega(
+        nova_entrega.id, nova_entrega.registro_mensal_id, nova_entrega.quantidade, nova_entrega.status_pagamento,
+        nova_entrega.data_entrega
+    )])
     
     if commit:
         db.session.commit()
     
+    ENTREGAS_REGISTRADAS.inc()
+    
     return nova_entrega
 
 
+def _verificar_referencias(entregas, campo, modelo, descricao, erros):
+    """Verifica com uma única consulta se os IDs referenciados pelas entregas existem"""
+    ids = {entrega[campo] for entrega in entregas if entrega.get(campo) is not None}
+    if not ids:
+        return
+    
+    encontrados = {id for (id,) in db.session.query(modelo.id).filter(modelo.id.in_(ids))}
+    for indice, entrega in enumerate(entregas):
+        if entrega.get(campo) is not None and entrega[campo] not in encontrados:
+            erros.setdefault(indice, {})[campo] = [f"{descricao} com ID {entrega[campo]} não encontrado"]
+
+
+def _aplicar_lote(entregas):
+    """Insere as entregas novas e aplica um único UPDATE por registro e por insumo afetado"""
+    chaves = {entrega['chave_idempotencia'] for entrega in entregas if entrega.get('chave_idempotencia')}
+    existentes = {}
+    if chaves:
+        existentes = {
+            entrega.chave_idempotencia: entrega
+            for entrega in EntregaMensal.query.filter(EntregaMensal.chave_idempotencia.in_(chaves))
+        }
+    
+    insumos = _insumos_dos_registros(entrega['registro_mensal_id'] for entrega in entregas)
+    
+    resultados = []
+    novas = []
+    for entrega_data in entregas:
+        chave = entrega_data.get('chave_idempotencia')
+        if chave and chave in existentes:
+            # Já registrada (em outro envio ou repetida neste lote)
+            resultados.append((existentes[chave], 'duplicada'))
+            continue
+        
+        entrega = EntregaMensal(
+            registro_mensal_id=entrega_data['registro_mensal_id'],
+            insumo_id=insumos[entrega_data['registro_mensal_id']],
+            data_entrega=entrega_data['data_entrega'],
+            quantidade=entrega_data['quantidade'],
+            nota_fiscal_id=entrega_data.get('nota_fiscal_id'),
+            contrato_id=entrega_data.get('contrato_id'),
+            valor_unitario=_valor_unitario(entrega_data['quantidade'], entrega_data['valor_total']),
+            valor_total=entrega_data['valor_total'],
+            status_pagamento=entrega_data.get('status_pagamento', 'pendente'),
+            observacoes=entrega_data.get('observacoes'),
+            chave_idempotencia=chave
+        )
+        novas.append(entrega)
+        resultados.append((entrega, 'criada'))
+        if chave:
+            existentes[chave] = entrega
+    
+    db.session.add_all(novas)
+    db.session.flush()  # Para obter os IDs das entregas
+    
+    # Os efeitos são somados por registro antes de ir ao banco
+    _ajustar_registros([
+        _efeito_entrega(
+            entrega.id, entrega.registro_mensal_id, entrega.quantidade, entrega.status_pagamento, entrega.data_entrega
+        )
+        for entrega in novas
+    ])
+    
+    db.session.commit()
+    
+    return resultados, len(novas)
+
+
+def registrar_entregas_em_lote(entregas):
+    """Registra várias entregas (de um ou mais registros) em uma única transação"""
+    if not isinstance(entregas, list) or not entregas:
+        raise ValidationError("Informe uma lista de entregas")
+    
+    if len(entregas) > LIMITE_LOTE_ENTREGAS:
+        raise ValidationError(f"O lote aceita no máximo {LIMITE_LOTE_ENTREGAS} entregas")
+    
+    schema = obter_schema(EntregaLoteSchema)
+    validated_data = schema.load(entregas, many=True)
+    
+    erros = {}
+    _verificar_referencias(validated_data, 'registro_mensal_id', RegistroMensal, "Registro mensal", erros)
+    _verificar_referencias(validated_data, 'nota_fiscal_id', NotaFiscal, "Nota fiscal", erros)
+    _verificar_referencias(validated_data, 'contrato_id', Contrato, "Contrato", erros)
+    if erros:
+        raise ValidationError(erros)
+    
+    try:
+        resultados, criadas = _aplicar_lote(validated_data)
+    except IntegrityError:
+        # Outra requisição gravou uma das chaves ao mesmo tempo; na nova tentativa ela é tratada como duplicada
+        db.session.rollback()
+        resultados, criadas = _aplicar_lote(validated_data)
+    
+    ENTREGAS_REGISTRADAS.inc(criadas)
+    
+    return [
+        {'indice': indice, 'id': entrega.id, 'status': status}
+        for indice, (entrega, status) in enumerate(resultados)
+    ]
+
+
 def atualizar_entrega_mensal(entrega_id, data):
     """Atualiza uma entrega mensal existente"""
-    entrega = EntregaMensal.query.get(entrega_id)
+    # Trava a entrega para que duas atualizações simultâneas não partam dos mesmos valores antigos
+    entrega = EntregaMensal.query.with_for_update().filter(EntregaMensal.id == entrega_id).first()
     if not entrega:
         return None
     
-    schema = EntregaMensalSchema()
+    schema = obter_schema(EntregaMensalSchema)
     validated_data = schema.load(data)
     
-    # Salvar valores antigos para ajustar o registro mensal
-    quantidade_antiga = entrega.quantidade
-    status_pagamento_antigo = entrega.status_pagamento
+    # Retirar o efeito dos valores antigos do registro mensal
+    efeitos = [_efeito_entrega(
+        entrega.id, entrega.registro_mensal_id, entrega.quantidade, entrega.status_pagamento, entrega.data_entrega, sinal=-1
+    )]
     
     # Atualizar campos da entrega
     for key, value in validated_data.items():
         setattr(entrega, key, value)
     
+    entrega.insumo_id = db.session.get(RegistroMensal, entrega.registro_mensal_id).insumo_id
+    entrega.valor_unitario = _valor_unitario(entrega.quantidade, entrega.valor_total)
     entrega.atualizado_em = datetime.utcnow()
     
-    # Atualizar o registro mensal
-    registro = RegistroMensal.query.get(entrega.registro_mensal_id)
-    if registro:
-        # Ajustar quantidade entregue
-        diferenca_quantidade = Decimal(entrega.quantidade) - Decimal(quantidade_antiga)
-        registro.quantidade_entregue = Decimal(registro.quantidade_entregue) + diferenca_quantidade
-        
-        # Ajustar quantidade paga
-        if status_pagamento_antigo == 'pago' and entrega.status_pagamento != 'pago':
-            # Remover da quantidade paga
-            registro.quantidade_paga = Decimal(registro.quantidade_paga) - Decimal(quantidade_antiga)
-        elif status_pagamento_antigo != 'pago' and entrega.status_pagamento == 'pago':
-            # Adicionar à quantidade paga
-            registro.quantidade_paga = Decimal(registro.quantidade_paga) + Decimal(entrega.quantidade)
-        elif status_pagamento_antigo == 'pago' and entrega.status_pagamento == 'pago':
-            # Ajustar a diferença
-            registro.quantidade_paga = Decimal(registro.quantidade_paga) + diferenca_quantidade
-        
-        # Recalcular estoque final
-        registro.estoque_final = Decimal(registro.estoque_inicial) + Decimal(registro.quantidade_entregue)
-        
-        # Atualizar o estoque atual do insumo
-        insumo = Insumo.query.get(registro.insumo_id)
-        if insumo:
-            insumo.estoque_atual = registro.estoque_final
+    # Aplicar o efeito dos valores novos (possivelmente em outro registro)
+    efeitos.append(_efeito_entrega(
+        entrega.id, entrega.registro_mensal_id, entrega.quantidade, entrega.status_pagamento, entrega.data_entrega
+    ))
+    _ajustar_registros(efeitos)
     
     db.session.commit()
     
     return entrega
 
 
+@somente_leitura
 def buscar_entrega_mensal(entrega_id):
     """Busca uma entrega mensal pelo ID"""
     return EntregaMensal.query.get(entrega_id)
 
 
-def listar_entregas_mensais(registro_id=None):
-    """Lista entregas mensais de um registro específico ou todas"""
+def consultar_entregas_mensais(registro_id=None):
+    """Consulta de entregas mensais com os filtros de listar_entregas_mensais, sem executar (também usada na exportação)"""
     query = EntregaMensal.query
     
     if registro_id:
@@ -352,12 +537,24 @@ def listar_entregas_mensais(registro_id=None):
     # Ordenar por data de entrega decrescente
     query = query.order_by(EntregaMensal.data_entrega.desc())
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_entregas_mensais(registro_id=None):
+    """Lista entregas mensais de um registro específico ou todas"""
+    return consultar_entregas_mensais(registro_id).all()
+
+
+@somente_leitura
+def iterar_entregas_mensais(registro_id=None):
+    """Percorre as entregas de listar_entregas_mensais em blocos, sem carregar todas na memória"""
+    yield from iterar_consulta(consultar_entregas_mensais(registro_id))
 
 
 def excluir_entrega_mensal(entrega_id):
     """Exclui uma entrega mensal"""
-    entrega = EntregaMensal.query.get(entrega_id)
+    entrega = EntregaMensal.query.with_for_update().filter(EntregaMensal.id == entrega_id).first()
     if not entrega:
         return False
     
@@ -366,21 +563,13 @@ def excluir_entrega_mensal(entrega_id):
     if registro and registro.status == 'fechado':
         raise ValueError("Não é possível excluir uma entrega de um registro mensal fechado")
     
-    # Atualizar o registro mensal
+    # Atualizar o registro mensal e o estoque do insumo
     if registro:
-        registro.quantidade_entregue = Decimal(registro.quantidade_entregue) - Decimal(entrega.quantidade)
-        
-        # Atualizar quantidade paga se o status for 'pago'
-        if entrega.status_pagamento == 'pago':
-            registro.quantidade_paga = Decimal(registro.quantidade_paga) - Decimal(entrega.quantidade)
-        
-        # Recalcular estoque final
-        registro.estoque_final = Decimal(registro.estoque_inicial) + Decimal(registro.quantidade_entregue)
-        
-        # Atualizar o estoque atual do insumo
-        insumo = Insumo.query.get(registro.insumo_id)
-        if insumo:
-            insumo.estoque_atual = registro.estoque_final
+        _ajustar_registros([
+            _efeito_entrega(
+                entrega.id, registro.id, entrega.quantidade, entrega.status_pagamento, entrega.data_entrega, sinal=-1
+            )
+        ])
     
     # Excluir a entrega
     db.session.delete(entrega)
@@ -391,7 +580,7 @@ def excluir_entrega_mensal(entrega_id):
 
 def criar_programacao_futura(data):
     """Cria uma nova programação futura"""
-    schema = ProgramacaoFuturaSchema()
+    schema = obter_schema(ProgramacaoFuturaSchema)
     validated_data = schema.load(data)
     
     nova_programacao = ProgramacaoFutura(
@@ -416,7 +605,7 @@ def atualizar_programacao_futura(programacao_id, data):
     if not programacao:
         return None
     
-    schema = ProgramacaoFuturaSchema()
+    schema = obter_schema(ProgramacaoFuturaSchema)
     validated_data = schema.load(data)
     
     # Atualizar campos
@@ -429,13 +618,14 @@ def atualizar_programacao_futura(programacao_id, data):
     return programacao
 
 
+@somente_leitura
 def buscar_programacao_futura(programacao_id):
     """Busca uma programação futura pelo ID"""
     return ProgramacaoFutura.query.get(programacao_id)
 
 
-def listar_programacoes_futuras(filtros=None):
-    """Lista programações futuras com filtros opcionais"""
+def consultar_programacoes_futuras(filtros=None):
+    """Consulta de programações futuras com os filtros de listar_programacoes_futuras, sem executar (também usada na exportação)"""
     query = ProgramacaoFutura.query
     
     if filtros:
@@ -459,7 +649,13 @@ def listar_programacoes_futuras(filtros=None):
     # Ordenar por mês de referência
     query = query.order_by(ProgramacaoFutura.mes_referencia)
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_programacoes_futuras(filtros=None):
+    """Lista programações futuras com filtros opcionais"""
+    return consultar_programacoes_futuras(filtros).all()
 
 
 def excluir_programacao_futura(programacao_id):
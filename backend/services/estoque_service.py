@@ -0,0 +1,266 @@
+from ..models.nfe_models import db, Insumo
+from ..models.estoque_models import MovimentacaoEstoque, SnapshotEstoque
+from ..utils.replica import somente_leitura
+from ..utils.esquemas import obter_schema
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from marshmallow import Schema, fields, ValidationError, validates, post_load
+from sqlalchemy import and_, bindparam, insert, literal, or_, select, update
+
+# Os snapshots só somam movimentações mais antigas que isto, para não deixar de fora
+# uma transação que gravou a movimentação mas ainda não fez commit
+MARGEM_SNAPSHOT = timedelta(minutes=5)
+
+# Número máximo de insumos em uma consulta de estoque por data
+LIMITE_INSUMOS_CONSULTA = 1000
+
+
+class ConsultaEstoqueSchema(Schema):
+    # Data (AAAA-MM-DD, estoque ao fim do dia) ou data e hora ISO
+    data = fields.String(required=True)
+    # IDs separados por vírgula; sem eles, todos os insumos
+    insumo_ids = fields.String(allow_none=True)
+
+    @validates('data')
+    def validate_data(self, value):
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            raise ValidationError("Data inválida; use AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS")
+
+    @validates('insumo_ids')
+    def validate_insumo_ids(self, value):
+        if not value:
+            return
+        ids = value.split(',')
+        if not all(id.strip().isdigit() for id in ids):
+            raise ValidationError("insumo_ids deve ser uma lista de IDs separados por vírgula")
+        if len(ids) > LIMITE_INSUMOS_CONSULTA:
+            raise ValidationError(f"Informe no máximo {LIMITE_INSUMOS_CONSULTA} insumos por consulta")
+
+    @post_load
+    def converter(self, data, **kwargs):
+        if len(data['data']) == 10:
+            data['data'] = datetime.combine(date.fromisoformat(data['data']), time.max)
+        else:
+            data['data'] = datetime.fromisoformat(data['data'])
+        data['insumo_ids'] = sorted({int(id) for id in data['insumo_ids'].split(',')}) if data.get('insumo_ids') else None
+        return data
+
+
+def _data_movimentacao(data):
+    """Data da movimentação na razão a partir de uma data de negócio (date vira o início do dia)"""
+    if data is None or isinstance(data, datetime):
+        return data
+    return datetime.combine(data, time.min)
+
+
+def ajustar_estoque_insumos(movimentacoes):
+    """Registra as movimentações na razão de estoque e soma cada uma ao estoque atual do insumo
+
+    movimentacoes é uma lista de (insumo_id, quantidade, origem, origem_id) ou
+    (insumo_id, quantidade, origem, origem_id, data), em que data é a data de negócio da
+    movimentação (data da entrega, da nota...); sem ela, vale o momento da gravação. Roda
+    na transação atual, sem commit.
+
+    O incremento é feito pelo próprio banco (estoque_atual = estoque_atual + delta), então
+    requisições concorrentes não sobrescrevem o ajuste uma da outra. Os insumos são
+    atualizados em ordem de ID para que transações concorrentes travem as linhas na
+    mesma sequência.
+    """
+    agora = datetime.now()
+    linhas = []
+    deltas = {}
+    for insumo_id, quantidade, origem, origem_id, *data in movimentacoes:
+        quantidade = Decimal(quantidade)
+        if not quantidade:
+            continue
+        linhas.append({
+            'insumo_id': insumo_id,
+            'data': _data_movimentacao(data[0]) if data and data[0] else agora,
+            'registrado_em': agora,
+            'origem': origem,
+            'origem_id': origem_id,
+            'quantidade': quantidade
+        })
+        deltas[insumo_id] = deltas.get(insumo_id, Decimal(0)) + quantidade
+
+    if not linhas:
+        return
+
+    db.session.execute(insert(MovimentacaoEstoque), linhas)
+
+    # Um único UPDATE executado para todos os insumos (executemany), na ordem dos IDs
+    tabela = Insumo.__table__
+    db.session.execute(
+        update(tabela).where(tabela.c.id == bindparam('b_id')).values(
+            estoque_atual=db.func.coalesce(tabela.c.estoque_atual, 0) + bindparam('b_delta', type_=tabela.c.estoque_atual.type)
+        ),
+        [{'b_id': insumo_id, 'b_delta': deltas[insumo_id]} for insumo_id in sorted(deltas)]
+    )
+
+
+def definir_estoque_insumo(insumo_id, quantidade, origem, origem_id=None, data=None):
+    """Leva o estoque atual do insumo a um valor, registrando a diferença na razão (sem commit)"""
+    # Trava o insumo para que a diferença seja calculada sobre o valor que será substituído
+    atual = db.session.query(Insumo.estoque_atual).filter(Insumo.id == insumo_id).with_for_update().scalar()
+    ajustar_estoque_insumos([(insumo_id, Decimal(quantidade) - Decimal(atual or 0), origem, origem_id, data)])
+
+
+def _posterior_ao_snapshot(data_snapshot):
+    """Movimentações que o snapshot da data não somou: com data ou gravação posterior a ela
+
+    Uma movimentação com data retroativa gravada depois do snapshot não está nele, mesmo
+    que a sua data seja anterior.
+    """
+    registrado_em = db.func.coalesce(MovimentacaoEstoque.registrado_em, MovimentacaoEstoque.data)
+    return or_(
+        data_snapshot.is_(None),
+        MovimentacaoEstoque.data > data_snapshot,
+        registrado_em > data_snapshot
+    )
+
+
+def _consulta_estoque_em(data=None, insumo_ids=None):
+    """Estoque por insumo até a data: último snapshot anterior + movimentações da data que ele não somou"""
+    snapshots = select(
+        SnapshotEstoque.insumo_id,
+        SnapshotEstoque.data,
+        SnapshotEstoque.quantidade,
+        db.func.row_number().over(
+            partition_by=SnapshotEstoque.insumo_id, order_by=SnapshotEstoque.data.desc()
+        ).label('ordem')
+    )
+    if data is not None:
+        snapshots = snapshots.where(SnapshotEstoque.data <= data)
+    if insumo_ids is not None:
+        snapshots = snapshots.where(SnapshotEstoque.insumo_id.in_(insumo_ids))
+    snapshot = snapshots.subquery()
+
+    condicao_movimentacao = and_(
+        MovimentacaoEstoque.insumo_id == Insumo.id,
+        _posterior_ao_snapshot(snapshot.c.data)
+    )
+    if data is not None:
+        condicao_movimentacao = and_(condicao_movimentacao, MovimentacaoEstoque.data <= data)
+
+    consulta = select(
+        Insumo.id,
+        db.func.coalesce(snapshot.c.quantidade, 0) + db.func.coalesce(db.func.sum(MovimentacaoEstoque.quantidade), 0)
+    ).select_from(Insumo).outerjoin(
+        snapshot, and_(snapshot.c.insumo_id == Insumo.id, snapshot.c.ordem == 1)
+    ).outerjoin(
+        MovimentacaoEstoque, condicao_movimentacao
+    ).group_by(Insumo.id, snapshot.c.quantidade)
+    if insumo_ids is not None:
+        consulta = consulta.where(Insumo.id.in_(insumo_ids))
+
+    return {insumo_id: Decimal(quantidade) for insumo_id, quantidade in db.session.execute(consulta)}
+
+
+@somente_leitura
+def calcular_estoque_em(data, insumo_ids=None):
+    """Estoque de cada insumo (ou dos informados) em uma data, a partir da razão de estoque
+
+    Soma as movimentações pela data de negócio (entrega, nota, mês do registro), não pela
+    data em que foram gravadas.
+    """
+    return _consulta_estoque_em(data, insumo_ids)
+
+
+def consultar_estoque_em(parametros):
+    """Estoque dos insumos em uma data a partir dos parâmetros da requisição (data, insumo_ids)"""
+    schema = obter_schema(ConsultaEstoqueSchema)
+    validated_data = schema.load(parametros)
+
+    estoques = calcular_estoque_em(validated_data['data'], validated_data['insumo_ids'])
+
+    return {
+        'data': validated_data['data'].isoformat(),
+        'estoques': [
+            {'insumo_id': insumo_id, 'estoque': float(estoque)}
+            for insumo_id, estoque in sorted(estoques.items())
+        ]
+    }
+
+
+def gerar_snapshots_estoque():
+    """Grava um snapshot para cada insumo com movimentações desde o último (executar periodicamente)"""
+    corte = datetime.now() - MARGEM_SNAPSHOT
+
+    ultimo = select(
+        SnapshotEstoque.insumo_id, db.func.max(SnapshotEstoque.data).label('data')
+    ).group_by(SnapshotEstoque.insumo_id).subquery()
+
+    novos = select(
+        MovimentacaoEstoque.insumo_id,
+        literal(corte, type_=db.DateTime),
+        db.func.coalesce(SnapshotEstoque.quantidade, 0) + db.func.sum(MovimentacaoEstoque.quantidade)
+    ).select_from(MovimentacaoEstoque).outerjoin(
+        ultimo, ultimo.c.insumo_id == MovimentacaoEstoque.insumo_id
+    ).outerjoin(
+        SnapshotEstoque, and_(SnapshotEstoque.insumo_id == ultimo.c.insumo_id, SnapshotEstoque.data == ultimo.c.data)
+    ).where(
+        MovimentacaoEstoque.data <= corte,
+        db.func.coalesce(MovimentacaoEstoque.registrado_em, MovimentacaoEstoque.data) <= corte,
+        _posterior_ao_snapshot(ultimo.c.data)
+    ).group_by(MovimentacaoEstoque.insumo_id, SnapshotEstoque.quantidade)
+
+    resultado = db.session.execute(
+        insert(SnapshotEstoque).from_select(['insumo_id', 'data', 'quantidade'], novos)
+    )
+    db.session.commit()
+
+    return resultado.rowcount
+
+
+def abrir_razao_estoque():
+    """Registra como movimentação de abertura o estoque atual dos insumos que ainda não têm movimentações"""
+    sem_movimentacao = ~select(MovimentacaoEstoque.id).where(
+        MovimentacaoEstoque.insumo_id == Insumo.id
+    ).exists()
+
+    agora = datetime.now()
+    abertura = select(
+        Insumo.id,
+        literal(agora, type_=db.DateTime),
+        literal(agora, type_=db.DateTime),
+        literal('abertura'),
+        Insumo.estoque_atual
+    ).where(
+        Insumo.estoque_atual.is_not(None),
+        Insumo.estoque_atual != 0,
+        sem_movimentacao
+    )
+
+    resultado = db.session.execute(
+        insert(MovimentacaoEstoque).from_select(['insumo_id', 'data', 'registrado_em', 'origem', 'quantidade'], abertura)
+    )
+    db.session.commit()
+
+    return resultado.rowcount
+
+
+def reconstruir_estoque_atual():
+    """Recalcula o estoque atual de todos os insumos a partir da razão e corrige os divergentes
+
+    Movimentações gravadas durante a execução podem ser sobrescritas: rodar fora do horário de uso.
+    """
+    calculado = _consulta_estoque_em()
+    atual = dict(db.session.query(Insumo.id, Insumo.estoque_atual))
+
+    divergentes = [
+        {'b_id': insumo_id, 'b_quantidade': quantidade}
+        for insumo_id, quantidade in calculado.items()
+        if Decimal(atual.get(insumo_id) or 0) != quantidade
+    ]
+    if divergentes:
+        db.session.execute(
+            update(Insumo.__table__).where(Insumo.__table__.c.id == bindparam('b_id')).values(
+                estoque_atual=bindparam('b_quantidade')
+            ),
+            divergentes
+        )
+    db.session.commit()
+
+    return len(divergentes)
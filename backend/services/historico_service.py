@@ -0,0 +1,224 @@
+from ..models.auth_models import db, LogAcesso
+from ..models.estoque_models import MovimentacaoEstoque
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import select, table, column, text
+from sqlalchemy.schema import AddConstraint
+import csv
+import gzip
+import os
+
+# Tabelas de histórico (só recebem inclusões), particionadas por mês pela coluna de data.
+# "retencao" é a configuração com os meses mantidos no banco; sem ela, nada é arquivado
+# (a razão de estoque é a origem do estoque por data e fica inteira no banco).
+TABELAS_HISTORICO = {
+    'logs_acesso': {'modelo': LogAcesso, 'coluna': 'data_hora', 'retencao': 'LOG_ACESSO_RETENCAO_MESES'},
+    'movimentacoes_estoque': {'modelo': MovimentacaoEstoque, 'coluna': 'data', 'retencao': None},
+}
+
+# Partições criadas além do mês atual, para que as inclusões nunca fiquem sem partição
+MESES_ANTECIPADOS = 2
+
+
+def _somar_meses(mes, quantidade):
+    indice = mes.year * 12 + mes.month - 1 + quantidade
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _nome_particao(tabela, mes):
+    return f"{tabela}_{mes:%Y%m}"
+
+
+def _mes_da_particao(tabela, nome):
+    sufixo = nome[len(tabela) + 1:]
+    if len(sufixo) != 6 or not sufixo.isdigit():
+        return None
+    return date(int(sufixo[:4]), int(sufixo[4:]), 1)
+
+
+def _exportar(consulta, colunas, destino):
+    """Grava as linhas em CSV compactado (em um arquivo temporário renomeado no fim)"""
+    temporario = destino + '.tmp'
+    with gzip.open(temporario, 'wt', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(colunas)
+        for linha in db.session.execute(consulta.execution_options(stream_results=True, yield_per=1000)):
+            escritor.writerow(linha)
+    os.replace(temporario, destino)
+
+
+# PostgreSQL: tabela particionada por RANGE na coluna de data
+
+def _particionada(tabela):
+    return db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :tabela"
+    ), {'tabela': tabela}).first() is not None
+
+
+def _criar_particao(tabela, mes):
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_nome_particao(tabela, mes)} PARTITION OF {tabela} "
+        f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{_somar_meses(mes, 1).isoformat()}')"
+    ))
+
+
+def _particionar_postgresql(tabela, coluna, modelo, ate):
+    """Converte a tabela comum em particionada por mês, copiando as linhas (executar uma vez)
+
+    A chave primária passa a ser (id, coluna de data), como o PostgreSQL exige em tabelas
+    particionadas; o ID continua vindo da mesma sequência.
+    """
+    antiga = f"{tabela}_antiga"
+    sequencia = db.session.execute(text(f"SELECT pg_get_serial_sequence('{tabela}', 'id')")).scalar()
+    primeiro = db.session.execute(text(f"SELECT min({coluna}) FROM {tabela}")).scalar()
+
+    db.session.execute(text(f"ALTER TABLE {tabela} RENAME TO {antiga}"))
+    db.session.execute(text(
+        f"CREATE TABLE {tabela} (LIKE {antiga} INCLUDING DEFAULTS) PARTITION BY RANGE ({coluna})"
+    ))
+    # Linhas fora das partições mensais (datas muito antigas ou futuras) não são recusadas
+    db.session.execute(text(f"CREATE TABLE {tabela}_padrao PARTITION OF {tabela} DEFAULT"))
+
+    mes = date(primeiro.year, primeiro.month, 1) if primeiro else ate
+    while mes <= ate:
+        _criar_particao(tabela, mes)
+        mes = _somar_meses(mes, 1)
+
+    db.session.execute(text(f"INSERT INTO {tabela} SELECT * FROM {antiga}"))
+    # A sequência pertence à coluna da tabela antiga e seria removida junto com ela
+    if sequencia:
+        db.session.execute(text(f"ALTER SEQUENCE {sequencia} OWNED BY {tabela}.id"))
+    db.session.execute(text(f"DROP TABLE {antiga}"))
+
+    # Chave primária, índices e chaves estrangeiras (os nomes só ficam livres depois do DROP)
+    db.session.execute(text(f"ALTER TABLE {tabela} ADD PRIMARY KEY (id, {coluna})"))
+    conexao = db.session.connection()
+    for indice in modelo.__table__.indexes:
+        indice.create(conexao)
+    for restricao in modelo.__table__.foreign_key_constraints:
+        conexao.execute(AddConstraint(restricao))
+
+
+def _particoes_postgresql(tabela):
+    nomes = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :tabela"
+    ), {'tabela': tabela}).scalars()
+    return {nome: _mes_da_particao(tabela, nome) for nome in nomes if _mes_da_particao(tabela, nome)}
+
+
+def _manter_postgresql(tabela, config, mes_atual, limite, diretorio):
+    coluna, modelo = config['coluna'], config['modelo']
+    ate = _somar_meses(mes_atual, MESES_ANTECIPADOS)
+    resultado = {'particionada_agora': False, 'arquivadas': []}
+
+    if not _particionada(tabela):
+        _particionar_postgresql(tabela, coluna, modelo, ate)
+        db.session.commit()
+        resultado['particionada_agora'] = True
+
+    mes = mes_atual
+    while mes <= ate:
+        _criar_particao(tabela, mes)
+        mes = _somar_meses(mes, 1)
+    db.session.commit()
+
+    if limite is None:
+        return resultado
+
+    for nome, mes in sorted(_particoes_postgresql(tabela).items()):
+        if mes >= limite:
+            continue
+        destino = os.path.join(diretorio, f"{nome}.csv.gz")
+        colunas = [c.name for c in modelo.__table__.columns]
+        _exportar(select(*[column(c) for c in colunas]).select_from(table(nome)), colunas, destino)
+        db.session.execute(text(f"ALTER TABLE {tabela} DETACH PARTITION {nome}"))
+        db.session.execute(text(f"DROP TABLE {nome}"))
+        db.session.commit()
+        resultado['arquivadas'].append(destino)
+
+    return resultado
+
+
+# SQLite (desenvolvimento): os meses encerrados saem da tabela principal para tabelas <tabela>_AAAAMM
+
+def _particoes_sqlite(tabela):
+    nomes = db.session.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefixo"
+    ), {'prefixo': f"{tabela}_%"}).scalars()
+    return {nome: _mes_da_particao(tabela, nome) for nome in nomes if _mes_da_particao(tabela, nome)}
+
+
+def _manter_sqlite(tabela, config, mes_atual, limite, diretorio):
+    coluna, modelo = config['coluna'], config['modelo']
+    resultado = {'rotacionadas': [], 'arquivadas': []}
+
+    # Sem retenção as linhas ficam na tabela principal, que é a única consultada
+    if not config['retencao']:
+        return resultado
+
+    meses = db.session.execute(text(
+        f"SELECT DISTINCT strftime('%Y-%m', {coluna}) FROM {tabela} WHERE {coluna} < :inicio"
+    ), {'inicio': datetime.combine(mes_atual, datetime.min.time())}).scalars().all()
+
+    for valor in sorted(meses):
+        mes = date(int(valor[:4]), int(valor[5:7]), 1)
+        nome = _nome_particao(tabela, mes)
+        periodo = {
+            'inicio': datetime.combine(mes, datetime.min.time()),
+            'fim': datetime.combine(_somar_meses(mes, 1), datetime.min.time())
+        }
+        db.session.execute(text(f"CREATE TABLE IF NOT EXISTS {nome} AS SELECT * FROM {tabela} WHERE 0"))
+        db.session.execute(text(
+            f"INSERT INTO {nome} SELECT * FROM {tabela} WHERE {coluna} >= :inicio AND {coluna} < :fim"
+        ), periodo)
+        db.session.execute(text(f"DELETE FROM {tabela} WHERE {coluna} >= :inicio AND {coluna} < :fim"), periodo)
+        db.session.commit()
+        resultado['rotacionadas'].append(nome)
+
+    if limite is None:
+        return resultado
+
+    for nome, mes in sorted(_particoes_sqlite(tabela).items()):
+        if mes >= limite:
+            continue
+        destino = os.path.join(diretorio, f"{nome}.csv.gz")
+        colunas = [c.name for c in modelo.__table__.columns]
+        _exportar(select(*[column(c) for c in colunas]).select_from(table(nome)), colunas, destino)
+        db.session.execute(text(f"DROP TABLE {nome}"))
+        db.session.commit()
+        resultado['arquivadas'].append(destino)
+
+    return resultado
+
+
+def manter_historico(arquivar=True, hoje=None):
+    """Particiona as tabelas de histórico por mês e arquiva os meses além da retenção (executar periodicamente)
+
+    No PostgreSQL, converte cada tabela em particionada na primeira execução, cria as
+    partições do mês atual e dos próximos MESES_ANTECIPADOS e, para as tabelas com
+    retenção, exporta as partições antigas para HISTORICO_DIR (<partição>.csv.gz) antes de
+    removê-las. No SQLite, os meses encerrados vão para tabelas <tabela>_AAAAMM, que são
+    arquivadas da mesma forma.
+    """
+    hoje = hoje or date.today()
+    mes_atual = date(hoje.year, hoje.month, 1)
+    diretorio = current_app.config['HISTORICO_DIR']
+    postgresql = db.engine.dialect.name == 'postgresql'
+
+    resultados = {}
+    for tabela, config in TABELAS_HISTORICO.items():
+        meses = current_app.config[config['retencao']] if config['retencao'] else None
+        limite = _somar_meses(mes_atual, -meses) if arquivar and meses else None
+        if limite:
+            os.makedirs(diretorio, exist_ok=True)
+
+        manter = _manter_postgresql if postgresql else _manter_sqlite
+        try:
+            resultados[tabela] = manter(tabela, config, mes_atual, limite, diretorio)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return resultados
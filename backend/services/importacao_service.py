@@ -0,0 +1,246 @@
+from ..models.nfe_models import db, Fornecedor, Insumo
+from .nfe_service import FornecedorSchema, InsumoSchema
+from .busca_service import indexar_em_lote
+from .catalogo_service import incrementar_versao_catalogo
+from .estoque_service import ajustar_estoque_insumos
+from ..utils.esquemas import obter_schema
+from datetime import datetime
+from decimal import Decimal
+from marshmallow import ValidationError
+from sqlalchemy import Column, MetaData, Table, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+import csv
+import io
+import itertools
+
+# Linhas gravadas por vez (um COPY/executemany por lote)
+TAMANHO_LOTE_IMPORTACAO = 1000
+
+# Erros de linha devolvidos na resposta (o total é sempre informado)
+LIMITE_ERROS_IMPORTACAO = 500
+
+
+class FornecedorImportacaoSchema(FornecedorSchema):
+    # O CNPJ define se a linha cria ou atualiza o fornecedor; duplicidades dentro do
+    # arquivo são verificadas em importar_csv contra o conjunto carregado no início
+    def validate_cnpj(self, value):
+        pass
+
+
+class InsumoImportacaoSchema(InsumoSchema):
+    # Mesmo tratamento do CNPJ, pelo código do insumo
+    def validate_codigo(self, value):
+        pass
+
+
+# "padroes" são os valores das colunas ausentes ou vazias no arquivo ao criar (não alteram registros existentes)
+IMPORTACOES = {
+    'fornecedores': {
+        'modelo': Fornecedor, 'schema': FornecedorImportacaoSchema, 'chave': 'cnpj', 'busca': 'fornecedor',
+        'padroes': {'ativo': True}
+    },
+    'insumos': {
+        'modelo': Insumo, 'schema': InsumoImportacaoSchema, 'chave': 'codigo', 'busca': 'insumo',
+        'padroes': {'ativo': True, 'estoque_atual': 0}
+    },
+}
+
+# Colunas preenchidas pelo banco ou pela importação, nunca pelo arquivo
+COLUNAS_CONTROLE = ('id', 'criado_em', 'atualizado_em')
+
+
+def _ler_csv(arquivo):
+    """Lê o CSV (separado por vírgula ou ponto e vírgula) linha a linha: (número da linha, dicionário)"""
+    cabecalho = arquivo.readline()
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    leitor = csv.DictReader(itertools.chain([cabecalho], arquivo), delimiter=delimitador)
+
+    colunas = [coluna.strip() for coluna in (leitor.fieldnames or [])]
+    leitor.fieldnames = colunas
+
+    return colunas, ((leitor.line_num, linha) for linha in leitor)
+
+
+def _colunas_importaveis(config, schema):
+    """Colunas que o arquivo pode trazer: as da tabela que o schema também aceita"""
+    tabela = config['modelo'].__table__
+    return [
+        coluna.name for coluna in tabela.columns
+        if coluna.name not in COLUNAS_CONTROLE and coluna.name in schema.load_fields
+    ]
+
+
+def _atualizacoes(tabela, comando, colunas_atualizadas):
+    # Célula vazia (NULL no lote) mantém o valor já cadastrado em vez de apagá-lo
+    return {
+        coluna: func.coalesce(comando.excluded[coluna], tabela.c[coluna]) if coluna != 'atualizado_em'
+        else comando.excluded[coluna]
+        for coluna in colunas_atualizadas
+    }
+
+
+def _gravar_postgresql(tabela, colunas, chave, colunas_atualizadas, linhas):
+    """COPY do lote para uma tabela temporária e INSERT ... ON CONFLICT a partir dela"""
+    conexao = db.session.connection()
+    staging = Table(
+        f"importacao_{tabela.name}", MetaData(),
+        *[Column(coluna, tabela.c[coluna].type) for coluna in colunas],
+        prefixes=['TEMPORARY'], postgresql_on_commit='DROP'
+    )
+    staging.create(conexao, checkfirst=True)
+    conexao.execute(text(f"TRUNCATE {staging.name}"))
+
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for linha in linhas:
+        # Campo vazio sem aspas é NULL no COPY em formato CSV
+        escritor.writerow(['' if linha[coluna] is None else linha[coluna] for coluna in colunas])
+    buffer.seek(0)
+
+    cursor = conexao.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {staging.name} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+    comando = postgresql.insert(tabela).from_select(colunas, select(*staging.c))
+    comando = comando.on_conflict_do_update(
+        index_elements=[chave],
+        set_=_atualizacoes(tabela, comando, colunas_atualizadas)
+    )
+    db.session.execute(comando)
+
+
+def _gravar_sqlite(tabela, colunas, chave, colunas_atualizadas, linhas):
+    """INSERT ... ON CONFLICT com executemany"""
+    comando = sqlite.insert(tabela)
+    comando = comando.on_conflict_do_update(
+        index_elements=[chave],
+        set_=_atualizacoes(tabela, comando, colunas_atualizadas)
+    )
+    db.session.execute(comando, linhas)
+
+
+def _gravar_lote(config, colunas, colunas_atualizadas, linhas, estoques):
+    modelo = config['modelo']
+    tabela = modelo.__table__
+    chave = config['chave']
+
+    if db.engine.dialect.name == 'postgresql':
+        _gravar_postgresql(tabela, colunas, chave, colunas_atualizadas, linhas)
+    else:
+        _gravar_sqlite(tabela, colunas, chave, colunas_atualizadas, linhas)
+
+    # IDs gravados, para o índice de busca e o estoque
+    chaves = [linha[chave] for linha in linhas]
+    campos = [modelo.id, modelo.nome, getattr(modelo, chave)]
+    if estoques:
+        campos.append(modelo.estoque_atual)
+    gravados = db.session.query(*campos).filter(getattr(modelo, chave).in_(chaves)).all()
+
+    indexar_em_lote(config['busca'], [(linha[0], linha[1], linha[2]) for linha in gravados])
+
+    # O estoque informado entra na razão como a diferença para o estoque atual
+    if estoques:
+        ajustar_estoque_insumos([
+            (linha[0], estoques[linha[2]] - Decimal(linha[3] or 0), 'importacao', None)
+            for linha in gravados
+            if linha[2] in estoques
+        ])
+
+
+def importar_csv(tipo, arquivo):
+    """Cria ou atualiza fornecedores/insumos a partir de um CSV (arquivo de texto aberto)
+
+    A linha é identificada pelo CNPJ (fornecedores) ou código (insumos): se já existe,
+    os campos preenchidos no arquivo são atualizados (células vazias mantêm o valor). Linhas inválidas são ignoradas e
+    devolvidas em "erros"; as demais são gravadas em uma única transação.
+    """
+    if tipo not in IMPORTACOES:
+        raise ValidationError(f"Tipo de importação inválido: {tipo}")
+
+    config = IMPORTACOES[tipo]
+    modelo = config['modelo']
+    chave = config['chave']
+    schema = obter_schema(config['schema'])
+
+    colunas_arquivo, linhas = _ler_csv(arquivo)
+    importaveis = _colunas_importaveis(config, schema)
+    desconhecidas = [coluna for coluna in colunas_arquivo if coluna not in importaveis]
+    faltando = [nome for nome, campo in schema.load_fields.items() if campo.required and nome not in colunas_arquivo]
+    if desconhecidas or faltando:
+        erros = {}
+        if desconhecidas:
+            erros['colunas_desconhecidas'] = desconhecidas
+        if faltando:
+            erros['colunas_obrigatorias'] = faltando
+        raise ValidationError(erros)
+
+    # Colunas gravadas: as do arquivo (o estoque vai pela razão de estoque) e os controles
+    colunas = [coluna for coluna in colunas_arquivo if coluna != 'estoque_atual']
+    colunas_atualizadas = [coluna for coluna in colunas if coluna != chave] + ['atualizado_em']
+    padroes = {coluna: valor for coluna, valor in config['padroes'].items() if coluna not in colunas}
+    colunas += list(padroes) + ['criado_em', 'atualizado_em']
+
+    # Chaves já cadastradas (inclusive inativas), carregadas de uma vez
+    existentes = {valor for (valor,) in db.session.query(getattr(modelo, chave))}
+    vistas = {}
+
+    criados = atualizados = total_erros = 0
+    erros = []
+    lote = []
+    estoques = {}
+    agora = datetime.now()
+
+    for numero, linha in linhas:
+        dados = {coluna: valor.strip() for coluna, valor in linha.items() if coluna and valor and valor.strip()}
+        try:
+            validated_data = schema.load(dados)
+            valor_chave = validated_data[chave]
+            if valor_chave in vistas:
+                raise ValidationError({chave: [f"Repetido no arquivo (linha {vistas[valor_chave]})"]})
+        except ValidationError as e:
+            total_erros += 1
+            if len(erros) < LIMITE_ERROS_IMPORTACAO:
+                erros.append({'linha': numero, 'erros': e.messages})
+            continue
+
+        vistas[valor_chave] = numero
+        if valor_chave in existentes:
+            atualizados += 1
+        else:
+            criados += 1
+
+        if validated_data.get('estoque_atual') is not None:
+            estoques[valor_chave] = Decimal(validated_data['estoque_atual'])
+
+        registro = {coluna: validated_data.get(coluna) for coluna in colunas}
+        registro.update(padroes)
+        if valor_chave not in existentes:
+            # Em um cadastro novo, a célula vazia recebe o padrão da coluna
+            for coluna, valor in config['padroes'].items():
+                if coluna in registro and registro[coluna] is None:
+                    registro[coluna] = valor
+        registro['criado_em'] = registro['atualizado_em'] = agora
+        lote.append(registro)
+
+        if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+            _gravar_lote(config, colunas, colunas_atualizadas, lote, estoques)
+            lote = []
+            estoques = {}
+
+    if lote:
+        _gravar_lote(config, colunas, colunas_atualizadas, lote, estoques)
+
+    if criados or atualizados:
+        incrementar_versao_catalogo(tipo)
+    db.session.commit()
+
+    return {
+        'criados': criados,
+        'atualizados': atualizados,
+        'total_erros': total_erros,
+        'erros': erros
+    }
@@ -0,0 +1,127 @@
+from ..models.auth_models import db, LogAcesso
+from ..utils.metricas import LOGS_ACESSO_PENDENTES, LOGS_ACESSO_GRAVADOS, LOGS_ACESSO_FILA_CHEIA, LOGS_ACESSO_PERDIDOS
+from flask import current_app
+from sqlalchemy import insert
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger('backend.logs_acesso')
+
+# Tempo máximo de espera pela gravação dos logs pendentes ao encerrar o processo, em segundos
+ESPERA_ENCERRAMENTO = 10
+
+
+class GravadorLogsAcesso:
+    """Fila em memória de logs de acesso, gravados em lotes por uma thread do próprio processo
+
+    O lote é gravado com um único INSERT ao juntar LOG_ACESSO_LOTE logs ou depois de
+    LOG_ACESSO_INTERVALO segundos. A fila tem tamanho máximo (LOG_ACESSO_FILA): quando
+    está cheia, enfileirar devolve False e quem chamou grava o log na própria transação.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fila = None
+        self._thread = None
+        self._parar = None
+        self._encerramento_registrado = False
+
+    def _ativo(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def _iniciar(self, app):
+        # Uma thread por processo: com preload do gunicorn, a thread do mestre não existe nos workers
+        with self._lock:
+            if self._ativo():
+                return
+
+            self._fila = queue.Queue(maxsize=app.config['LOG_ACESSO_FILA'])
+            self._parar = threading.Event()
+            self._thread = threading.Thread(
+                target=self._executar, args=(app, self._fila, self._parar),
+                name='logs-acesso', daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+
+            if not self._encerramento_registrado:
+                atexit.register(self.encerrar)
+                self._encerramento_registrado = True
+
+    def enfileirar(self, registro):
+        """Coloca o log (dicionário com as colunas de LogAcesso) na fila; False se a fila está cheia"""
+        if not self._ativo():
+            self._iniciar(current_app._get_current_object())
+
+        try:
+            self._fila.put_nowait(registro)
+        except queue.Full:
+            LOGS_ACESSO_FILA_CHEIA.inc()
+            return False
+
+        LOGS_ACESSO_PENDENTES.set(self._fila.qsize())
+        return True
+
+    def encerrar(self, espera=ESPERA_ENCERRAMENTO):
+        """Grava o que ainda está na fila e para a thread (chamado também ao sair do processo)"""
+        if not self._ativo():
+            return
+
+        self._parar.set()
+        self._thread.join(espera)
+
+    def _executar(self, app, fila, parar):
+        maximo = app.config['LOG_ACESSO_LOTE']
+        intervalo = app.config['LOG_ACESSO_INTERVALO']
+
+        while True:
+            lote = self._coletar(fila, maximo, intervalo)
+            if lote:
+                self._gravar(app, lote)
+                LOGS_ACESSO_PENDENTES.set(fila.qsize())
+            elif parar.is_set():
+                break
+
+    @staticmethod
+    def _coletar(fila, maximo, intervalo):
+        lote = []
+        limite = time.monotonic() + intervalo
+        while len(lote) < maximo:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    @staticmethod
+    def _gravar(app, lote):
+        with app.app_context():
+            try:
+                db.session.execute(insert(LogAcesso), lote)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                LOGS_ACESSO_PERDIDOS.inc(len(lote))
+                logger.exception("Erro ao gravar %s logs de acesso", len(lote))
+                return
+
+        LOGS_ACESSO_GRAVADOS.inc(len(lote))
+
+
+gravador_logs_acesso = GravadorLogsAcesso()
+
+
+def enfileirar_log_acesso(registro):
+    """Envia o log ao gravador em segundo plano; False se deve ser gravado pela própria requisição"""
+    if not current_app.config['LOG_ACESSO_ASSINCRONO']:
+        return False
+
+    return gravador_logs_acesso.enfileirar(registro)
@@ -1,7 +1,15 @@
 from ..models.nfe_models import db, Fornecedor, Insumo, NotaFiscal, ItemNotaFiscal
+from .busca_service import indexar_fornecedor, indexar_insumo, remover_do_indice
+from .catalogo_service import incrementar_versao_catalogo, fornecedor_existe, insumo_existe
+from .estoque_service import ajustar_estoque_insumos, definir_estoque_insumo
+from ..utils.replica import somente_leitura
+from ..utils.esquemas import obter_schema
+from ..utils.exportacao import iterar_consulta
+from ..utils.metricas import NOTAS_FISCAIS_IMPORTADAS
 from datetime import datetime
 from marshmallow import Schema, fields, ValidationError, validates, validates_schema
 from decimal import Decimal
+from sqlalchemy.orm import selectinload
 
 class FornecedorSchema(Schema):
     nome = fields.String(required=True)
@@ -10,8 +18,7 @@ class FornecedorSchema(Schema):
     telefone = fields.String(allow_none=True)
     email = fields.String(allow_none=True)
     contato = fields.String(allow_none=True)
-    status = fields.String(allow_none=True)
-    observacoes = fields.String(allow_none=True)
+    ativo = fields.Boolean(allow_none=True)
     
     @validates('cnpj')
     def validate_cnpj(self, value):
@@ -33,12 +40,11 @@ class FornecedorSchema(Schema):
 class InsumoSchema(Schema):
     nome = fields.String(required=True)
     codigo = fields.String(required=True)
+    categoria = fields.String(allow_none=True)
     descricao = fields.String(allow_none=True)
     unidade_medida = fields.String(required=True)
-    estoque_minimo = fields.Decimal(allow_none=True)
     estoque_atual = fields.Decimal(allow_none=True)
-    status = fields.String(allow_none=True)
-    observacoes = fields.String(allow_none=True)
+    ativo = fields.Boolean(allow_none=True)
     
     @validates('codigo')
     def validate_codigo(self, value):
@@ -62,12 +68,10 @@ class ItemNotaFiscalSchema(Schema):
     quantidade = fields.Decimal(required=True)
     valor_unitario = fields.Decimal(required=True)
     valor_total = fields.Decimal(required=True)
-    observacoes = fields.String(allow_none=True)
     
     @validates('insumo_id')
     def validate_insumo(self, value):
-        insumo = Insumo.query.get(value)
-        if not insumo:
+        if not insumo_existe(value):
             raise ValidationError(f"Insumo com ID {value} não encontrado")
     
     @validates_schema
@@ -83,7 +87,7 @@ class NotaFiscalSchema(Schema):
     numero = fields.String(required=True)
     serie = fields.String(required=True)
     data_emissao = fields.Date(required=True)
-    data_entrada = fields.Date(required=True)
+    data_recebimento = fields.Date(allow_none=True)
     fornecedor_id = fields.Integer(required=True)
     valor_total = fields.Decimal(required=True)
     status = fields.String(allow_none=True)
@@ -92,15 +96,16 @@ class NotaFiscalSchema(Schema):
     
     @validates('fornecedor_id')
     def validate_fornecedor(self, value):
-        fornecedor = Fornecedor.query.get(value)
-        if not fornecedor:
+        if not fornecedor_existe(value):
             raise ValidationError(f"Fornecedor com ID {value} não encontrado")
     
-    @validates('numero')
-    def validate_numero(self, value):
+    @validates_schema
+    def validate_numero(self, data, **kwargs):
         # Verificar se já existe uma nota fiscal com este número e série
-        if 'serie' in self.data:
-            serie = self.data['serie']
+        # (validação de schema porque depende de dois campos)
+        if 'numero' in data and 'serie' in data:
+            value = data['numero']
+            serie = data['serie']
             
             if self.context.get('nota_fiscal_id'):
                 # Caso de atualização, ignorar a própria nota fiscal
@@ -114,12 +119,20 @@ class NotaFiscalSchema(Schema):
                 existing = NotaFiscal.query.filter_by(numero=value, serie=serie).first()
                 
             if existing:
-                raise ValidationError(f"Já existe uma nota fiscal com o número {value} e série {serie}")
+                raise ValidationError(
+                    f"Já existe uma nota fiscal com o número {value} e série {serie}",
+                    field_name='numero'
+                )
+
+
+def _filtro_booleano(valor):
+    """Converte o valor de um filtro da query string ("true", "false", "1", "0") em booleano"""
+    return str(valor).strip().lower() in ('1', 'true', 'sim')
 
 
 def criar_fornecedor(data):
     """Cria um novo fornecedor"""
-    schema = FornecedorSchema()
+    schema = obter_schema(FornecedorSchema)
     validated_data = schema.load(data)
     
     novo_fornecedor = Fornecedor(
@@ -129,11 +142,14 @@ def criar_fornecedor(data):
         telefone=validated_data.get('telefone'),
         email=validated_data.get('email'),
         contato=validated_data.get('contato'),
-        status=validated_data.get('status', 'ativo'),
-        observacoes=validated_data.get('observacoes')
+        ativo=validated_data.get('ativo', True)
     )
     
     db.session.add(novo_fornecedor)
+    db.session.flush()  # Para obter o ID do fornecedor
+    if novo_fornecedor.ativo:
+        indexar_fornecedor(novo_fornecedor)
+    incrementar_versao_catalogo('fornecedores')
     db.session.commit()
     
     return novo_fornecedor
@@ -145,7 +161,7 @@ def atualizar_fornecedor(fornecedor_id, data):
     if not fornecedor:
         return None
     
-    schema = FornecedorSchema(context={'fornecedor_id': fornecedor_id})
+    schema = obter_schema(FornecedorSchema, fornecedor_id=fornecedor_id)
     validated_data = schema.load(data)
     
     # Atualizar campos
@@ -153,18 +169,24 @@ def atualizar_fornecedor(fornecedor_id, data):
         setattr(fornecedor, key, value)
     
     fornecedor.atualizado_em = datetime.utcnow()
+    if fornecedor.ativo:
+        indexar_fornecedor(fornecedor)
+    else:
+        remover_do_indice('fornecedor', fornecedor.id)
+    incrementar_versao_catalogo('fornecedores')
     db.session.commit()
     
     return fornecedor
 
 
+@somente_leitura
 def buscar_fornecedor(fornecedor_id):
     """Busca um fornecedor pelo ID"""
     return Fornecedor.query.get(fornecedor_id)
 
 
-def listar_fornecedores(filtros=None):
-    """Lista fornecedores com filtros opcionais"""
+def consultar_fornecedores(filtros=None):
+    """Consulta de fornecedores com os filtros de listar_fornecedores, sem executar (também usada na exportação)"""
     query = Fornecedor.query
     
     if filtros:
@@ -174,13 +196,19 @@ def listar_fornecedores(filtros=None):
         if 'cnpj' in filtros:
             query = query.filter(Fornecedor.cnpj.ilike(f"%{filtros['cnpj']}%"))
         
-        if 'status' in filtros:
-            query = query.filter_by(status=filtros['status'])
+        if 'ativo' in filtros:
+            query = query.filter_by(ativo=_filtro_booleano(filtros['ativo']))
     
     # Ordenar por nome
     query = query.order_by(Fornecedor.nome)
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_fornecedores(filtros=None):
+    """Lista fornecedores com filtros opcionais"""
+    return consultar_fornecedores(filtros).all()
 
 
 def excluir_fornecedor(fornecedor_id):
@@ -190,8 +218,10 @@ def excluir_fornecedor(fornecedor_id):
         return False
     
     # Exclusão lógica
-    fornecedor.status = 'inativo'
+    fornecedor.ativo = False
     fornecedor.atualizado_em = datetime.utcnow()
+    remover_do_indice('fornecedor', fornecedor.id)
+    incrementar_versao_catalogo('fornecedores')
     db.session.commit()
     
     return True
@@ -199,21 +229,27 @@ def excluir_fornecedor(fornecedor_id):
 
 def criar_insumo(data):
     """Cria um novo insumo"""
-    schema = InsumoSchema()
+    schema = obter_schema(InsumoSchema)
     validated_data = schema.load(data)
     
     novo_insumo = Insumo(
         nome=validated_data['nome'],
         codigo=validated_data['codigo'],
+        categoria=validated_data.get('categoria'),
         descricao=validated_data.get('descricao'),
         unidade_medida=validated_data['unidade_medida'],
-        estoque_minimo=validated_data.get('estoque_minimo'),
-        estoque_atual=validated_data.get('estoque_atual', 0),
-        status=validated_data.get('status', 'ativo'),
-        observacoes=validated_data.get('observacoes')
+        estoque_atual=0,
+        ativo=validated_data.get('ativo', True)
     )
     
     db.session.add(novo_insumo)
+    db.session.flush()  # Para obter o ID do insumo
+    
+    # O estoque inicial entra na razão de estoque como a primeira movimentação
+    ajustar_estoque_insumos([(novo_insumo.id, validated_data.get('estoque_atual') or 0, 'cadastro', novo_insumo.id)])
+    if novo_insumo.ativo:
+        indexar_insumo(novo_insumo)
+    incrementar_versao_catalogo('insumos')
     db.session.commit()
     
     return novo_insumo
@@ -225,26 +261,37 @@ def atualizar_insumo(insumo_id, data):
     if not insumo:
         return None
     
-    schema = InsumoSchema(context={'insumo_id': insumo_id})
+    schema = obter_schema(InsumoSchema, insumo_id=insumo_id)
     validated_data = schema.load(data)
     
+    # Correção manual do estoque: registrada na razão como ajuste
+    if validated_data.get('estoque_atual') is not None:
+        definir_estoque_insumo(insumo_id, validated_data.pop('estoque_atual'), 'ajuste', insumo_id)
+    validated_data.pop('estoque_atual', None)
+    
     # Atualizar campos
     for key, value in validated_data.items():
         setattr(insumo, key, value)
     
     insumo.atualizado_em = datetime.utcnow()
+    if insumo.ativo:
+        indexar_insumo(insumo)
+    else:
+        remover_do_indice('insumo', insumo.id)
+    incrementar_versao_catalogo('insumos')
     db.session.commit()
     
     return insumo
 
 
+@somente_leitura
 def buscar_insumo(insumo_id):
     """Busca um insumo pelo ID"""
     return Insumo.query.get(insumo_id)
 
 
-def listar_insumos(filtros=None):
-    """Lista insumos com filtros opcionais"""
+def consultar_insumos(filtros=None):
+    """Consulta de insumos com os filtros de listar_insumos, sem executar (também usada na exportação)"""
     query = Insumo.query
     
     if filtros:
@@ -254,13 +301,19 @@ def listar_insumos(filtros=None):
         if 'codigo' in filtros:
             query = query.filter(Insumo.codigo.ilike(f"%{filtros['codigo']}%"))
         
-        if 'status' in filtros:
-            query = query.filter_by(status=filtros['status'])
+        if 'ativo' in filtros:
+            query = query.filter_by(ativo=_filtro_booleano(filtros['ativo']))
     
     # Ordenar por nome
     query = query.order_by(Insumo.nome)
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_insumos(filtros=None):
+    """Lista insumos com filtros opcionais"""
+    return consultar_insumos(filtros).all()
 
 
 def excluir_insumo(insumo_id):
@@ -270,23 +323,30 @@ def excluir_insumo(insumo_id):
         return False
     
     # Exclusão lógica
-    insumo.status = 'inativo'
+    insumo.ativo = False
     insumo.atualizado_em = datetime.utcnow()
+    remover_do_indice('insumo', insumo.id)
+    incrementar_versao_catalogo('insumos')
     db.session.commit()
     
     return True
 
 
+def _data_estoque(nota_fiscal):
+    """Data em que os itens da nota entram no estoque: o recebimento ou, sem ele, a emissão"""
+    return nota_fiscal.data_recebimento or nota_fiscal.data_emissao
+
+
 def criar_nota_fiscal(data):
     """Cria uma nova nota fiscal"""
-    schema = NotaFiscalSchema()
+    schema = obter_schema(NotaFiscalSchema)
     validated_data = schema.load(data)
     
     nova_nota_fiscal = NotaFiscal(
         numero=validated_data['numero'],
         serie=validated_data['serie'],
         data_emissao=validated_data['data_emissao'],
-        data_entrada=validated_data['data_entrada'],
+        data_recebimento=validated_data.get('data_recebimento'),
         fornecedor_id=validated_data['fornecedor_id'],
         valor_total=validated_data['valor_total'],
         status=validated_data.get('status', 'ativo'),
@@ -296,6 +356,9 @@ def criar_nota_fiscal(data):
     db.session.add(nova_nota_fiscal)
     db.session.flush()  # Para obter o ID da nota fiscal
     
+    # Movimentações de estoque dos itens, aplicadas de uma vez no final
+    movimentacoes = []
+    
     # Adicionar itens da nota fiscal
     if 'itens' in validated_data and isinstance(validated_data['itens'], list):
         for item_data in validated_data['itens']:
@@ -304,35 +367,38 @@ def criar_nota_fiscal(data):
                 insumo_id=item_data['insumo_id'],
                 quantidade=item_data['quantidade'],
                 valor_unitario=item_data['valor_unitario'],
-                valor_total=item_data['valor_total'],
-                observacoes=item_data.get('observacoes')
+                valor_total=item_data['valor_total']
             )
             db.session.add(item)
             
             # Atualizar estoque do insumo
-            insumo = Insumo.query.get(item_data['insumo_id'])
-            if insumo:
-                insumo.estoque_atual = (insumo.estoque_atual or 0) + Decimal(item_data['quantidade'])
+            movimentacoes.append((
+                item.insumo_id, item_data['quantidade'], 'nota_fiscal', nova_nota_fiscal.id, _data_estoque(nova_nota_fiscal)
+            ))
     
+    ajustar_estoque_insumos(movimentacoes)
     db.session.commit()
+    NOTAS_FISCAIS_IMPORTADAS.inc()
     
     return nova_nota_fiscal
 
 
 def atualizar_nota_fiscal(nota_fiscal_id, data):
     """Atualiza uma nota fiscal existente"""
-    nota_fiscal = NotaFiscal.query.get(nota_fiscal_id)
+    # Trava a nota para que duas atualizações simultâneas não revertam os mesmos itens
+    nota_fiscal = NotaFiscal.query.with_for_update().filter(NotaFiscal.id == nota_fiscal_id).first()
     if not nota_fiscal:
         return None
     
-    schema = NotaFiscalSchema(context={'nota_fiscal_id': nota_fiscal_id})
+    schema = obter_schema(NotaFiscalSchema, nota_fiscal_id=nota_fiscal_id)
     validated_data = schema.load(data)
     
-    # Reverter o estoque dos itens atuais
-    for item in nota_fiscal.itens:
-        insumo = Insumo.query.get(item.insumo_id)
-        if insumo:
-            insumo.estoque_atual = (insumo.estoque_atual or 0) - Decimal(item.quantidade)
+    # Reverter o estoque dos itens atuais (na data antiga da nota)
+    data_antiga = _data_estoque(nota_fiscal)
+    movimentacoes = [
+        (item.insumo_id, -Decimal(str(item.quantidade)), 'nota_fiscal', nota_fiscal.id, data_antiga)
+        for item in nota_fiscal.itens
+    ]
     
     # Atualizar campos da nota fiscal
     for key, value in validated_data.items():
@@ -353,28 +419,29 @@ def atualizar_nota_fiscal(nota_fiscal_id, data):
                 insumo_id=item_data['insumo_id'],
                 quantidade=item_data['quantidade'],
                 valor_unitario=item_data['valor_unitario'],
-                valor_total=item_data['valor_total'],
-                observacoes=item_data.get('observacoes')
+                valor_total=item_data['valor_total']
             )
             db.session.add(item)
             
             # Atualizar estoque do insumo
-            insumo = Insumo.query.get(item_data['insumo_id'])
-            if insumo:
-                insumo.estoque_atual = (insumo.estoque_atual or 0) + Decimal(item_data['quantidade'])
+            movimentacoes.append((
+                item.insumo_id, item_data['quantidade'], 'nota_fiscal', nota_fiscal.id, _data_estoque(nota_fiscal)
+            ))
     
+    ajustar_estoque_insumos(movimentacoes)
     db.session.commit()
     
     return nota_fiscal
 
 
+@somente_leitura
 def buscar_nota_fiscal(nota_fiscal_id):
     """Busca uma nota fiscal pelo ID"""
     return NotaFiscal.query.get(nota_fiscal_id)
 
 
-def listar_notas_fiscais(filtros=None):
-    """Lista notas fiscais com filtros opcionais"""
+def consultar_notas_fiscais(filtros=None):
+    """Consulta de notas fiscais com os filtros de listar_notas_fiscais, sem executar (também usada na exportação)"""
     query = NotaFiscal.query
     
     if filtros:
@@ -396,20 +463,38 @@ def listar_notas_fiscais(filtros=None):
     # Ordenar por data de emissão decrescente
     query = query.order_by(NotaFiscal.data_emissao.desc())
     
-    return query.all()
+    return query
+
+
+@somente_leitura
+def listar_notas_fiscais(filtros=None):
+    """Lista notas fiscais com filtros opcionais"""
+    return consultar_notas_fiscais(filtros).all()
+
+
+@somente_leitura
+def iterar_notas_fiscais(filtros=None):
+    """Percorre as notas fiscais de listar_notas_fiscais em blocos, sem carregar todas na memória"""
+    # Itens carregados com um SELECT ... IN por bloco, em vez de um por nota
+    consulta = consultar_notas_fiscais(filtros).options(selectinload(NotaFiscal.itens))
+    yield from iterar_consulta(consulta)
 
 
 def excluir_nota_fiscal(nota_fiscal_id):
     """Exclui uma nota fiscal (exclusão lógica)"""
-    nota_fiscal = NotaFiscal.query.get(nota_fiscal_id)
+    nota_fiscal = NotaFiscal.query.with_for_update().filter(NotaFiscal.id == nota_fiscal_id).first()
     if not nota_fiscal:
         return False
     
+    # Já cancelada: o estoque dos itens já foi revertido
+    if nota_fiscal.status == 'cancelado':
+        return True
+    
     # Reverter o estoque dos itens
-    for item in nota_fiscal.itens:
-        insumo = Insumo.query.get(item.insumo_id)
-        if insumo:
-            insumo.estoque_atual = (insumo.estoque_atual or 0) - Decimal(item.quantidade)
+    ajustar_estoque_insumos([
+        (item.insumo_id, -Decimal(str(item.quantidade)), 'nota_fiscal', nota_fiscal.id, _data_estoque(nota_fiscal))
+        for item in nota_fiscal.itens
+    ])
     
     # Exclusão lógica
     nota_fiscal.status = 'cancelado'
@@ -0,0 +1,147 @@
+from ..models.fechamento_models import db, CustoMedio
+from ..models.nfe_models import Insumo
+from ..models.controle_mensal_models import EntregaMensal
+from .catalogo_service import obter_insumo
+from ..utils.replica import somente_leitura
+from ..utils.exportacao import iterar_consulta
+from datetime import datetime, date
+
+# Relatórios de custo médio e tendência de preços.
+# Carregado apenas na primeira requisição de relatório (ver api/fechamento_routes.py).
+
+
+@somente_leitura
+def gerar_relatorio_custo_medio(filtros):
+    """Gera um relatório de custo médio"""
+    # Implementar lógica de relatório de custo médio
+    # Este é um exemplo simplificado
+    
+    insumo_id = filtros.get('insumo_id')
+    ano = filtros.get('ano', date.today().year)
+    
+    # Validar parâmetros
+    if not insumo_id:
+        raise ValueError("ID do insumo é obrigatório")
+    
+    # Buscar insumo
+    insumo = obter_insumo(insumo_id) or Insumo.query.get(insumo_id)
+    if not insumo:
+        raise ValueError(f"Insumo com ID {insumo_id} não encontrado")
+    
+    # Buscar custos médios do ano
+    custos_medios = CustoMedio.query.filter(
+        CustoMedio.insumo_id == insumo_id,
+        CustoMedio.ano == int(ano)
+    ).order_by(CustoMedio.mes).all()
+    
+    # Preparar dados do relatório
+    dados_mensais = []
+    for custo_medio in custos_medios:
+        dados_mensais.append({
+            'mes': f"{custo_medio.mes:02d}/{custo_medio.ano}",
+            'quantidade': float(custo_medio.quantidade_total),
+            'custo_total': float(custo_medio.valor_total),
+            'custo_medio': float(custo_medio.custo_medio)
+        })
+    
+    # Calcular média anual
+    if custos_medios:
+        media_anual = sum(float(cm.custo_medio) for cm in custos_medios) / len(custos_medios)
+    else:
+        media_anual = 0
+    
+    return {
+        'insumo': {
+            'id': insumo.id,
+            'nome': insumo.nome,
+            'codigo': insumo.codigo,
+            'unidade_medida': insumo.unidade_medida
+        },
+        'ano': ano,
+        'dados_mensais': dados_mensais,
+        'media_anual': media_anual
+    }
+
+
+def _parametros_tendencia_precos(filtros):
+    """Valida os filtros do relatório de tendência: (insumo, data_inicio, data_fim)"""
+    insumo_id = filtros.get('insumo_id')
+    data_inicio = filtros.get('data_inicio')
+    data_fim = filtros.get('data_fim')
+    
+    # Validar parâmetros
+    if not insumo_id:
+        raise ValueError("ID do insumo é obrigatório")
+    
+    if not data_inicio or not data_fim:
+        raise ValueError("Data início e data fim são obrigatórios")
+    
+    # Converter datas
+    data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+    data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date()
+    
+    # Buscar insumo
+    insumo = obter_insumo(insumo_id) or Insumo.query.get(insumo_id)
+    if not insumo:
+        raise ValueError(f"Insumo com ID {insumo_id} não encontrado")
+    
+    return insumo, data_inicio, data_fim
+
+
+@somente_leitura
+def _iterar_entregas_tendencia(insumo_id, data_inicio, data_fim):
+    """Linhas do relatório de tendência (uma por entrega do período), lidas do banco em blocos"""
+    # Só as colunas usadas, sem montar objetos EntregaMensal (a entrega guarda o próprio insumo)
+    consulta = db.session.query(
+        EntregaMensal.data_entrega, EntregaMensal.quantidade, EntregaMensal.valor_total
+    ).filter(
+        EntregaMensal.insumo_id == insumo_id,
+        EntregaMensal.data_entrega >= data_inicio,
+        EntregaMensal.data_entrega <= data_fim
+    ).order_by(EntregaMensal.data_entrega)
+    
+    for data_entrega, quantidade, valor_total in iterar_consulta(consulta):
+        yield {
+            'data': data_entrega.strftime('%d/%m/%Y'),
+            'quantidade': float(quantidade),
+            'valor_total': float(valor_total),
+            'preco_unitario': float(valor_total) / float(quantidade) if quantidade else 0
+        }
+
+
+def linhas_relatorio_tendencia_precos(filtros):
+    """Valida os filtros e devolve o gerador das linhas do relatório de tendência (para exportação)"""
+    insumo, data_inicio, data_fim = _parametros_tendencia_precos(filtros)
+    return _iterar_entregas_tendencia(insumo.id, data_inicio, data_fim)
+
+
+@somente_leitura
+def gerar_relatorio_tendencia_precos(filtros):
+    """Gera um relatório de tendência de preços"""
+    insumo, data_inicio, data_fim = _parametros_tendencia_precos(filtros)
+    
+    dados_entregas = list(_iterar_entregas_tendencia(insumo.id, data_inicio, data_fim))
+    
+    # Calcular tendência (exemplo simplificado)
+    if len(dados_entregas) >= 2:
+        primeiro_preco = dados_entregas[0]['preco_unitario']
+        ultimo_preco = dados_entregas[-1]['preco_unitario']
+        variacao = ((ultimo_preco - primeiro_preco) / primeiro_preco) * 100 if primeiro_preco else 0
+    else:
+        variacao = 0
+    
+    return {
+        'insumo': {
+            'id': insumo.id,
+            'nome': insumo.nome,
+            'codigo': insumo.codigo,
+            'unidade_medida': insumo.unidade_medida
+        },
+        'periodo': {
+            'data_inicio': data_inicio.strftime('%d/%m/%Y'),
+            'data_fim': data_fim.strftime('%d/%m/%Y')
+        },
+        'dados_entregas': dados_entregas,
+        'variacao_percentual': variacao,
+        'tendencia': 'alta' if variacao > 0 else 'baixa' if variacao < 0 else 'estável'
+    }
@@ -0,0 +1,94 @@
+from ..models.fechamento_models import db, ResumoMensal
+from ..models.controle_mensal_models import RegistroMensal, EntregaMensal
+from ..models.nfe_models import NotaFiscal
+from ..models.contratos_models import Contrato
+from ..utils.replica import somente_leitura
+from datetime import datetime, date
+from sqlalchemy import delete, insert, literal, select
+
+
+def _inicio_mes(data):
+    return date(data.year, data.month, 1)
+
+
+def atualizar_resumo_mensal(mes_referencia):
+    """Recalcula os totais de um mês a partir das entregas (na transação atual, sem commit)"""
+    mes_ref = _inicio_mes(mes_referencia)
+    quantidade = db.func.sum(EntregaMensal.quantidade)
+    valor = db.func.sum(EntregaMensal.valor_total)
+    # Fornecedor da nota fiscal da entrega ou, na falta dela, do contrato
+    fornecedor_id = db.func.coalesce(NotaFiscal.fornecedor_id, Contrato.fornecedor_id)
+
+    agregado = select(
+        literal(mes_ref, type_=db.Date),
+        EntregaMensal.insumo_id,
+        fornecedor_id,
+        EntregaMensal.contrato_id,
+        quantidade,
+        valor,
+        valor / db.func.nullif(quantidade, 0),
+        db.func.count(EntregaMensal.id),
+        literal(datetime.now(), type_=db.DateTime)
+    ).select_from(EntregaMensal).join(
+        RegistroMensal, EntregaMensal.registro_mensal_id == RegistroMensal.id
+    ).outerjoin(
+        NotaFiscal, EntregaMensal.nota_fiscal_id == NotaFiscal.id
+    ).outerjoin(
+        Contrato, EntregaMensal.contrato_id == Contrato.id
+    ).where(
+        # Mês do registro ao qual a entrega pertence
+        RegistroMensal.ano == mes_ref.year,
+        RegistroMensal.mes == mes_ref.month
+    ).group_by(
+        EntregaMensal.insumo_id, fornecedor_id, EntregaMensal.contrato_id
+    )
+
+    db.session.execute(delete(ResumoMensal).where(ResumoMensal.mes_referencia == mes_ref))
+    db.session.execute(insert(ResumoMensal).from_select([
+        'mes_referencia', 'insumo_id', 'fornecedor_id', 'contrato_id',
+        'quantidade_total', 'valor_total', 'custo_medio', 'entregas', 'atualizado_em'
+    ], agregado))
+
+
+def reconstruir_resumos_mensais():
+    """Recalcula os totais de todos os meses com registros (carga inicial)"""
+    meses = sorted(
+        date(ano, mes, 1)
+        for ano, mes in db.session.query(RegistroMensal.ano, RegistroMensal.mes).distinct()
+    )
+
+    for mes_ref in meses:
+        atualizar_resumo_mensal(mes_ref)
+    db.session.commit()
+
+    return len(meses)
+
+
+def consultar_resumos_mensais(filtros=None):
+    """Consulta de totais mensais com os filtros de listar_resumos_mensais, sem executar (também usada na exportação)"""
+    query = ResumoMensal.query
+
+    if filtros:
+        for campo in ('insumo_id', 'fornecedor_id', 'contrato_id'):
+            if campo in filtros:
+                query = query.filter(getattr(ResumoMensal, campo) == int(filtros[campo]))
+
+        if 'mes_referencia' in filtros:
+            # Filtrar pelo mês de referência (formato: YYYY-MM)
+            ano, mes = filtros['mes_referencia'].split('-')
+            query = query.filter(ResumoMensal.mes_referencia == date(int(ano), int(mes), 1))
+
+        if 'ano' in filtros:
+            ano = int(filtros['ano'])
+            query = query.filter(
+                ResumoMensal.mes_referencia >= date(ano, 1, 1),
+                ResumoMensal.mes_referencia < date(ano + 1, 1, 1)
+            )
+
+    return query.order_by(ResumoMensal.mes_referencia, ResumoMensal.insumo_id)
+
+
+@somente_leitura
+def listar_resumos_mensais(filtros=None):
+    """Lista os totais mensais com filtros opcionais (ano, mes_referencia, insumo, fornecedor, contrato)"""
+    return consultar_resumos_mensais(filtros).all()
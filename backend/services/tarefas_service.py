@@ -0,0 +1,160 @@
+from ..models.tarefas_models import db, Tarefa
+from datetime import datetime, timedelta
+from marshmallow import Schema, fields, ValidationError, validates
+from ..utils.esquemas import obter_schema
+import importlib
+import json
+
+# Operações que podem ser executadas em segundo plano: tipo -> "módulo:função".
+# As funções recebem um único dicionário de parâmetros e são importadas apenas no worker.
+TIPOS_TAREFA = {
+    'fechamento': 'backend.services.fechamento_service:criar_fechamento',
+    'relatorio_custo_medio': 'backend.services.relatorios_service:gerar_relatorio_custo_medio',
+    'relatorio_tendencia_precos': 'backend.services.relatorios_service:gerar_relatorio_tendencia_precos',
+    'nota_fiscal': 'backend.services.nfe_service:criar_nota_fiscal',
+    'analise': 'backend.services.analises_service:criar_analise',
+}
+
+
+class TarefaSchema(Schema):
+    tipo = fields.String(required=True)
+    parametros = fields.Dict(load_default=dict)
+
+    @validates('tipo')
+    def validate_tipo(self, value):
+        if value not in TIPOS_TAREFA:
+            raise ValidationError(f"Tipo de tarefa inválido: {value}")
+
+
+def _resolver_funcao(tipo):
+    modulo, nome = TIPOS_TAREFA[tipo].split(':')
+    return getattr(importlib.import_module(modulo), nome)
+
+
+def _serializar_resultado(resultado):
+    # Modelos viram dicionário (ou apenas o ID); o restante vai como está para o JSON
+    if hasattr(resultado, 'to_dict'):
+        return resultado.to_dict()
+    if hasattr(resultado, '__table__'):
+        return {'id': resultado.id}
+    return resultado
+
+
+def criar_tarefa(data, usuario_id=None):
+    """Enfileira uma nova tarefa para o worker"""
+    schema = obter_schema(TarefaSchema)
+    validated_data = schema.load(data)
+
+    tarefa = Tarefa(
+        tipo=validated_data['tipo'],
+        parametros=json.loads(json.dumps(validated_data['parametros'], default=str)),
+        status='pendente',
+        usuario_id=usuario_id
+    )
+
+    db.session.add(tarefa)
+    db.session.commit()
+
+    return tarefa
+
+
+def buscar_tarefa(tarefa_id):
+    """Busca uma tarefa pelo ID (sempre no banco principal, para refletir o progresso atual)"""
+    return Tarefa.query.get(tarefa_id)
+
+
+def reservar_tarefa(worker):
+    """Marca a próxima tarefa pendente como em execução por este worker e a retorna (ou None)"""
+    consulta = db.session.query(Tarefa.id).filter(Tarefa.status == 'pendente').order_by(Tarefa.id).limit(1)
+    if db.engine.dialect.name == 'postgresql':
+        # Workers concorrentes pulam a linha já travada em vez de esperar por ela
+        consulta = consulta.with_for_update(skip_locked=True)
+
+    linha = consulta.first()
+    if not linha:
+        db.session.commit()
+        return None
+
+    # A condição no status garante que só um worker fica com a tarefa (também no SQLite)
+    atualizados = Tarefa.query.filter(Tarefa.id == linha.id, Tarefa.status == 'pendente').update({
+        Tarefa.status: 'executando',
+        Tarefa.worker: worker,
+        Tarefa.progresso: 0,
+        Tarefa.tentativas: Tarefa.tentativas + 1,
+        Tarefa.iniciado_em: datetime.now(),
+        Tarefa.atualizado_em: datetime.now()
+    }, synchronize_session=False)
+    db.session.commit()
+
+    return Tarefa.query.get(linha.id) if atualizados else None
+
+
+def registrar_batimento(tarefa_id, worker):
+    """Renova atualizado_em de uma tarefa em execução por este worker (sinal de que continua ativo)"""
+    atualizados = Tarefa.query.filter(
+        Tarefa.id == tarefa_id, Tarefa.status == 'executando', Tarefa.worker == worker
+    ).update({Tarefa.atualizado_em: datetime.now()}, synchronize_session=False)
+    db.session.commit()
+
+    return bool(atualizados)
+
+
+def executar_tarefa(tarefa_id):
+    """Executa uma tarefa já reservada e grava o resultado ou o erro"""
+    tarefa = Tarefa.query.get(tarefa_id)
+    parametros = tarefa.parametros or {}
+
+    try:
+        resultado = _resolver_funcao(tarefa.tipo)(parametros)
+        # Passa por JSON para converter datas e Decimal
+        resultado = json.loads(json.dumps(_serializar_resultado(resultado), default=str))
+    except Exception as e:
+        db.session.rollback()
+        erro = str(e.messages) if isinstance(e, ValidationError) else str(e)
+
+        tarefa = Tarefa.query.get(tarefa_id)
+        tarefa.status = 'erro'
+        tarefa.erro = erro
+        tarefa.concluido_em = datetime.now()
+        db.session.commit()
+
+        return tarefa
+
+    tarefa = Tarefa.query.get(tarefa_id)
+    tarefa.status = 'concluida'
+    tarefa.progresso = 100
+    tarefa.resultado = resultado
+    tarefa.erro = None
+    tarefa.concluido_em = datetime.now()
+    db.session.commit()
+
+    return tarefa
+
+
+def recuperar_tarefas_abandonadas(timeout, max_tentativas):
+    """Devolve à fila as tarefas presas em execução (worker encerrado) ou as marca como erro
+
+    Uma tarefa é abandonada quando o worker não renova atualizado_em (registrar_batimento)
+    há mais de timeout segundos; tarefas longas com o worker ativo não são afetadas.
+    """
+    limite = datetime.now() - timedelta(seconds=timeout)
+    abandonadas = Tarefa.query.filter(
+        Tarefa.status == 'executando',
+        Tarefa.atualizado_em < limite
+    )
+
+    reenfileiradas = abandonadas.filter(Tarefa.tentativas < max_tentativas).update(
+        {Tarefa.status: 'pendente', Tarefa.worker: None},
+        synchronize_session=False
+    )
+    falhas = abandonadas.filter(Tarefa.tentativas >= max_tentativas).update(
+        {
+            Tarefa.status: 'erro',
+            Tarefa.erro: 'Tarefa abandonada após o número máximo de tentativas',
+            Tarefa.concluido_em: datetime.now()
+        },
+        synchronize_session=False
+    )
+    db.session.commit()
+
+    return reenfileiradas, falhas
@@ -0,0 +1,109 @@
+from ..models.auth_models import db, Usuario, TokenRevogado
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
+from datetime import datetime
+import threading
+import time
+
+
+class ListaRevogacao:
+    """IDs (jti) dos tokens revogados e ainda válidos, em memória
+
+    Cada processo recarrega a lista do banco a cada JWT_REVOGACAO_INTERVALO segundos, então
+    a verificação de um token não consulta o banco. Uma revogação vale na hora no processo
+    que a fez e nos demais em até um intervalo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = frozenset()
+        self._carregada_em = None
+
+    def invalidar(self):
+        """Força a recarga na próxima verificação"""
+        self._carregada_em = None
+
+    def _expirada(self):
+        intervalo = current_app.config['JWT_REVOGACAO_INTERVALO']
+        return self._carregada_em is None or time.monotonic() - self._carregada_em >= intervalo
+
+    def contem(self, jti):
+        if self._expirada():
+            with self._lock:
+                # Outra thread pode ter recarregado enquanto esta esperava
+                if self._expirada():
+                    self._jtis = frozenset(
+                        jti for (jti,) in db.session.query(TokenRevogado.jti).filter(
+                            TokenRevogado.expira_em > datetime.utcnow()
+                        )
+                    )
+                    self._carregada_em = time.monotonic()
+
+        return jti in self._jtis
+
+    def adicionar(self, jtis):
+        with self._lock:
+            self._jtis = self._jtis | set(jtis)
+
+
+lista_revogacao = ListaRevogacao()
+
+
+def token_revogado(jti):
+    return lista_revogacao.contem(jti)
+
+
+def emitir_tokens(usuario):
+    """Token de acesso (ID e nível de acesso do usuário) e token de renovação"""
+    return {
+        'access_token': emitir_token_acesso(usuario),
+        'refresh_token': create_refresh_token(identity=str(usuario.id))
+    }
+
+
+def emitir_token_acesso(usuario):
+    return create_access_token(identity=str(usuario.id), additional_claims={'nivel_acesso': usuario.nivel_acesso})
+
+
+def renovar_token_acesso(usuario_id):
+    """Novo token de acesso a partir do de renovação; None se o usuário não existe ou foi desativado
+
+    Diferente das demais rotas, a renovação consulta o usuário, para que desativações e
+    mudanças de nível de acesso valham a partir do próximo token.
+    """
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or not usuario.ativo:
+        return None
+
+    return emitir_token_acesso(usuario)
+
+
+def revogar_tokens(dados_token, refresh_token=None):
+    """Revoga o token da requisição (claims já validadas) e, se informado, o token de renovação"""
+    revogados = [dados_token]
+    if refresh_token:
+        try:
+            dados_refresh = decode_token(refresh_token)
+        except Exception:
+            # Token de renovação inválido ou expirado: não há o que revogar
+            dados_refresh = None
+        if dados_refresh and dados_refresh['sub'] == dados_token['sub']:
+            revogados.append(dados_refresh)
+
+    agora = datetime.utcnow()
+    # Um logout repetido (em outro processo, antes da recarga da lista) não duplica a revogação
+    existentes = {
+        jti for (jti,) in db.session.query(TokenRevogado.jti).filter(
+            TokenRevogado.jti.in_([dados['jti'] for dados in revogados])
+        )
+    }
+    for dados in revogados:
+        if dados['jti'] in existentes:
+            continue
+        db.session.add(TokenRevogado(jti=dados['jti'], expira_em=datetime.utcfromtimestamp(dados['exp'])))
+
+    # Revogações de tokens que já expirariam não são mais necessárias
+    TokenRevogado.query.filter(TokenRevogado.expira_em <= agora).delete(synchronize_session=False)
+    db.session.commit()
+
+    lista_revogacao.adicionar(dados['jti'] for dados in revogados)
@@ -0,0 +1,22 @@
+import threading
+
+# Instâncias de schema reaproveitadas entre chamadas, uma por classe e por thread.
+# Construir um Schema copia todos os campos declarados e os schemas aninhados;
+# o contexto, que muda a cada chamada, é atualizado no próprio dicionário da instância.
+_local = threading.local()
+
+
+def obter_schema(classe, **contexto):
+    """Retorna a instância em cache de um schema com o contexto desta chamada"""
+    cache = getattr(_local, 'schemas', None)
+    if cache is None:
+        cache = _local.schemas = {}
+
+    schema = cache.get(classe)
+    if schema is None:
+        schema = cache[classe] = classe()
+
+    schema.context.clear()
+    schema.context.update(contexto)
+
+    return schema
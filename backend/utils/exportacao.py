@@ -0,0 +1,133 @@
+from flask import Response, stream_with_context
+from marshmallow import ValidationError
+from sqlalchemy.orm import Query
+from .replica import somente_leitura
+import csv
+import io
+import json
+import tempfile
+
+# Formatos aceitos em ?format= nas listagens e o Content-Type de cada um
+FORMATOS_EXPORTACAO = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Objetos carregados do banco por vez nas leituras em fluxo (yield_per)
+TAMANHO_BLOCO_CONSULTA = 500
+
+# Bytes acumulados antes de enviar um pedaço da resposta
+TAMANHO_PEDACO_EXPORTACAO = 64 * 1024
+
+
+def iterar_consulta(consulta):
+    """Percorre a consulta em blocos de TAMANHO_BLOCO_CONSULTA objetos, sem carregar o resultado inteiro
+
+    No PostgreSQL as linhas vêm de um cursor no servidor; só um bloco fica na sessão por vez.
+    """
+    return consulta.execution_options(stream_results=True).yield_per(TAMANHO_BLOCO_CONSULTA)
+
+
+@somente_leitura
+def _dicionarios(objetos):
+    for objeto in objetos:
+        yield objeto.to_dict()
+
+
+def _valor(valor):
+    # Listas e objetos aninhados (itens, detalhes) vão como JSON em uma célula
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False, default=str)
+    return valor
+
+
+def _gerar_csv(linhas):
+    buffer = io.StringIO()
+    # Ponto e vírgula e BOM para o Excel em português abrir o arquivo direto
+    escritor = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')
+
+    colunas = None
+    for linha in linhas:
+        if colunas is None:
+            colunas = list(linha)
+            escritor.writerow(colunas)
+        escritor.writerow([_valor(linha.get(coluna)) for coluna in colunas])
+
+        if buffer.tell() >= TAMANHO_PEDACO_EXPORTACAO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _gerar_ndjson(linhas):
+    pedaco = []
+    tamanho = 0
+    for linha in linhas:
+        texto = json.dumps(linha, ensure_ascii=False, default=str) + '\n'
+        pedaco.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_PEDACO_EXPORTACAO:
+            yield ''.join(pedaco)
+            pedaco = []
+            tamanho = 0
+
+    yield ''.join(pedaco)
+
+
+def _gerar_xlsx(linhas):
+    # O xlsx é um zip e só pode ser enviado depois de fechado: as linhas vão para uma
+    # planilha write_only (gravada em disco pelo openpyxl) e o arquivo final é lido em pedaços
+    from openpyxl import Workbook
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet()
+
+    colunas = None
+    for linha in linhas:
+        if colunas is None:
+            colunas = list(linha)
+            aba.append(colunas)
+        aba.append([_valor(linha.get(coluna)) for coluna in colunas])
+
+    with tempfile.TemporaryFile() as arquivo:
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            pedaco = arquivo.read(TAMANHO_PEDACO_EXPORTACAO)
+            if not pedaco:
+                break
+            yield pedaco
+
+
+GERADORES_EXPORTACAO = {
+    'csv': _gerar_csv,
+    'xlsx': _gerar_xlsx,
+    'ndjson': _gerar_ndjson,
+}
+
+
+def resposta_exportacao_linhas(linhas, formato, nome):
+    """Resposta em fluxo com as linhas (dicionários, de um gerador) no formato pedido"""
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValidationError(f"Formato de exportação inválido: {formato}; use {', '.join(FORMATOS_EXPORTACAO)}")
+
+    gerador = GERADORES_EXPORTACAO[formato](linhas)
+    resposta = Response(stream_with_context(gerador), content_type=FORMATOS_EXPORTACAO[formato])
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{nome}.{formato}"'
+    return resposta
+
+
+def resposta_exportacao(objetos, formato, nome):
+    """Resposta em fluxo com o to_dict de cada objeto no formato pedido
+
+    objetos é uma consulta (lida com iterar_consulta) ou um gerador de objetos como
+    iterar_notas_fiscais. A leitura só acontece enquanto a resposta é enviada, então o
+    uso de memória não cresce com o número de linhas.
+    """
+    if isinstance(objetos, Query):
+        objetos = iterar_consulta(objetos)
+    return resposta_exportacao_linhas(_dicionarios(objetos), formato, nome)
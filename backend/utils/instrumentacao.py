@@ -0,0 +1,126 @@
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from datetime import datetime
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger('backend.requisicoes')
+
+# Tamanho máximo do SQL registrado para a consulta mais lenta
+TAMANHO_MAXIMO_SQL = 300
+
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    # No contexto de execução (um por comando): um comando que falha não deixa nada na conexão
+    context._inicio_consulta = time.perf_counter()
+
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - context._inicio_consulta
+
+    if not has_app_context() or '_sql' not in g:
+        return
+
+    sql = g._sql
+    sql['consultas'] += 1
+    sql['tempo'] += duracao
+    if duracao > sql['mais_lenta_tempo']:
+        sql['mais_lenta_tempo'] = duracao
+        sql['mais_lenta'] = ' '.join(statement.split())[:TAMANHO_MAXIMO_SQL]
+
+
+def _iniciar_perfilador(app):
+    ferramenta = app.config.get('PROFILING_FERRAMENTA', 'cprofile')
+
+    if ferramenta == 'pyinstrument':
+        # Dependência opcional, importada apenas quando habilitada
+        from pyinstrument import Profiler
+        perfilador = Profiler()
+        perfilador.start()
+    else:
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+
+    return perfilador
+
+
+def _salvar_perfil(app, perfilador, duracao_ms):
+    diretorio = app.config.get('PROFILING_DIR', 'perfis')
+    os.makedirs(diretorio, exist_ok=True)
+
+    nome = '{}_{}_{:.0f}ms'.format(
+        datetime.now().strftime('%Y%m%d%H%M%S%f'),
+        (request.endpoint or 'desconhecido').replace('.', '-'),
+        duracao_ms
+    )
+
+    if isinstance(perfilador, cProfile.Profile):
+        perfilador.dump_stats(os.path.join(diretorio, nome + '.prof'))
+    else:
+        with open(os.path.join(diretorio, nome + '.html'), 'w') as arquivo:
+            arquivo.write(perfilador.output_html())
+
+
+def registrar_instrumentacao(app):
+    """Registra tempo por requisição, contagem/tempo de SQL e perfilamento por amostragem"""
+    if not event.contains(Engine, 'before_cursor_execute', _antes_da_consulta):
+        event.listen(Engine, 'before_cursor_execute', _antes_da_consulta)
+        event.listen(Engine, 'after_cursor_execute', _depois_da_consulta)
+
+    @app.before_request
+    def iniciar_medicao():
+        g._inicio_requisicao = time.perf_counter()
+        g._sql = {'consultas': 0, 'tempo': 0.0, 'mais_lenta_tempo': 0.0, 'mais_lenta': None}
+
+        amostragem = app.config.get('PROFILING_AMOSTRAGEM', 0)
+        if amostragem and random.random() < amostragem:
+            g._perfilador = _iniciar_perfilador(app)
+
+    @app.after_request
+    def finalizar_medicao(response):
+        if '_inicio_requisicao' not in g:
+            return response
+
+        duracao_ms = (time.perf_counter() - g._inicio_requisicao) * 1000
+        sql = g._sql
+        sql_ms = sql['tempo'] * 1000
+
+        response.headers.add(
+            'Server-Timing',
+            'app;dur={:.1f}, db;dur={:.1f};desc="{} consultas"'.format(duracao_ms, sql_ms, sql['consultas'])
+        )
+
+        logger.info(json.dumps({
+            'metodo': request.method,
+            'rota': request.url_rule.rule if request.url_rule else request.path,
+            'status': response.status_code,
+            'duracao_ms': round(duracao_ms, 1),
+            'sql_consultas': sql['consultas'],
+            'sql_ms': round(sql_ms, 1),
+            'sql_mais_lenta_ms': round(sql['mais_lenta_tempo'] * 1000, 1),
+            'sql_mais_lenta': sql['mais_lenta']
+        }, ensure_ascii=False))
+
+        return response
+
+    # No teardown, que roda mesmo quando a view levanta uma exceção: o perfilador nunca
+    # fica ligado na thread do worker depois da requisição
+    @app.teardown_request
+    def finalizar_perfilador(exc):
+        perfilador = g.pop('_perfilador', None)
+        if perfilador is None:
+            return
+
+        if isinstance(perfilador, cProfile.Profile):
+            perfilador.disable()
+        else:
+            perfilador.stop()
+
+        duracao_ms = (time.perf_counter() - g._inicio_requisicao) * 1000
+        if duracao_ms >= app.config.get('PROFILING_LIMIAR_MS', 500):
+            _salvar_perfil(app, perfilador, duracao_ms)
@@ -0,0 +1,52 @@
+from collections import OrderedDict, deque
+import math
+import threading
+import time
+
+
+class LimitadorJanela:
+    """Conta eventos por chave em uma janela deslizante, em memória (um contador por processo)
+
+    Com vários workers cada processo conta separadamente; para um limite global, a mesma
+    interface (espera/registrar/limpar) pode ser implementada sobre um sorted set do Redis.
+    """
+
+    def __init__(self, maximo_chaves=10000):
+        self._lock = threading.Lock()
+        self._eventos = OrderedDict()
+        # Chaves mais antigas são descartadas além deste número, para limitar a memória
+        self._maximo_chaves = maximo_chaves
+
+    def espera(self, chave, limite, janela):
+        """Segundos até a chave poder registrar um novo evento (0 se está abaixo do limite)"""
+        agora = time.monotonic()
+        with self._lock:
+            eventos = self._eventos.get(chave)
+            if not eventos:
+                return 0
+
+            while eventos and eventos[0] <= agora - janela:
+                eventos.popleft()
+            if not eventos:
+                del self._eventos[chave]
+                return 0
+
+            if len(eventos) < limite:
+                return 0
+            return max(1, math.ceil(eventos[0] + janela - agora))
+
+    def registrar(self, chave, limite):
+        """Registra um evento da chave (só os últimos "limite" eventos são guardados)"""
+        with self._lock:
+            eventos = self._eventos.pop(chave, None) or deque()
+            eventos.append(time.monotonic())
+            while len(eventos) > limite:
+                eventos.popleft()
+            self._eventos[chave] = eventos
+
+            while len(self._eventos) > self._maximo_chaves:
+                self._eventos.popitem(last=False)
+
+    def limpar(self, chave):
+        with self._lock:
+            self._eventos.pop(chave, None)
@@ -0,0 +1,127 @@
+from flask import g, request
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, generate_latest, multiprocess
+from .metricas_pool import estatisticas_pool
+import os
+import time
+
+# Com PROMETHEUS_MULTIPROC_DIR definido, cada worker do gunicorn grava suas métricas
+# em arquivos nesse diretório e o /metrics agrega todos os processos.
+
+LATENCIA_REQUISICOES = Histogram(
+    'http_requisicao_duracao_segundos',
+    'Latência das requisições HTTP por rota',
+    ['endpoint', 'metodo', 'status']
+)
+
+CONSULTAS_SQL = Counter(
+    'sql_consultas_total',
+    'Comandos SQL executados por rota',
+    ['endpoint']
+)
+
+TEMPO_SQL = Counter(
+    'sql_duracao_segundos_total',
+    'Tempo gasto em comandos SQL por rota',
+    ['endpoint']
+)
+
+CACHE_CONSULTAS = Counter(
+    'cache_consultas_total',
+    'Consultas aos caches em memória (resultado: acerto ou falha)',
+    ['cache', 'resultado']
+)
+
+POOL_CONEXOES = Gauge(
+    'db_pool_conexoes',
+    'Conexões do pool por estado',
+    ['engine', 'estado'],
+    multiprocess_mode='livesum'
+)
+
+NOTAS_FISCAIS_IMPORTADAS = Counter(
+    'notas_fiscais_importadas_total',
+    'Notas fiscais cadastradas'
+)
+
+ENTREGAS_REGISTRADAS = Counter(
+    'entregas_registradas_total',
+    'Entregas mensais registradas'
+)
+
+FECHAMENTOS_FECHADOS = Counter(
+    'fechamentos_fechados_total',
+    'Fechamentos mensais fechados'
+)
+
+FALHAS_LOGIN = Counter(
+    'login_falhas_total',
+    'Tentativas de login recusadas',
+    ['motivo']
+)
+
+LOGS_ACESSO_PENDENTES = Gauge(
+    'logs_acesso_pendentes',
+    'Logs de acesso na fila aguardando gravação',
+    multiprocess_mode='livesum'
+)
+
+LOGS_ACESSO_GRAVADOS = Counter(
+    'logs_acesso_gravados_total',
+    'Logs de acesso gravados pelo gravador em segundo plano'
+)
+
+LOGS_ACESSO_FILA_CHEIA = Counter(
+    'logs_acesso_fila_cheia_total',
+    'Logs de acesso gravados na própria requisição porque a fila estava cheia'
+)
+
+LOGS_ACESSO_PERDIDOS = Counter(
+    'logs_acesso_perdidos_total',
+    'Logs de acesso descartados por erro na gravação do lote'
+)
+
+
+def registrar_cache(cache, acerto):
+    """Contabiliza um acerto ou falha de cache"""
+    CACHE_CONSULTAS.labels(cache, 'acerto' if acerto else 'falha').inc()
+
+
+def registrar_metricas(app, db):
+    """Registra a coleta de latência e de SQL por rota"""
+    @app.before_request
+    def iniciar_cronometro():
+        g._inicio_metricas = time.perf_counter()
+
+    @app.after_request
+    def observar_requisicao(response):
+        if '_inicio_metricas' not in g:
+            return response
+
+        endpoint = request.endpoint or 'desconhecido'
+        LATENCIA_REQUISICOES.labels(endpoint, request.method, response.status_code).observe(
+            time.perf_counter() - g._inicio_metricas
+        )
+
+        # Contadores de SQL preenchidos pela instrumentação da requisição
+        sql = g.get('_sql')
+        if sql:
+            CONSULTAS_SQL.labels(endpoint).inc(sql['consultas'])
+            TEMPO_SQL.labels(endpoint).inc(sql['tempo'])
+
+        for engine, dados in estatisticas_pool(db).items():
+            for estado in ('checkedout', 'checkedin', 'overflow'):
+                if estado in dados:
+                    POOL_CONEXOES.labels(engine, estado).set(dados[estado])
+
+        return response
+
+
+def gerar_metricas():
+    """Gera o texto no formato do Prometheus, agregando os workers quando em multiprocesso"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+
+    return generate_latest(registro)
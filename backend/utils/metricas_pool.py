@@ -0,0 +1,51 @@
+from sqlalchemy import event
+import threading
+import weakref
+
+# Contadores de eventos por engine. A chave é a engine, não o pool: engine.dispose() (no
+# post_fork do gunicorn) troca o pool, e o novo herda os listeners registrados pela engine
+_contadores = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _incrementar(contadores, evento):
+    with _lock:
+        contadores[evento] += 1
+
+
+def registrar_metricas_pool(db):
+    """Registra os eventos do pool em todas as engines do app atual"""
+    for engine in db.engines.values():
+        if engine in _contadores:
+            continue
+
+        contadores = {'conexoes_criadas': 0, 'checkouts': 0, 'checkins': 0, 'invalidacoes': 0}
+        _contadores[engine] = contadores
+
+        # Registrados na engine, valem também para os pools recriados por dispose()
+        event.listen(engine, 'connect', lambda *args, c=contadores: _incrementar(c, 'conexoes_criadas'))
+        event.listen(engine, 'checkout', lambda *args, c=contadores: _incrementar(c, 'checkouts'))
+        event.listen(engine, 'checkin', lambda *args, c=contadores: _incrementar(c, 'checkins'))
+        event.listen(engine, 'invalidate', lambda *args, c=contadores: _incrementar(c, 'invalidacoes'))
+
+
+def estatisticas_pool(db):
+    """Retorna o estado atual e os contadores do pool de cada engine"""
+    estatisticas = {}
+
+    for chave, engine in db.engines.items():
+        pool = engine.pool
+
+        dados = {'tipo': type(pool).__name__}
+        # NullPool e StaticPool não possuem tamanho nem overflow
+        for atributo in ('size', 'checkedin', 'checkedout', 'overflow'):
+            metodo = getattr(pool, atributo, None)
+            if metodo is not None:
+                dados[atributo] = metodo()
+
+        with _lock:
+            dados.update(_contadores.get(engine, {}))
+
+        estatisticas[chave or 'default'] = dados
+
+    return estatisticas
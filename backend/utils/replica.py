@@ -0,0 +1,87 @@
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from functools import wraps
+import inspect
+
+# Chave do bind da réplica em SQLALCHEMY_BINDS
+CHAVE_REPLICA = 'replica'
+
+
+def _usar_replica(sessao):
+    if not has_app_context():
+        return False
+
+    # Fora de uma chamada @somente_leitura tudo vai para o primário
+    if not g.get('_leituras_replica'):
+        return False
+
+    # Depois de uma escrita a requisição fica no primário (leitura após escrita)
+    if g.get('_escreveu_no_primario'):
+        return False
+
+    # Flush e alterações pendentes sempre vão para o primário
+    if sessao._flushing or sessao.new or sessao.dirty or sessao.deleted:
+        return False
+
+    return True
+
+
+class SessaoRoteada(Session):
+    """Sessão que envia as leituras marcadas com @somente_leitura para a réplica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _usar_replica(self):
+            engine = self._db.engines.get(CHAVE_REPLICA)
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(SessaoRoteada, 'after_flush')
+def _marcar_escrita(sessao, contexto):
+    if has_app_context():
+        g._escreveu_no_primario = True
+
+
+@event.listens_for(SessaoRoteada, 'do_orm_execute')
+def _marcar_escrita_em_massa(estado):
+    # UPDATE/DELETE/INSERT executados direto (Query.update, session.execute(update(...)))
+    # não passam pelo flush
+    if estado.is_update or estado.is_delete or estado.is_insert:
+        _marcar_escrita(estado.session, None)
+
+
+def somente_leitura(funcao):
+    """Marca uma função de serviço como leitura, permitindo que ela use a réplica
+
+    Em geradores, a marcação vale enquanto o gerador é consumido (exportações em fluxo).
+    """
+    if inspect.isgeneratorfunction(funcao):
+        @wraps(funcao)
+        def wrapper_gerador(*args, **kwargs):
+            if not has_app_context():
+                yield from funcao(*args, **kwargs)
+                return
+
+            g._leituras_replica = g.get('_leituras_replica', 0) + 1
+            try:
+                yield from funcao(*args, **kwargs)
+            finally:
+                g._leituras_replica -= 1
+
+        return wrapper_gerador
+
+    @wraps(funcao)
+    def wrapper(*args, **kwargs):
+        if not has_app_context():
+            return funcao(*args, **kwargs)
+
+        g._leituras_replica = g.get('_leituras_replica', 0) + 1
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            g._leituras_replica -= 1
+
+    return wrapper
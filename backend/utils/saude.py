@@ -0,0 +1,111 @@
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+from ..migracoes import migracoes_pendentes
+from .metricas import registrar_cache
+import threading
+import time
+
+# Último resultado da verificação de prontidão, reaproveitado por alguns segundos
+_cache = {'resultado': None, 'expira_em': 0}
+_lock = threading.Lock()
+
+
+def _verificar_pool(engine, limite):
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {'status': 'ok', 'tipo': type(pool).__name__}
+
+    capacidade = pool.size() + max(pool._max_overflow, 0)
+    em_uso = pool.checkedout()
+    uso = em_uso / capacidade if capacidade else 0
+
+    return {
+        'status': 'ok' if uso < limite else 'saturado',
+        'em_uso': em_uso,
+        'capacidade': capacidade,
+        'uso': round(uso, 2)
+    }
+
+
+def _verificar_conexao(engine, orcamento_ms):
+    inicio = time.perf_counter()
+    try:
+        with engine.connect() as conexao:
+            if engine.dialect.name == 'postgresql':
+                # Evita que a verificação fique presa em um banco lento
+                conexao.execute(text(f"SET LOCAL statement_timeout = {int(orcamento_ms)}"))
+            conexao.execute(text("SELECT 1"))
+    except Exception as e:
+        return {'status': 'erro', 'erro': str(e)}
+
+    latencia_ms = (time.perf_counter() - inicio) * 1000
+    return {
+        'status': 'ok' if latencia_ms <= orcamento_ms else 'lento',
+        'latencia_ms': round(latencia_ms, 1)
+    }
+
+
+def _verificar_migracao(engine):
+    try:
+        with engine.connect() as conexao:
+            pendentes = migracoes_pendentes(conexao)
+    except Exception as e:
+        return {'status': 'erro', 'erro': str(e)}
+
+    # Colunas que o init-db ainda não incluiu ou converteu: as consultas dos modelos falhariam
+    if pendentes:
+        return {'status': 'pendente', 'pendentes': pendentes}
+    return {'status': 'ok'}
+
+
+def _verificar_cache():
+    # Importado aqui porque os serviços dependem de "backend" já inicializado
+    from ..services.catalogo_service import catalogo
+
+    return {
+        'status': 'ok',
+        'backend': 'memoria',
+        'carregado': catalogo._versoes is not None,
+        'insumos': len(catalogo.insumos),
+        'fornecedores': len(catalogo.fornecedores)
+    }
+
+
+def verificar_prontidao(app, db):
+    """Verifica banco, pool, migração e cache, reaproveitando o resultado por HEALTH_CACHE_SEGUNDOS"""
+    agora = time.monotonic()
+    if _cache['resultado'] is not None and agora < _cache['expira_em']:
+        registrar_cache('saude', True)
+        return _cache['resultado']
+
+    with _lock:
+        if _cache['resultado'] is not None and agora < _cache['expira_em']:
+            return _cache['resultado']
+
+        orcamento_ms = app.config.get('HEALTH_ORCAMENTO_MS', 500)
+        limite_pool = app.config.get('HEALTH_LIMITE_POOL', 0.9)
+
+        registrar_cache('saude', False)
+
+        verificacoes = {}
+        for chave, engine in db.engines.items():
+            nome = chave or 'default'
+            pool = _verificar_pool(engine, limite_pool)
+            verificacoes[f'pool_{nome}'] = pool
+
+            # Com o pool esgotado a conexão esperaria o pool_timeout; não vale a pena tentar
+            if pool['status'] == 'saturado':
+                verificacoes[f'banco_{nome}'] = {'status': 'indisponivel', 'erro': 'pool saturado'}
+            else:
+                verificacoes[f'banco_{nome}'] = _verificar_conexao(engine, orcamento_ms)
+
+        verificacoes['migracao'] = _verificar_migracao(db.engine)
+        verificacoes['cache'] = _verificar_cache()
+
+        pronto = all(v['status'] == 'ok' for v in verificacoes.values())
+        resultado = {'status': 'pronto' if pronto else 'indisponivel', 'verificacoes': verificacoes}
+
+        _cache['resultado'] = resultado
+        _cache['expira_em'] = agora + app.config.get('HEALTH_CACHE_SEGUNDOS', 5)
+
+        return resultado
@@ -0,0 +1,23 @@
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+from functools import lru_cache
+
+
+def gerar_hash_senha(senha):
+    """Hash da senha com o método configurado em SENHA_METODO"""
+    return generate_password_hash(senha, method=current_app.config['SENHA_METODO'])
+
+
+@lru_cache(maxsize=8)
+def _prefixo_metodo(metodo):
+    # O werkzeug completa o método com os parâmetros padrão ("scrypt" vira "scrypt:32768:8:1"),
+    # então o prefixo esperado vem de um hash gerado com ele
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+
+def verificar_senha(senha_hash, senha):
+    """Confere a senha com o hash: (senha correta, hash feito com outro método ou custo)"""
+    if not senha_hash or not check_password_hash(senha_hash, senha):
+        return False, False
+
+    return True, senha_hash.split('$', 1)[0] != _prefixo_metodo(current_app.config['SENHA_METODO'])
@@ -0,0 +1,50 @@
+from flask import jsonify
+
+
+class UsuarioToken:
+    """Usuário da requisição, montado só com as claims do token de acesso (sem consultar o banco)"""
+    __slots__ = ('id', 'nivel_acesso')
+
+    def __init__(self, id, nivel_acesso):
+        self.id = id
+        self.nivel_acesso = nivel_acesso
+
+
+def usuario_do_token():
+    """Usuário do token validado por @jwt_required"""
+    from flask_jwt_extended import get_jwt
+
+    dados = get_jwt()
+    return UsuarioToken(int(dados['sub']), dados.get('nivel_acesso'))
+
+
+def registrar_jwt(app):
+    """Configura a validação dos tokens: lista de revogação e respostas de erro no formato da API"""
+    # Importado aqui para não pesar no tempo de importação do pacote
+    from flask_jwt_extended import JWTManager
+
+    jwt = JWTManager(app)
+
+    @jwt.token_in_blocklist_loader
+    def verificar_revogacao(cabecalho, dados):
+        from ..services.tokens_service import token_revogado
+        return token_revogado(dados['jti'])
+
+    @jwt.unauthorized_loader
+    def token_ausente(motivo):
+        return jsonify({"error": "Token de acesso ausente"}), 401
+
+    # Também usado quando o tipo do token (acesso ou renovação) não é o da rota
+    @jwt.invalid_token_loader
+    def token_invalido(motivo):
+        return jsonify({"error": f"Token inválido: {motivo}"}), 401
+
+    @jwt.expired_token_loader
+    def token_expirado(cabecalho, dados):
+        return jsonify({"error": "Token expirado"}), 401
+
+    @jwt.revoked_token_loader
+    def token_revogado_resposta(cabecalho, dados):
+        return jsonify({"error": "Token revogado"}), 401
+
+    return jwt
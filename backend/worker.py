@@ -0,0 +1,97 @@
+from . import db
+from .services.tarefas_service import (
+    reservar_tarefa, executar_tarefa, recuperar_tarefas_abandonadas, registrar_batimento
+)
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import signal
+import socket
+import threading
+
+logger = logging.getLogger('backend.worker')
+
+# Intervalo entre verificações de tarefas abandonadas, em segundos
+INTERVALO_RECUPERACAO = 60
+
+
+def _manter_batimento(app, tarefa_id, nome, intervalo, concluida):
+    """Renova atualizado_em da tarefa a cada intervalo até ela terminar"""
+    while not concluida.wait(intervalo):
+        with app.app_context():
+            try:
+                registrar_batimento(tarefa_id, nome)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Erro ao registrar atividade da tarefa %s", tarefa_id)
+
+
+def _executar_com_batimento(app, tarefa, nome):
+    """Executa a tarefa enquanto outra thread sinaliza que o worker continua ativo"""
+    concluida = threading.Event()
+    batimento = threading.Thread(
+        target=_manter_batimento,
+        args=(app, tarefa.id, nome, app.config['TAREFAS_BATIMENTO'], concluida),
+        daemon=True
+    )
+    batimento.start()
+    try:
+        return executar_tarefa(tarefa.id)
+    finally:
+        concluida.set()
+        batimento.join()
+
+
+def _executar_fila(app, nome, intervalo, parar):
+    """Laço de uma thread: reserva e executa tarefas até receber o sinal de parada"""
+    while not parar.is_set():
+        tarefa = None
+        with app.app_context():
+            try:
+                tarefa = reservar_tarefa(nome)
+                if tarefa:
+                    logger.info("Executando tarefa %s (%s)", tarefa.id, tarefa.tipo)
+                    tarefa = _executar_com_batimento(app, tarefa, nome)
+                    logger.info("Tarefa %s terminou com status %s", tarefa.id, tarefa.status)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Erro no worker %s", nome)
+
+        # Sem tarefa pendente (ou após um erro), espera antes de consultar a fila de novo
+        if not tarefa:
+            parar.wait(intervalo)
+
+
+def _recuperar(app):
+    with app.app_context():
+        reenfileiradas, falhas = recuperar_tarefas_abandonadas(
+            app.config['TAREFAS_TIMEOUT'], app.config['TAREFAS_MAX_TENTATIVAS']
+        )
+    if reenfileiradas or falhas:
+        logger.warning("Tarefas abandonadas: %s reenfileiradas, %s marcadas com erro", reenfileiradas, falhas)
+
+
+def executar_worker(app, threads=None, intervalo=None):
+    """Executa tarefas da fila com um pool de threads até SIGTERM/SIGINT"""
+    threads = threads or app.config['TAREFAS_THREADS']
+    intervalo = intervalo or app.config['TAREFAS_INTERVALO']
+    identificacao = f"{socket.gethostname()}:{os.getpid()}"
+
+    parar = threading.Event()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sinal, lambda *args: parar.set())
+
+    _recuperar(app)
+    logger.info("Worker %s iniciado com %s threads", identificacao, threads)
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='tarefas') as executor:
+        for i in range(threads):
+            executor.submit(_executar_fila, app, f"{identificacao}/{i}", intervalo, parar)
+
+        while not parar.wait(INTERVALO_RECUPERACAO):
+            try:
+                _recuperar(app)
+            except Exception:
+                logger.exception("Erro ao recuperar tarefas abandonadas")
+
+    logger.info("Worker %s encerrado", identificacao)
@@ -0,0 +1,127 @@
+"""Registra entregas em paralelo no mesmo registro mensal e confere os totais finais.
+
+Antes dos contadores atômicos, duas requisições simultâneas liam o mesmo
+quantidade_entregue/estoque_atual e uma das somas se perdia. O script dispara
+POSTs concorrentes pela API e falha (código de saída 1) se quantidade_entregue,
+quantidade_paga, estoque_final do registro ou estoque_atual do insumo não
+baterem exatamente com a soma das entregas.
+
+Uso (a partir da raiz do projeto):
+
+    python benchmarks/concorrencia_entregas.py [--threads 8] [--entregas 200] [--url postgresql://...]
+
+Sem --url (ou DATABASE_URL), usa um banco SQLite temporário, que serializa as
+escritas e por isso só confere a soma. Para reproduzir a concorrência real entre
+workers do gunicorn, aponte para um PostgreSQL de teste: o script cria e remove
+as próprias tabelas, então não use o banco de produção.
+"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import create_app, db  # noqa: E402
+from backend.cli import MODELOS  # noqa: E402
+from backend.models.controle_mensal_models import RegistroMensal  # noqa: E402
+from backend.models.nfe_models import Insumo  # noqa: E402
+
+ESTOQUE_INICIAL = Decimal('100')
+
+
+def preparar(app):
+    with app.app_context():
+        for modulo in MODELOS:
+            importlib.import_module(modulo)
+        db.drop_all()
+        db.create_all()
+        insumo = Insumo(nome='Insumo de teste', unidade_medida='kg', estoque_atual=ESTOQUE_INICIAL)
+        db.session.add(insumo)
+        db.session.flush()
+        registro = RegistroMensal(
+            mes=date.today().month,
+            ano=date.today().year,
+            insumo_id=insumo.id,
+            estoque_inicial=ESTOQUE_INICIAL,
+            quantidade_entregue=0,
+            quantidade_contratada=0,
+            quantidade_paga=0,
+            estoque_final=ESTOQUE_INICIAL
+        )
+        db.session.add(registro)
+        db.session.commit()
+        return insumo.id, registro.id
+
+
+def postar_entrega(app, registro_id, indice):
+    # Um cliente por chamada: cada thread faz a própria requisição, com sessão própria
+    quantidade = Decimal(1 + indice % 5)
+    resposta = app.test_client().post(f'/api/controle-mensal/registros/{registro_id}/entregas', json={
+        'data_entrega': date.today().isoformat(),
+        'quantidade': str(quantidade),
+        'valor_total': str(quantidade * 3),
+        'status_pagamento': 'pago' if indice % 2 else 'pendente'
+    })
+    if resposta.status_code != 201:
+        raise RuntimeError(f"Entrega {indice}: HTTP {resposta.status_code} {resposta.get_data(as_text=True)}")
+    return quantidade, indice % 2 == 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--entregas', type=int, default=200)
+    parser.add_argument('--url', default=os.environ.get('DATABASE_URL'))
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        arquivo.close()
+        url = f"sqlite:///{arquivo.name}"
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    insumo_id, registro_id = preparar(app)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        resultados = list(executor.map(lambda i: postar_entrega(app, registro_id, i), range(args.entregas)))
+    duracao = time.perf_counter() - inicio
+
+    entregue = sum(quantidade for quantidade, _ in resultados)
+    pago = sum(quantidade for quantidade, pago in resultados if pago)
+
+    with app.app_context():
+        registro = db.session.get(RegistroMensal, registro_id)
+        insumo = db.session.get(Insumo, insumo_id)
+        obtido = {
+            'quantidade_entregue': Decimal(registro.quantidade_entregue),
+            'quantidade_paga': Decimal(registro.quantidade_paga),
+            'estoque_final': Decimal(registro.estoque_final),
+            'estoque_atual': Decimal(insumo.estoque_atual),
+        }
+    esperado = {
+        'quantidade_entregue': entregue,
+        'quantidade_paga': pago,
+        'estoque_final': ESTOQUE_INICIAL + entregue,
+        'estoque_atual': ESTOQUE_INICIAL + entregue,
+    }
+
+    print(f"{args.entregas} entregas em {args.threads} threads: {duracao:.2f} s")
+    divergencias = 0
+    for campo, valor in esperado.items():
+        ok = obtido[campo] == valor
+        divergencias += not ok
+        print(f"  {campo:<20} esperado {valor:>10}  obtido {obtido[campo]:>10}  {'ok' if ok else 'DIVERGENTE'}")
+
+    sys.exit(1 if divergencias else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Mede o tempo de importação da aplicação (python -X importtime) e compara com um orçamento.
+
+Uso (a partir da raiz do projeto):
+
+    python benchmarks/tempo_importacao.py [--orcamento-ms 800] [--repeticoes 5] [--top 15]
+
+Termina com código 1 quando a mediana ultrapassa o orçamento.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALVO = 'backend.run'
+
+
+def medir_importacao():
+    """Executa um processo novo importando a aplicação e retorna {módulo: (próprio_us, acumulado_us)}"""
+    env = dict(os.environ)
+    # Nenhum acesso ao banco acontece na importação; um SQLite em memória basta
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    env['PYTHONPATH'] = RAIZ + os.pathsep + env.get('PYTHONPATH', '')
+
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {ALVO}'],
+        cwd=RAIZ, env=env, capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {ALVO}:\n{processo.stderr[-2000:]}")
+
+    modulos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        modulos[nome.strip()] = (int(proprio), int(acumulado))
+
+    return modulos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orcamento-ms', type=float,
+                        default=float(os.getenv('ORCAMENTO_IMPORTACAO_MS', 800)))
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    totais = []
+    modulos = {}
+    for _ in range(args.repeticoes):
+        modulos = medir_importacao()
+        totais.append(modulos[ALVO][1] / 1000)
+
+    mediana = statistics.median(totais)
+
+    print("Módulos mais lentos (tempo próprio, última execução):")
+    mais_lentos = sorted(modulos.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for nome, (proprio, acumulado) in mais_lentos:
+        print(f"  {proprio / 1000:8.1f} ms  {acumulado / 1000:8.1f} ms  {nome}")
+
+    print(f"\nImportação de {ALVO}: mediana {mediana:.1f} ms "
+          f"(mín {min(totais):.1f} ms, máx {max(totais):.1f} ms, {len(totais)} execuções)")
+    print(f"Orçamento: {args.orcamento_ms:.0f} ms")
+
+    if mediana > args.orcamento_ms:
+        print("ACIMA DO ORÇAMENTO")
+        return 1
+
+    print("Dentro do orçamento")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
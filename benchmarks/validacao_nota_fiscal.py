@@ -0,0 +1,115 @@
+"""Mede a vazão de load/validação do NotaFiscalSchema para uma nota fiscal com 500 itens.
+
+Compara um schema novo por chamada (como era antes) com a instância em cache de obter_schema.
+
+Uso (a partir da raiz do projeto):
+
+    python benchmarks/validacao_nota_fiscal.py [--itens 500] [--repeticoes 50]
+
+A nota montada aqui é validada também em tests/test_esquemas.py, para que o benchmark
+acompanhe os campos do schema.
+
+As verificações de existência de insumo/fornecedor são trocadas por consultas a um
+conjunto em memória (equivalente ao catálogo já carregado), para que o resultado meça
+apenas o custo do marshmallow.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import create_app, db  # noqa: E402
+from backend.services import nfe_service  # noqa: E402
+from backend.services.nfe_service import NotaFiscalSchema  # noqa: E402
+from backend.utils.esquemas import obter_schema  # noqa: E402
+
+
+def montar_nota_fiscal(quantidade_itens):
+    itens = []
+    total = Decimal('0')
+    for i in range(quantidade_itens):
+        quantidade = Decimal(10 + i % 7)
+        valor_unitario = Decimal('3.75') + Decimal(i % 11) / 4
+        valor_total = quantidade * valor_unitario
+        total += valor_total
+        itens.append({
+            'insumo_id': i % 50 + 1,
+            'quantidade': str(quantidade),
+            'valor_unitario': str(valor_unitario),
+            'valor_total': str(valor_total)
+        })
+
+    return {
+        'numero': '000123',
+        'serie': '1',
+        'data_emissao': date.today().isoformat(),
+        'data_recebimento': date.today().isoformat(),
+        'fornecedor_id': 1,
+        'valor_total': str(total),
+        'status': 'pendente',
+        'itens': itens
+    }
+
+
+def medir(carregar, payload, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        carregar(payload)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--itens', type=int, default=500)
+    parser.add_argument('--repeticoes', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+    insumos = set(range(1, 51))
+    nfe_service.insumo_existe = lambda insumo_id: insumo_id in insumos
+    nfe_service.fornecedor_existe = lambda fornecedor_id: fornecedor_id == 1
+
+    payload = montar_nota_fiscal(args.itens)
+
+    with app.app_context():
+        db.create_all()
+
+        cenarios = [
+            ('schema novo por chamada', lambda dados: NotaFiscalSchema().load(dados)),
+            ('obter_schema (em cache)', lambda dados: obter_schema(NotaFiscalSchema).load(dados)),
+        ]
+
+        # Aquecimento (primeira consulta ao banco, cache de instâncias)
+        for _, carregar in cenarios:
+            carregar(payload)
+
+        resultados = {}
+        for nome, carregar in cenarios:
+            resultados[nome] = medir(carregar, payload, args.repeticoes)
+
+        # Custo isolado de construir o schema, que o cache elimina
+        construcoes = 1000
+        inicio = time.perf_counter()
+        for _ in range(construcoes):
+            NotaFiscalSchema()
+        construcao_ms = (time.perf_counter() - inicio) * 1000 / construcoes
+
+    print(f"Nota fiscal com {args.itens} itens, mediana de {args.repeticoes} execuções:")
+    for nome, tempo in resultados.items():
+        print(f"  {nome:26} {tempo * 1000:8.2f} ms  {args.itens / tempo:10.0f} itens/s")
+    print(f"  {'construção do schema':26} {construcao_ms:8.3f} ms")
+
+    antes, depois = resultados.values()
+    print(f"\nGanho: {(antes - depois) / antes * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import os
+import shutil
+
+# Configuração do gunicorn (carregada automaticamente a partir da raiz do projeto)
+
+# Carrega a aplicação uma vez no processo mestre; os workers são criados por fork
+# já com os módulos importados (GUNICORN_PRELOAD=false desativa)
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'sim', 'yes')
+
+
+def on_starting(server):
+    # Limpa as métricas de execuções anteriores do diretório multiprocesso do Prometheus
+    diretorio = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if diretorio:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        os.makedirs(diretorio, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Conexões abertas pelo processo mestre não podem ser compartilhadas entre workers
+    if server.cfg.preload_app:
+        from backend import db
+        from backend.run import app
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Remove as métricas "live" de um worker encerrado
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -20,7 +20,7 @@ pip install pytest pytest-flask pytest-cov
 
 # Executar testes com cobertura
 echo "Executando testes de integração com análise de cobertura..."
-python -m pytest tests/test_integracao.py -v --cov=backend --cov-report=term --cov-report=html:coverage_report
+python -m pytest tests -v --cov=backend --cov-report=term --cov-report=html:coverage_report
 
 # Verificar resultado dos testes
 if [ $? -eq 0 ]; then
@@ -13,7 +13,7 @@ pip install pytest pytest-flask pytest-cov
 
 :: Executar testes com cobertura
 echo Executando testes de integração com análise de cobertura...
-python -m pytest tests\test_integracao.py -v
+python -m pytest tests -v
 
 :: Verificar resultado dos testes
 if %ERRORLEVEL% EQU 0 (
@@ -0,0 +1,51 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import create_app, db  # noqa: E402
+from backend.cli import MODELOS  # noqa: E402
+
+
+def _limpar_caches():
+    # Caches em memória do processo, que não devem passar de um teste (e de um banco) para outro
+    from backend.services.catalogo_service import catalogo
+    from backend.services.tokens_service import lista_revogacao
+
+    catalogo.invalidar()
+    lista_revogacao.invalidar()
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicação com um banco SQLite próprio do teste (arquivo, para aceitar várias threads)"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'teste.db'}",
+        # Hash barato: os testes não medem o custo do hash
+        'SENHA_METODO': 'pbkdf2:sha256:1000',
+        'LOG_ACESSO_ASSINCRONO': False,
+        'JWT_SECRET_KEY': 'chave-dos-testes-com-tamanho-suficiente',
+        'HISTORICO_DIR': str(tmp_path / 'historico'),
+    })
+
+    _limpar_caches()
+    with app.app_context():
+        for modulo in MODELOS:
+            importlib.import_module(modulo)
+        db.create_all()
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
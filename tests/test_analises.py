@@ -0,0 +1,87 @@
+from datetime import date, datetime
+
+from backend import db
+from backend.models.fechamento_models import ResumoMensal
+from backend.models.nfe_models import Fornecedor, Insumo
+
+
+def _popular_resumos(app):
+    """Totais de janeiro e fevereiro do arroz, comprado de dois fornecedores"""
+    with app.app_context():
+        arroz = Insumo(nome='Arroz', unidade_medida='kg')
+        sul = Fornecedor(nome='Distribuidora Sul', cnpj='11.111.111/0001-11')
+        norte = Fornecedor(nome='Distribuidora Norte', cnpj='22.222.222/0001-22')
+        db.session.add_all([arroz, sul, norte])
+        db.session.flush()
+        for mes, fornecedor, quantidade, valor in (
+            (1, sul, 10, 50), (1, norte, 10, 60), (2, sul, 20, 120), (2, norte, 10, 70)
+        ):
+            db.session.add(ResumoMensal(
+                mes_referencia=date(2026, mes, 1), insumo_id=arroz.id, fornecedor_id=fornecedor.id,
+                quantidade_total=quantidade, valor_total=valor, custo_medio=valor / quantidade, entregas=1,
+                atualizado_em=datetime(2026, mes + 1, 1)
+            ))
+        db.session.commit()
+        return arroz.id, sul.id, norte.id
+
+
+def _criar_analise(client, tipo, **parametros):
+    return client.post('/api/analise', json={
+        'titulo': f'Arroz - {tipo}', 'tipo': tipo, 'data_inicio': '2026-01-01', 'data_fim': '2026-02-28',
+        'parametros': parametros
+    })
+
+
+def test_analise_mes_a_mes_e_por_fornecedor(app, client):
+    arroz_id, sul_id, norte_id = _popular_resumos(app)
+
+    resposta = _criar_analise(client, 'mes_a_mes', insumo_id=arroz_id)
+    assert resposta.status_code == 201
+    meses = resposta.get_json()['resultados']['meses']
+    assert [(m['mes'], m['valor_total'], m['variacao_valor']) for m in meses] == [
+        ('2026-01', 110.0, None), ('2026-02', 190.0, 72.73)
+    ]
+
+    resposta = _criar_analise(client, 'fornecedores', insumo_id=str(arroz_id))
+    assert resposta.status_code == 201
+    fornecedores = resposta.get_json()['resultados']['fornecedores']
+    # Do mais barato (170/30) para o mais caro (130/20)
+    assert [(f['fornecedor_id'], f['diferenca_menor_custo']) for f in fornecedores] == [(sul_id, 0.0), (norte_id, 14.71)]
+
+    # Filtro pela chave de "parametros" (o ID foi normalizado para inteiro)
+    resposta = client.get(f'/api/analise?insumo_id={arroz_id}')
+    assert sorted(a['tipo'] for a in resposta.get_json()) == ['fornecedores', 'mes_a_mes']
+    assert client.get(f'/api/analise?insumo_id={arroz_id + 1}').get_json() == []
+
+
+def test_orcado_realizado_e_parametros_obrigatorios(app, client):
+    arroz_id, _, _ = _popular_resumos(app)
+
+    resposta = _criar_analise(client, 'orcado_realizado', insumo_id=arroz_id, orcamento=400)
+    assert resposta.status_code == 201
+    resultado = resposta.get_json()['resultados']
+    assert (resultado['realizado'], resultado['saldo'], resultado['percentual_executado']) == (300.0, 100.0, 75.0)
+    assert [m['orcado'] for m in resultado['meses']] == [200.0, 200.0]
+
+    assert _criar_analise(client, 'orcado_realizado', insumo_id=arroz_id).status_code == 400
+    assert _criar_analise(client, 'fornecedores').status_code == 400
+    assert _criar_analise(client, 'desconhecido').status_code == 400
+
+
+def test_recalculo_acompanha_os_resumos(app, client):
+    arroz_id, _, _ = _popular_resumos(app)
+
+    primeira = _criar_analise(client, 'mes_a_mes', insumo_id=arroz_id).get_json()
+    # Mesma análise com os mesmos dados: o cálculo anterior é reaproveitado
+    segunda = _criar_analise(client, 'mes_a_mes', insumo_id=arroz_id).get_json()
+    assert segunda['calculado_em'] == primeira['calculado_em']
+
+    with app.app_context():
+        resumo = ResumoMensal.query.filter_by(mes_referencia=date(2026, 2, 1)).first()
+        resumo.valor_total += 10
+        resumo.atualizado_em = datetime.now()
+        db.session.commit()
+
+    resposta = client.post(f"/api/analise/{primeira['id']}/recalcular")
+    assert resposta.status_code == 200
+    assert resposta.get_json()['resultados']['meses'][1]['valor_total'] == 200.0
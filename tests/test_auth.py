@@ -0,0 +1,128 @@
+from sqlalchemy import event
+
+from backend import db
+from backend.models.auth_models import LogAcesso, Usuario
+from backend.services import auth_service
+from backend.utils.limitador import LimitadorJanela
+from backend.utils.senhas import gerar_hash_senha
+
+
+def _criar_usuario(app, email='admin@teste.com', senha='segredo123', nivel_acesso='admin'):
+    with app.app_context():
+        usuario = Usuario(nome='Teste', email=email, nivel_acesso=nivel_acesso, ativo=True,
+                          senha_hash=gerar_hash_senha(senha))
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario.id
+
+
+def _login(client, email='admin@teste.com', senha='segredo123'):
+    return client.post('/api/auth/login', json={'email': email, 'senha': senha})
+
+
+def _cabecalho(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_login_renovacao_e_logout(app, client):
+    usuario_id = _criar_usuario(app)
+
+    resposta = _login(client)
+    assert resposta.status_code == 200
+    dados = resposta.get_json()
+    assert dados['usuario']['id'] == usuario_id
+    assert 'senha_hash' not in dados['usuario']
+    acesso, renovacao = dados['access_token'], dados['refresh_token']
+
+    assert client.get('/api/auth/perfil').status_code == 401
+    assert client.get('/api/auth/perfil', headers=_cabecalho(acesso)).get_json()['email'] == 'admin@teste.com'
+
+    # O token de acesso não serve para renovar, e o de renovação não serve para as rotas
+    assert client.post('/api/auth/refresh', headers=_cabecalho(acesso)).status_code == 401
+    assert client.get('/api/auth/perfil', headers=_cabecalho(renovacao)).status_code == 401
+
+    resposta = client.post('/api/auth/refresh', headers=_cabecalho(renovacao))
+    assert resposta.status_code == 200
+    novo_acesso = resposta.get_json()['access_token']
+    assert client.get('/api/auth/perfil', headers=_cabecalho(novo_acesso)).status_code == 200
+
+    resposta = client.post('/api/auth/logout', headers=_cabecalho(acesso), json={'refresh_token': renovacao})
+    assert resposta.status_code == 200
+
+    assert client.get('/api/auth/perfil', headers=_cabecalho(acesso)).get_json() == {'error': 'Token revogado'}
+    assert client.post('/api/auth/refresh', headers=_cabecalho(renovacao)).status_code == 401
+    # Um token de acesso emitido antes do logout e não enviado nele continua válido até expirar
+    assert client.get('/api/auth/perfil', headers=_cabecalho(novo_acesso)).status_code == 200
+
+
+def test_rota_protegida_nao_consulta_usuario(app, client):
+    _criar_usuario(app)
+    acesso = _login(client).get_json()['access_token']
+    # Primeira verificação do processo: carrega a lista de revogação
+    assert client.get('/api/auth/perfil', headers=_cabecalho(acesso)).status_code == 200
+
+    comandos = []
+    with app.app_context():
+        def registrar(conexao, cursor, comando, *args):
+            comandos.append(comando)
+        event.listen(db.engine, 'before_cursor_execute', registrar)
+
+    resposta = client.get('/api/auth/usuarios', headers=_cabecalho(acesso))
+    assert resposta.status_code == 200
+    # Só a listagem: o usuário e o nível de acesso vêm do token, e a lista de revogação está em memória
+    assert len(comandos) == 1
+    assert 'ORDER BY usuarios.nome' in comandos[0]
+
+
+def test_renovacao_recusada_para_usuario_desativado(app, client):
+    usuario_id = _criar_usuario(app)
+    renovacao = _login(client).get_json()['refresh_token']
+
+    with app.app_context():
+        db.session.get(Usuario, usuario_id).ativo = False
+        db.session.commit()
+
+    resposta = client.post('/api/auth/refresh', headers=_cabecalho(renovacao))
+    assert resposta.status_code == 401
+
+
+def test_falhas_de_login_bloqueiam_sem_consultar_o_banco(app, client, monkeypatch):
+    # Contador próprio do teste (o do módulo vive durante todo o processo)
+    monkeypatch.setattr(auth_service, '_falhas_login', LimitadorJanela())
+    app.config.update(LOGIN_MAX_FALHAS=3, LOGIN_JANELA_SEGUNDOS=60)
+    _criar_usuario(app)
+
+    for _ in range(3):
+        assert _login(client, senha='errada').status_code == 401
+
+    comandos = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: comandos.append(args[2]))
+
+    # Bloqueado mesmo com a senha certa, sem consulta ao banco nem cálculo de hash
+    resposta = _login(client)
+    assert resposta.status_code == 429
+    assert 1 <= int(resposta.headers['Retry-After']) <= 60
+    assert comandos == []
+
+    # O limite é por email + IP: outro email continua podendo tentar
+    assert _login(client, email='outro@teste.com').status_code == 401
+
+    with app.app_context():
+        assert LogAcesso.query.filter_by(acao='falha_login').count() == 4
+
+
+def test_login_refaz_o_hash_com_outro_custo(app, client, monkeypatch):
+    monkeypatch.setattr(auth_service, '_falhas_login', LimitadorJanela())
+    usuario_id = _criar_usuario(app)
+
+    app.config['SENHA_METODO'] = 'pbkdf2:sha256:2000'
+    assert _login(client).status_code == 200
+    with app.app_context():
+        hash_novo = db.session.get(Usuario, usuario_id).senha_hash
+        assert hash_novo.startswith('pbkdf2:sha256:2000$')
+
+    # Com o custo atual, o hash não é refeito a cada login
+    assert _login(client).status_code == 200
+    with app.app_context():
+        assert db.session.get(Usuario, usuario_id).senha_hash == hash_novo
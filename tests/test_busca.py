@@ -0,0 +1,64 @@
+import pytest
+
+from backend import db
+from backend.models.nfe_models import Fornecedor, Insumo
+from backend.services.busca_service import preparar_busca, reindexar_busca
+
+
+@pytest.fixture
+def app_busca(app):
+    with app.app_context():
+        preparar_busca()
+    return app
+
+
+def _buscar(client, termo, **parametros):
+    resposta = client.get('/api/search', query_string={'q': termo, **parametros})
+    assert resposta.status_code == 200
+    return [(r['tipo'], r['nome']) for r in resposta.get_json()]
+
+
+def test_cadastro_entra_no_indice_e_sai_ao_desativar(app_busca, client):
+    resposta = client.post('/api/insumos', json={
+        'nome': 'Feijão Carioca', 'codigo': 'FEI-01', 'unidade_medida': 'kg', 'estoque_atual': '3'
+    })
+    assert resposta.status_code == 201
+    insumo = resposta.get_json()
+    assert (insumo['ativo'], insumo['estoque_atual']) == (True, 3.0)
+
+    # Sem acento e pelo prefixo, como no autocomplete
+    assert _buscar(client, 'feij') == [('insumo', 'Feijão Carioca')]
+    assert _buscar(client, 'FEI-01') == [('insumo', 'Feijão Carioca')]
+
+    resposta = client.put(f"/api/insumos/{insumo['id']}", json={
+        'nome': 'Feijão Carioca', 'codigo': 'FEI-01', 'unidade_medida': 'kg', 'ativo': False
+    })
+    assert resposta.status_code == 200
+    assert _buscar(client, 'feij') == []
+    assert [i['nome'] for i in client.get('/api/insumos?ativo=false').get_json()] == ['Feijão Carioca']
+
+
+def test_fornecedor_excluido_sai_do_indice(app_busca, client):
+    resposta = client.post('/api/fornecedores', json={'nome': 'Distribuidora Sul', 'cnpj': '12.345.678/0001-90'})
+    assert resposta.status_code == 201
+    assert _buscar(client, '12345678', tipos='fornecedor') == [('fornecedor', 'Distribuidora Sul')]
+
+    assert client.delete(f"/api/fornecedores/{resposta.get_json()['id']}").status_code == 200
+    assert _buscar(client, 'distrib') == []
+    assert client.get('/api/fornecedores?ativo=true').get_json() == []
+
+
+def test_reindexacao_inclui_apenas_cadastros_ativos(app_busca, client):
+    with app_busca.app_context():
+        # Gravados direto no banco, sem passar pelo índice
+        db.session.add_all([
+            Insumo(nome='Arroz Agulhinha', codigo='ARR', unidade_medida='kg'),
+            Insumo(nome='Arroz Integral', codigo='ARI', unidade_medida='kg', ativo=False),
+            Fornecedor(nome='Arrozeira Central', cnpj='98.765.432/0001-10'),
+        ])
+        db.session.commit()
+        assert _buscar(client, 'arroz') == []
+
+        reindexar_busca()
+
+    assert sorted(_buscar(client, 'arroz')) == [('fornecedor', 'Arrozeira Central'), ('insumo', 'Arroz Agulhinha')]
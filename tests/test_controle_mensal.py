@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+from backend import db
+from backend.models.controle_mensal_models import EntregaMensal, RegistroMensal
+from backend.models.estoque_models import MovimentacaoEstoque
+from backend.models.nfe_models import Insumo
+from backend.services import controle_mensal_service
+
+
+def _criar_registro(app, client, estoque_inicial=5):
+    with app.app_context():
+        insumo = Insumo(nome='Arroz', unidade_medida='kg')
+        db.session.add(insumo)
+        db.session.commit()
+        insumo_id = insumo.id
+
+    resposta = client.post('/api/controle-mensal/registros', json={
+        'mes_referencia': '2026-03-01', 'insumo_id': insumo_id, 'estoque_inicial': estoque_inicial
+    })
+    assert resposta.status_code == 201
+    return insumo_id, resposta.get_json()['id']
+
+
+def test_registro_mensal_por_mes_e_insumo(app, client):
+    insumo_id, registro_id = _criar_registro(app, client)
+
+    repetido = client.post('/api/controle-mensal/registros', json={
+        'mes_referencia': '2026-03-15', 'insumo_id': insumo_id, 'estoque_inicial': 1
+    })
+    assert repetido.status_code == 400
+
+    resposta = client.get('/api/controle-mensal/registros?mes_referencia=2026-03')
+    assert [(r['id'], r['mes'], r['ano']) for r in resposta.get_json()] == [(registro_id, 3, 2026)]
+    assert client.get('/api/controle-mensal/registros?mes_referencia=2026-04').get_json() == []
+
+    with app.app_context():
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('5')
+
+
+def test_lote_reenviado_nao_duplica_entregas(app, client):
+    insumo_id, registro_id = _criar_registro(app, client)
+    lote = {'entregas': [
+        {'registro_mensal_id': registro_id, 'data_entrega': '2026-03-10', 'quantidade': '4',
+         'valor_total': '20', 'status_pagamento': 'pago', 'chave_idempotencia': 'nf-1'},
+        {'registro_mensal_id': registro_id, 'data_entrega': '2026-03-12', 'quantidade': '1.5',
+         'valor_total': '9', 'chave_idempotencia': 'nf-2'},
+    ]}
+
+    primeira = client.post('/api/controle-mensal/entregas/lote', json=lote)
+    assert primeira.status_code == 201
+    assert (primeira.get_json()['criadas'], primeira.get_json()['duplicadas']) == (2, 0)
+
+    # Reenvio após um timeout do cliente: nada é gravado de novo
+    reenvio = client.post('/api/controle-mensal/entregas/lote', json=lote)
+    assert reenvio.status_code == 200
+    dados = reenvio.get_json()
+    assert (dados['criadas'], dados['duplicadas']) == (0, 2)
+    assert [e['id'] for e in dados['entregas']] == [e['id'] for e in primeira.get_json()['entregas']]
+
+    with app.app_context():
+        registro = db.session.get(RegistroMensal, registro_id)
+        assert registro.quantidade_entregue == Decimal('5.5')
+        assert registro.quantidade_paga == Decimal('4')
+        assert registro.estoque_final == Decimal('10.5')
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('10.5')
+
+        entregas = EntregaMensal.query.order_by(EntregaMensal.id).all()
+        assert [(e.insumo_id, e.valor_unitario) for e in entregas] == [(insumo_id, 5.0), (insumo_id, 6.0)]
+        assert MovimentacaoEstoque.query.filter_by(origem='entrega').count() == 2
+
+    listadas = client.get(f'/api/controle-mensal/registros/{registro_id}/entregas')
+    assert sorted(e['chave_idempotencia'] for e in listadas.get_json()) == ['nf-1', 'nf-2']
+
+
+def test_excluir_entrega_desfaz_os_contadores(app, client):
+    insumo_id, registro_id = _criar_registro(app, client)
+    resposta = client.post(f'/api/controle-mensal/registros/{registro_id}/entregas', json={
+        'registro_mensal_id': registro_id, 'data_entrega': '2026-03-10', 'quantidade': '0.1', 'valor_total': '1'
+    })
+    assert resposta.status_code == 201
+
+    assert client.delete(f"/api/controle-mensal/entregas/{resposta.get_json()['id']}").status_code == 200
+
+    with app.app_context():
+        registro = db.session.get(RegistroMensal, registro_id)
+        assert (registro.quantidade_entregue, registro.estoque_final) == (Decimal('0'), Decimal('5'))
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('5')
+
+
+def test_atualizar_registro_substitui_as_entregas(app, client):
+    insumo_id, registro_id = _criar_registro(app, client)
+    resposta = client.post(f'/api/controle-mensal/registros/{registro_id}/entregas', json={
+        'data_entrega': '2026-03-10', 'quantidade': '4', 'valor_total': '20', 'status_pagamento': 'pago'
+    })
+    assert resposta.status_code == 201
+
+    resposta = client.put(f'/api/controle-mensal/registros/{registro_id}', json={
+        'mes_referencia': '2026-03-01', 'insumo_id': insumo_id, 'estoque_inicial': 5,
+        'entregas': [{'registro_mensal_id': registro_id, 'data_entrega': '2026-03-12', 'quantidade': '3', 'valor_total': '15'}]
+    })
+    assert resposta.status_code == 200
+
+    with app.app_context():
+        registro = db.session.get(RegistroMensal, registro_id)
+        # A entrega antiga sai dos contadores e do estoque antes de a nova entrar
+        assert (registro.quantidade_entregue, registro.quantidade_paga) == (Decimal('3'), Decimal('0'))
+        assert registro.estoque_final == Decimal('8')
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('8')
+        assert sum(m.quantidade for m in MovimentacaoEstoque.query.filter_by(insumo_id=insumo_id)) == Decimal('8')
+        assert EntregaMensal.query.count() == 1
+
+
+def test_entrega_com_chave_gravada_ao_mesmo_tempo(app, client, monkeypatch):
+    insumo_id, registro_id = _criar_registro(app, client)
+    valor_unitario = controle_mensal_service._valor_unitario
+
+    def gravar_concorrente(quantidade, valor_total):
+        # Outra requisição grava a mesma chave entre a verificação e a inclusão
+        monkeypatch.setattr(controle_mensal_service, '_valor_unitario', valor_unitario)
+        with app.app_context():
+            controle_mensal_service.criar_entrega_mensal({
+                'registro_mensal_id': registro_id, 'data_entrega': '2026-03-10', 'quantidade': '4',
+                'valor_total': '20', 'chave_idempotencia': 'nf-1'
+            })
+        return valor_unitario(quantidade, valor_total)
+
+    monkeypatch.setattr(controle_mensal_service, '_valor_unitario', gravar_concorrente)
+    resposta = client.post(f'/api/controle-mensal/registros/{registro_id}/entregas', json={
+        'data_entrega': '2026-03-10', 'quantidade': '4', 'valor_total': '20', 'chave_idempotencia': 'nf-1'
+    })
+    assert resposta.status_code == 201
+
+    with app.app_context():
+        entrega = EntregaMensal.query.one()
+        assert resposta.get_json()['id'] == entrega.id
+        assert db.session.get(RegistroMensal, registro_id).quantidade_entregue == Decimal('4')
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('9')
@@ -0,0 +1,46 @@
+import threading
+
+from benchmarks.validacao_nota_fiscal import montar_nota_fiscal
+from backend.services import nfe_service
+from backend.services.busca_service import preparar_busca
+from backend.services.nfe_service import InsumoSchema, NotaFiscalSchema
+from backend.utils.esquemas import obter_schema
+
+
+def test_instancia_reaproveitada_por_thread_com_o_contexto_da_chamada():
+    schema = obter_schema(InsumoSchema, insumo_id=7)
+    assert obter_schema(InsumoSchema) is schema
+    # O contexto da chamada anterior não passa para a seguinte
+    assert schema.context == {}
+
+    outras = []
+    thread = threading.Thread(target=lambda: outras.append(obter_schema(InsumoSchema)))
+    thread.start()
+    thread.join()
+    assert outras[0] is not schema
+
+
+def test_contexto_de_atualizacao_nao_vale_para_o_cadastro_seguinte(app, client):
+    with app.app_context():
+        preparar_busca()
+
+    arroz = client.post('/api/insumos', json={'nome': 'Arroz', 'codigo': 'ARR', 'unidade_medida': 'kg'}).get_json()
+    # Atualização do próprio insumo com o mesmo código: o contexto (insumo_id) libera a duplicidade
+    resposta = client.put(f"/api/insumos/{arroz['id']}", json={'nome': 'Arroz Tipo 1', 'codigo': 'ARR', 'unidade_medida': 'kg'})
+    assert resposta.status_code == 200
+
+    # Na criação seguinte, com a mesma instância do schema, o código repetido é recusado
+    resposta = client.post('/api/insumos', json={'nome': 'Outro arroz', 'codigo': 'ARR', 'unidade_medida': 'kg'})
+    assert resposta.status_code == 400
+    assert 'ARR' in resposta.get_json()['error']
+
+
+def test_nota_fiscal_do_benchmark_passa_na_validacao(app, monkeypatch):
+    # Mesma troca das verificações de existência feita pelo benchmark
+    monkeypatch.setattr(nfe_service, 'insumo_existe', lambda insumo_id: 1 <= insumo_id <= 50)
+    monkeypatch.setattr(nfe_service, 'fornecedor_existe', lambda fornecedor_id: fornecedor_id == 1)
+
+    with app.app_context():
+        dados = obter_schema(NotaFiscalSchema).load(montar_nota_fiscal(60))
+
+    assert len(dados['itens']) == 60
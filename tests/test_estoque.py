@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from backend import db
+from backend.migracoes import aplicar_migracoes
+from backend.models.estoque_models import MovimentacaoEstoque
+from backend.models.nfe_models import Insumo
+from backend.services.estoque_service import (
+    abrir_razao_estoque, ajustar_estoque_insumos, calcular_estoque_em, definir_estoque_insumo, gerar_snapshots_estoque
+)
+
+
+def _criar_insumo(app, estoque=0, **campos):
+    with app.app_context():
+        insumo = Insumo(nome=campos.pop('nome', 'Arroz'), unidade_medida='kg', estoque_atual=estoque, **campos)
+        db.session.add(insumo)
+        db.session.commit()
+        return insumo.id
+
+
+def test_migracao_inclui_colunas_em_tabelas_existentes(app):
+    with app.app_context():
+        # Tabelas criadas antes das colunas novas
+        db.session.execute(text("ALTER TABLE insumos DROP COLUMN estoque_atual"))
+        db.session.execute(text("ALTER TABLE notas_fiscais DROP COLUMN status"))
+        db.session.execute(text("INSERT INTO insumos (nome, unidade_medida, ativo) VALUES ('Feijão', 'kg', 1)"))
+        db.session.commit()
+
+        assert aplicar_migracoes(db) == ['insumos.estoque_atual', 'notas_fiscais.status']
+        assert aplicar_migracoes(db) == []
+
+        insumo = Insumo.query.filter_by(nome='Feijão').one()
+        assert insumo.estoque_atual == 0
+
+
+def test_ajustes_simultaneos_nao_se_perdem(app):
+    insumo_id = _criar_insumo(app, estoque=10)
+
+    def ajustar(_):
+        with app.app_context():
+            for _ in range(25):
+                ajustar_estoque_insumos([(insumo_id, 1, 'ajuste', None)])
+                db.session.commit()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(ajustar, range(8)))
+
+    with app.app_context():
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('210')
+        assert MovimentacaoEstoque.query.filter_by(insumo_id=insumo_id).count() == 200
+
+
+def test_definir_estoque_registra_a_diferenca(app):
+    insumo_id = _criar_insumo(app)
+
+    with app.app_context():
+        ajustar_estoque_insumos([(insumo_id, 10, 'cadastro', insumo_id)])
+        definir_estoque_insumo(insumo_id, 4, 'ajuste', insumo_id)
+        db.session.commit()
+
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('4')
+        movimentacoes = MovimentacaoEstoque.query.filter_by(insumo_id=insumo_id).order_by(MovimentacaoEstoque.id)
+        assert [(m.origem, m.quantidade) for m in movimentacoes] == [('cadastro', Decimal('10')), ('ajuste', Decimal('-6'))]
+
+
+def test_abertura_da_razao_registra_o_estoque_sem_movimentacoes(app):
+    with app.app_context():
+        db.session.execute(text("INSERT INTO insumos (nome, unidade_medida, estoque_atual, ativo) VALUES ('Sal', 'kg', 7, 1)"))
+        db.session.commit()
+
+        assert abrir_razao_estoque() == 1
+        assert abrir_razao_estoque() == 0
+        assert [(m.origem, m.quantidade) for m in MovimentacaoEstoque.query] == [('abertura', Decimal('7'))]
+
+
+def test_rebuild_estoque_corrige_o_estoque_pela_razao(app):
+    insumo_id = _criar_insumo(app)
+    with app.app_context():
+        ajustar_estoque_insumos([(insumo_id, 10, 'cadastro', insumo_id)])
+        db.session.commit()
+        db.session.execute(text("UPDATE insumos SET estoque_atual = 3"))
+        db.session.commit()
+
+    resultado = app.test_cli_runner().invoke(args=['rebuild-estoque'])
+    assert resultado.exit_code == 0
+    assert 'corrigido em 1 insumos' in resultado.output
+
+    with app.app_context():
+        assert db.session.get(Insumo, insumo_id).estoque_atual == Decimal('10')
+
+
+def test_estoque_em_uma_data_com_snapshot(app, client):
+    insumo_id = _criar_insumo(app)
+    with app.app_context():
+        for data, quantidade in ((datetime(2026, 1, 10), 5), (datetime(2026, 2, 10), 3), (datetime(2026, 3, 10), -2)):
+            db.session.add(MovimentacaoEstoque(
+                insumo_id=insumo_id, data=data, registrado_em=data, origem='ajuste', quantidade=quantidade
+            ))
+        db.session.commit()
+
+        assert gerar_snapshots_estoque() == 1
+        # Movimentação posterior ao snapshot
+        ajustar_estoque_insumos([(insumo_id, 1, 'ajuste', None)])
+        db.session.commit()
+
+        assert calcular_estoque_em(datetime(2026, 2, 28))[insumo_id] == Decimal('8')
+        assert calcular_estoque_em(datetime.now())[insumo_id] == Decimal('7')
+
+    resposta = client.get(f'/api/insumos/estoque?data=2026-01-31&insumo_ids={insumo_id}')
+    assert resposta.status_code == 200
+    assert resposta.get_json()['estoques'] == [{'insumo_id': insumo_id, 'estoque': 5.0}]
+
+
+def test_estoque_em_uma_data_pela_data_da_entrega(app, client):
+    insumo_id = _criar_insumo(app)
+    resposta = client.post('/api/controle-mensal/registros', json={
+        'mes_referencia': '2026-03-01', 'insumo_id': insumo_id, 'estoque_inicial': 5
+    })
+    registro_id = resposta.get_json()['id']
+    resposta = client.post(f'/api/controle-mensal/registros/{registro_id}/entregas', json={
+        'data_entrega': '2026-03-10', 'quantidade': '4', 'valor_total': '20'
+    })
+    assert resposta.status_code == 201
+
+    def estoque_em(data):
+        resposta = client.get(f'/api/insumos/estoque?data={data}&insumo_ids={insumo_id}')
+        return resposta.get_json()['estoques'][0]['estoque']
+
+    # O estoque inicial vale desde o início do mês e a entrega desde a sua data, não desde a gravação
+    assert estoque_em('2026-02-28') == 0.0
+    assert estoque_em('2026-03-05') == 5.0
+    assert estoque_em('2026-03-31') == 9.0
+    assert estoque_em('2026-04-30') == 9.0
+
+
+def test_movimentacao_retroativa_depois_do_snapshot(app):
+    insumo_id = _criar_insumo(app)
+    with app.app_context():
+        db.session.add(MovimentacaoEstoque(
+            insumo_id=insumo_id, data=datetime(2026, 1, 10), registrado_em=datetime(2026, 1, 10),
+            origem='ajuste', quantidade=5
+        ))
+        db.session.commit()
+        assert gerar_snapshots_estoque() == 1
+
+        # Gravada agora com data anterior ao snapshot: não está nele
+        ajustar_estoque_insumos([(insumo_id, 2, 'entrega', None, date(2026, 1, 5))])
+        db.session.commit()
+
+        assert calcular_estoque_em(datetime(2026, 1, 6))[insumo_id] == Decimal('2')
+        assert calcular_estoque_em(datetime(2026, 2, 1))[insumo_id] == Decimal('7')
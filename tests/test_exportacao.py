@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+from datetime import date
+
+from openpyxl import load_workbook
+
+from backend import db
+from backend.models.controle_mensal_models import EntregaMensal, ProgramacaoFutura, RegistroMensal
+from backend.models.fechamento_models import AnaliseComparativa, CustoMedio, Fechamento, ResumoMensal
+from backend.models.nfe_models import Fornecedor, Insumo
+
+
+def _criar_cadastros(app):
+    with app.app_context():
+        fornecedor = Fornecedor(nome='Distribuidora Sul', cnpj='12.345.678/0001-90')
+        arroz = Insumo(nome='Arroz', codigo='ARR', unidade_medida='kg')
+        db.session.add_all([fornecedor, arroz])
+        db.session.flush()
+        registro = RegistroMensal(mes=3, ano=2026, insumo_id=arroz.id)
+        db.session.add(registro)
+        db.session.flush()
+        for dia in (2, 9):
+            db.session.add(EntregaMensal(registro_mensal_id=registro.id, insumo_id=arroz.id,
+                                         data_entrega=date(2026, 3, dia), quantidade=4,
+                                         valor_unitario=5, valor_total=20))
+        db.session.commit()
+        return fornecedor.id, arroz.id, registro.id
+
+
+def _csv(resposta):
+    assert resposta.status_code == 200
+    assert resposta.content_type == 'text/csv; charset=utf-8'
+    return list(csv.DictReader(io.StringIO(resposta.get_data(as_text=True).lstrip('﻿')), delimiter=';'))
+
+
+def _ndjson(resposta):
+    assert resposta.status_code == 200
+    return [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+
+
+def _xlsx(resposta):
+    assert resposta.status_code == 200
+    aba = load_workbook(io.BytesIO(resposta.get_data())).active
+    cabecalho, *linhas = [list(linha) for linha in aba.iter_rows(values_only=True)]
+    return [dict(zip(cabecalho, linha)) for linha in linhas]
+
+
+def test_exportacao_de_contratos_cotacoes_e_planejamentos(app, client):
+    fornecedor_id, arroz_id, _ = _criar_cadastros(app)
+
+    resposta = client.post('/api/contratos', json={
+        'numero': 'CT-01', 'fornecedor_id': fornecedor_id, 'data_inicio': '2026-01-01', 'data_fim': '2026-12-31',
+        'valor_total': '500', 'itens': [{
+            'insumo_id': arroz_id, 'quantidade': '100', 'valor_unitario': '5', 'valor_total': '500',
+            'cronograma_entrega': 'mensal'
+        }]
+    })
+    assert resposta.status_code == 201
+    contrato = resposta.get_json()
+    assert [(i['insumo_id'], i['cronograma_entrega']) for i in contrato['itens']] == [(arroz_id, 'mensal')]
+
+    resposta = client.post('/api/cotacoes', json={
+        'data_cotacao': '2026-02-10', 'contrato_id': contrato['id'], 'fornecedor_id': fornecedor_id,
+        'insumo_id': arroz_id, 'valor_unitario': '4.8'
+    })
+    assert resposta.status_code == 201
+    resposta = client.post('/api/planejamento', json={
+        'mes_referencia': '2026-04-01', 'insumo_id': arroz_id, 'quantidade_prevista': '30', 'valor_unitario_previsto': '5'
+    })
+    assert resposta.status_code == 201
+    assert resposta.get_json()['valor_total_previsto'] == 150.0
+
+    contratos = _csv(client.get('/api/contratos?format=csv'))
+    assert [(c['numero'], c['status']) for c in contratos] == [('CT-01', 'ativo')]
+    # Itens aninhados vão como JSON na célula
+    assert json.loads(contratos[0]['itens'])[0]['quantidade'] == 100.0
+
+    cotacoes = _ndjson(client.get(f'/api/cotacoes?format=ndjson&insumo_id={arroz_id}'))
+    assert [(c['data_cotacao'], c['valor_unitario']) for c in cotacoes] == [('2026-02-10', 4.8)]
+
+    planejamentos = _xlsx(client.get('/api/planejamento?format=xlsx'))
+    assert [(p['mes_referencia'], p['quantidade_prevista']) for p in planejamentos] == [('2026-04', 30)]
+
+
+def test_exportacao_de_entregas_e_cadastros(app, client):
+    _, arroz_id, registro_id = _criar_cadastros(app)
+
+    entregas = _csv(client.get(f'/api/controle-mensal/registros/{registro_id}/entregas?format=csv'))
+    assert [(e['data_entrega'], e['insumo_id']) for e in entregas] == [('2026-03-09', str(arroz_id)), ('2026-03-02', str(arroz_id))]
+
+    insumos = _xlsx(client.get('/api/insumos?format=xlsx'))
+    assert [(i['codigo'], i['ativo']) for i in insumos] == [('ARR', True)]
+
+    fornecedores = _ndjson(client.get('/api/fornecedores?format=ndjson'))
+    assert [f['cnpj'] for f in fornecedores] == ['12.345.678/0001-90']
+
+    assert client.get('/api/nfe?format=csv').status_code == 200
+    assert client.get('/api/contratos?format=pdf').status_code == 400
+
+
+def test_demais_listagens_exportam_uma_linha_por_registro(app, client):
+    _, arroz_id, _ = _criar_cadastros(app)
+    with app.app_context():
+        db.session.add_all([
+            CustoMedio(insumo_id=arroz_id, mes=3, ano=2026, quantidade_total=8, valor_total=40, custo_medio=5),
+            Fechamento(mes=3, ano=2026, data_fechamento=date(2026, 4, 1), valor_total=40),
+            ResumoMensal(mes_referencia=date(2026, 3, 1), insumo_id=arroz_id, quantidade_total=8,
+                         valor_total=40, custo_medio=5, entregas=2),
+            ProgramacaoFutura(mes_referencia=date(2026, 5, 1), insumo_id=arroz_id, quantidade_prevista=10),
+            AnaliseComparativa(titulo='Arroz', tipo='mes_a_mes', data_inicio=date(2026, 1, 1),
+                               data_fim=date(2026, 3, 31), parametros={'insumo_id': arroz_id}),
+        ])
+        db.session.commit()
+
+    periodo = f'insumo_id={arroz_id}&data_inicio=2026-03-01&data_fim=2026-03-31'
+    for url, campo, valor in (
+        ('/api/controle-mensal/registros', 'mes_referencia', '2026-03'),
+        ('/api/programacao', 'mes_referencia', '2026-05'),
+        ('/api/fechamento/custo-medio', 'mes_referencia', '2026-03'),
+        ('/api/fechamento', 'mes_referencia', '2026-03'),
+        ('/api/fechamento/resumos', 'mes_referencia', '2026-03'),
+        ('/api/analise', 'parametros', {'insumo_id': arroz_id}),
+        (f'/api/fechamento/relatorio/tendencia-precos?{periodo}', 'data', '02/03/2026'),
+    ):
+        separador = '&' if '?' in url else '?'
+        linhas = _ndjson(client.get(f'{url}{separador}format=ndjson'))
+        assert [linha[campo] for linha in linhas][:1] == [valor], url
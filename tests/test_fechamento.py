@@ -0,0 +1,96 @@
+from datetime import date
+
+from backend import db
+from backend.models.controle_mensal_models import EntregaMensal, RegistroMensal
+from backend.models.fechamento_models import ResumoMensal
+from backend.models.nfe_models import Fornecedor, Insumo, NotaFiscal
+
+
+def _criar_movimento(app):
+    """Março: duas entregas de arroz com nota do fornecedor e uma sem nota; abril: uma entrega"""
+    with app.app_context():
+        fornecedor = Fornecedor(nome='Distribuidora Sul', cnpj='12.345.678/0001-90')
+        arroz = Insumo(nome='Arroz', unidade_medida='kg')
+        db.session.add_all([fornecedor, arroz])
+        db.session.flush()
+        nota = NotaFiscal(numero='1', data_emissao=date(2026, 3, 1), valor_total=50, fornecedor_id=fornecedor.id)
+        marco = RegistroMensal(mes=3, ano=2026, insumo_id=arroz.id)
+        abril = RegistroMensal(mes=4, ano=2026, insumo_id=arroz.id)
+        db.session.add_all([nota, marco, abril])
+        db.session.flush()
+        for registro, dia, quantidade, valor, nota_id in (
+            (marco, 2, 4, 20, nota.id), (marco, 9, 6, 30, nota.id), (marco, 20, 5, 40, None), (abril, 3, 1, 9, None)
+        ):
+            db.session.add(EntregaMensal(
+                registro_mensal_id=registro.id, insumo_id=arroz.id, nota_fiscal_id=nota_id,
+                data_entrega=date(2026, registro.mes, dia), quantidade=quantidade,
+                valor_unitario=valor / quantidade, valor_total=valor
+            ))
+        db.session.commit()
+        return fornecedor.id, arroz.id
+
+
+def _fechamento_de_marco(arroz_id):
+    return {
+        'mes_referencia': '2026-03-01', 'data_fechamento': '2026-04-01',
+        'valor_total': '90', 'quantidade_total': '15', 'custo_medio_geral': '6',
+        'detalhes': [{'insumo_id': arroz_id, 'quantidade': '15', 'valor_total': '90', 'custo_medio': '6'}]
+    }
+
+
+def test_fechamento_calcula_os_resumos_do_mes(app, client):
+    fornecedor_id, arroz_id = _criar_movimento(app)
+
+    resposta = client.post('/api/fechamento', json=_fechamento_de_marco(arroz_id))
+    assert resposta.status_code == 201
+    fechamento = resposta.get_json()
+    assert (fechamento['mes_referencia'], fechamento['status'], len(fechamento['detalhes'])) == ('2026-03', 'fechado', 1)
+
+    # Um segundo fechamento do mesmo mês é recusado
+    assert client.post('/api/fechamento', json=_fechamento_de_marco(arroz_id)).status_code == 400
+
+    resposta = client.get('/api/fechamento/resumos?mes_referencia=2026-03')
+    assert resposta.status_code == 200
+    resumos = sorted(resposta.get_json(), key=lambda r: r['fornecedor_id'] or 0)
+    assert [(r['insumo_id'], r['fornecedor_id'], r['quantidade_total'], r['valor_total'], r['custo_medio'], r['entregas'])
+            for r in resumos] == [(arroz_id, None, 5.0, 40.0, 8.0, 1), (arroz_id, fornecedor_id, 10.0, 50.0, 5.0, 2)]
+
+    with app.app_context():
+        assert {r.status for r in RegistroMensal.query.filter_by(mes=3)} == {'fechado'}
+        assert {r.status for r in RegistroMensal.query.filter_by(mes=4)} == {'aberto'}
+
+    resposta = client.post(f"/api/fechamento/{fechamento['id']}/reabrir")
+    assert resposta.get_json()['status'] == 'reaberto'
+    with app.app_context():
+        assert {r.status for r in RegistroMensal.query.filter_by(mes=3)} == {'aberto'}
+
+
+def test_rebuild_resumos_recalcula_todos_os_meses(app):
+    _, arroz_id = _criar_movimento(app)
+
+    resultado = app.test_cli_runner().invoke(args=['rebuild-resumos'])
+    assert resultado.exit_code == 0
+    assert 'recalculados para 2 meses' in resultado.output
+
+    with app.app_context():
+        totais = {
+            resumo.mes_referencia: resumo.quantidade_total
+            for resumo in ResumoMensal.query.filter_by(insumo_id=arroz_id, fornecedor_id=None)
+        }
+        assert totais == {date(2026, 3, 1): 5.0, date(2026, 4, 1): 1.0}
+
+
+def test_relatorio_de_custo_medio(app, client):
+    _, arroz_id = _criar_movimento(app)
+    for mes, custo in (('2026-02-01', '5'), ('2026-03-01', '7')):
+        resposta = client.post('/api/fechamento/custo-medio/calcular', json={
+            'mes_referencia': mes, 'insumo_id': arroz_id, 'quantidade_total': '10',
+            'valor_total': str(10 * int(custo)), 'custo_medio': custo
+        })
+        assert resposta.status_code == 201
+
+    resposta = client.get(f'/api/fechamento/relatorio/custo-medio?insumo_id={arroz_id}&ano=2026')
+    assert resposta.status_code == 200
+    relatorio = resposta.get_json()
+    assert [m['mes'] for m in relatorio['dados_mensais']] == ['02/2026', '03/2026']
+    assert relatorio['media_anual'] == 6.0
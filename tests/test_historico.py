@@ -0,0 +1,43 @@
+import csv
+import gzip
+import os
+from datetime import date, datetime
+
+from backend import db
+from backend.models.auth_models import LogAcesso
+from backend.services.historico_service import manter_historico
+
+
+def _tabelas(prefixo):
+    return sorted(db.session.execute(db.text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefixo"
+    ), {'prefixo': f'{prefixo}%'}).scalars())
+
+
+def test_meses_encerrados_saem_da_tabela_e_os_antigos_sao_arquivados(app):
+    app.config['LOG_ACESSO_RETENCAO_MESES'] = 2
+    with app.app_context():
+        for mes, quantidade in ((1, 2), (2, 1), (3, 3), (4, 1)):
+            for dia in range(1, quantidade + 1):
+                db.session.add(LogAcesso(acao='login', ip='10.0.0.1', data_hora=datetime(2026, mes, dia, 12)))
+        db.session.commit()
+
+        resultado = manter_historico(hoje=date(2026, 4, 15))
+
+        # Janeiro a março saem da tabela principal; janeiro passa da retenção (fevereiro em diante)
+        assert resultado['logs_acesso']['rotacionadas'] == ['logs_acesso_202601', 'logs_acesso_202602', 'logs_acesso_202603']
+        assert [log.data_hora.month for log in LogAcesso.query] == [4]
+        assert _tabelas('logs_acesso_') == ['logs_acesso_202602', 'logs_acesso_202603']
+        assert db.session.execute(db.text("SELECT count(*) FROM logs_acesso_202603")).scalar() == 3
+
+        arquivo = os.path.join(app.config['HISTORICO_DIR'], 'logs_acesso_202601.csv.gz')
+        assert resultado['logs_acesso']['arquivadas'] == [arquivo]
+        with gzip.open(arquivo, 'rt', encoding='utf-8') as conteudo:
+            linhas = list(csv.DictReader(conteudo))
+        assert [linha['data_hora'][:10] for linha in linhas] == ['2026-01-01', '2026-01-02']
+
+        # A razão de estoque não tem retenção e fica inteira na tabela principal
+        assert resultado['movimentacoes_estoque'] == {'rotacionadas': [], 'arquivadas': []}
+
+        # Uma nova execução no mesmo mês não tem o que mover
+        assert manter_historico(hoje=date(2026, 4, 20))['logs_acesso'] == {'rotacionadas': [], 'arquivadas': []}
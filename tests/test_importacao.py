@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import pytest
+
+from backend import db
+from backend.models.nfe_models import Fornecedor, Insumo
+from backend.services.busca_service import preparar_busca
+
+
+@pytest.fixture
+def app_importacao(app):
+    with app.app_context():
+        preparar_busca()
+    return app
+
+
+def _importar(client, tipo, conteudo):
+    return client.post(f'/api/{tipo}/importar', data=conteudo.encode('utf-8'), content_type='text/csv')
+
+
+def test_importacao_cria_com_padroes_e_atualiza_sem_apagar(app_importacao, client):
+    with app_importacao.app_context():
+        db.session.add(Insumo(nome='Feijão', codigo='FEI', unidade_medida='kg', categoria='Grãos',
+                              descricao='Carioca tipo 1', ativo=False))
+        db.session.commit()
+
+    resposta = _importar(client, 'insumos', (
+        'codigo;nome;unidade_medida;categoria;descricao;estoque_atual\n'
+        'ARR;Arroz;kg;Grãos;;12.5\n'
+        'FEI;Feijão Carioca;kg;;;\n'
+        'MAC;Macarrão;;;;\n'
+    ))
+    assert resposta.status_code == 200
+    resultado = resposta.get_json()
+    assert (resultado['criados'], resultado['atualizados'], resultado['total_erros']) == (1, 1, 1)
+    assert resultado['erros'][0]['linha'] == 4
+
+    with app_importacao.app_context():
+        arroz = Insumo.query.filter_by(codigo='ARR').one()
+        # Padrões aplicados ao criar: ativo e estoque (o estoque do arquivo entra pela razão)
+        assert (arroz.ativo, arroz.estoque_atual, arroz.descricao) == (True, Decimal('12.5'), None)
+
+        feijao = Insumo.query.filter_by(codigo='FEI').one()
+        # Células vazias mantêm o cadastro; a coluna "ativo" ausente não reativa o insumo
+        assert (feijao.nome, feijao.categoria, feijao.descricao, feijao.ativo) == (
+            'Feijão Carioca', 'Grãos', 'Carioca tipo 1', False
+        )
+        assert feijao.estoque_atual == Decimal('0')
+
+
+def test_cabecalho_e_conferido_com_as_colunas_da_tabela(app_importacao, client):
+    resposta = _importar(client, 'fornecedores', 'cnpj,nome,id,criado_em,status\n1,Sul,9,2026-01-01,ativo\n')
+    assert resposta.status_code == 400
+    assert "['id', 'criado_em', 'status']" in resposta.get_json()['error']
+
+    resposta = _importar(client, 'fornecedores', 'cnpj,telefone\n12.345.678/0001-90,3333\n')
+    assert resposta.status_code == 400
+    assert "colunas_obrigatorias" in resposta.get_json()['error']
+
+    resposta = _importar(client, 'fornecedores', (
+        'cnpj,nome,ativo\n12.345.678/0001-90,Distribuidora Sul,\n98.765.432/0001-10,Arrozeira,false\n'
+    ))
+    assert resposta.get_json()['criados'] == 2
+    with app_importacao.app_context():
+        assert {f.cnpj: f.ativo for f in Fornecedor.query} == {
+            '12.345.678/0001-90': True, '98.765.432/0001-10': False
+        }
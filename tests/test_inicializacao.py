@@ -0,0 +1,31 @@
+import importlib
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend import create_app
+from backend.blueprints import BLUEPRINTS
+
+
+def test_app_sobe_sem_acessar_o_banco_e_com_todos_os_blueprints(tmp_path):
+    comandos = []
+
+    def registrar(conexao, cursor, comando, *args):
+        comandos.append(comando)
+
+    event.listen(Engine, 'before_cursor_execute', registrar)
+    try:
+        # O diretório do banco nem existe: qualquer conexão na inicialização falharia
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'inexistente' / 'banco.db'}",
+            'HISTORICO_DIR': str(tmp_path / 'historico'),
+        })
+        assert app.test_client().get('/health/live').status_code == 200
+    finally:
+        event.remove(Engine, 'before_cursor_execute', registrar)
+
+    assert comandos == []
+    # Um módulo de rotas que não importa é apenas registrado no log: aqui todos precisam subir
+    esperados = {getattr(importlib.import_module(modulo), nome).name for modulo, nome in BLUEPRINTS}
+    assert set(app.blueprints) == esperados
@@ -0,0 +1,38 @@
+import sys
+
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend import db
+
+
+def test_perfilador_desligado_quando_a_view_falha(app, tmp_path):
+    app.config.update(PROFILING_AMOSTRAGEM=1, PROFILING_LIMIAR_MS=0, PROFILING_DIR=str(tmp_path / 'perfis'))
+
+    @app.route('/teste/falha')
+    def falha():
+        raise RuntimeError('falha da view')
+
+    with pytest.raises(RuntimeError):
+        app.test_client().get('/teste/falha')
+
+    assert sys.getprofile() is None
+    assert len(list((tmp_path / 'perfis').iterdir())) == 1
+
+
+def test_comando_com_erro_nao_afeta_as_medicoes_seguintes(app):
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        conexao = db.session.connection()
+
+        with pytest.raises(OperationalError):
+            conexao.execute(text('SELECT * FROM tabela_inexistente'))
+        db.session.rollback()
+
+        db.session.execute(text('SELECT 1'))
+
+        assert g._sql['consultas'] == 1
+        assert g._sql['mais_lenta'] == 'SELECT 1'
+        assert not any(chave.startswith('_inicio') for chave in db.session.connection().info)
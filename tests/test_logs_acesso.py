@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from backend import db
+from backend.models.auth_models import LogAcesso
+from backend.services import auth_service
+from backend.services.logs_acesso_service import enfileirar_log_acesso, gravador_logs_acesso
+from backend.utils.limitador import LimitadorJanela
+
+
+def _registro(acao, ip='10.0.0.1'):
+    return {'usuario_id': None, 'data_hora': datetime.utcnow(), 'ip': ip, 'acao': acao, 'detalhes': None}
+
+
+def test_logs_enfileirados_sao_gravados_em_um_lote(app):
+    app.config.update(LOG_ACESSO_ASSINCRONO=True, LOG_ACESSO_LOTE=50, LOG_ACESSO_INTERVALO=0.2)
+    comandos = []
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: comandos.append(args[2]))
+        try:
+            assert all(enfileirar_log_acesso(_registro('falha_login', f'10.0.0.{i}')) for i in range(5))
+            # Nada foi gravado pela requisição: a escrita fica com a thread do gravador
+            assert not any('INSERT INTO logs_acesso' in comando for comando in comandos)
+        finally:
+            # Grava o que falta na fila e para a thread antes de o banco do teste ser removido
+            gravador_logs_acesso.encerrar()
+
+        assert LogAcesso.query.count() == 5
+    assert len([comando for comando in comandos if 'INSERT INTO logs_acesso' in comando]) == 1
+
+
+def test_sem_gravador_o_log_fica_com_a_requisicao(app, client, monkeypatch):
+    monkeypatch.setattr(auth_service, '_falhas_login', LimitadorJanela())
+    # LOG_ACESSO_ASSINCRONO desligado (como no conftest): o log vai na transação da própria requisição
+    with app.app_context():
+        assert enfileirar_log_acesso(_registro('login')) is False
+
+    assert client.post('/api/auth/login', json={'email': 'ninguem@teste.com', 'senha': 'x'}).status_code == 401
+    with app.app_context():
+        assert [log.acao for log in LogAcesso.query] == ['falha_login']
@@ -0,0 +1,47 @@
+from prometheus_client.parser import text_string_to_metric_families
+
+from backend import db
+from backend.models.nfe_models import Fornecedor, Insumo
+from backend.services import auth_service
+from backend.utils.limitador import LimitadorJanela
+
+
+def _amostras(client):
+    resposta = client.get('/metrics')
+    assert resposta.status_code == 200
+    return {
+        (amostra.name, tuple(sorted(amostra.labels.items()))): amostra.value
+        for familia in text_string_to_metric_families(resposta.get_data(as_text=True))
+        for amostra in familia.samples
+    }
+
+
+def test_contadores_de_negocio_acompanham_as_operacoes(app, client, monkeypatch):
+    monkeypatch.setattr(auth_service, '_falhas_login', LimitadorJanela())
+    with app.app_context():
+        fornecedor = Fornecedor(nome='Distribuidora Sul', cnpj='12.345.678/0001-90')
+        arroz = Insumo(nome='Arroz', unidade_medida='kg')
+        db.session.add_all([fornecedor, arroz])
+        db.session.commit()
+        fornecedor_id, arroz_id = fornecedor.id, arroz.id
+
+    # Os contadores são do processo: compara antes e depois
+    antes = _amostras(client)
+
+    resposta = client.post('/api/nfe', json={
+        'numero': '1', 'serie': '1', 'data_emissao': '2026-03-02', 'fornecedor_id': fornecedor_id, 'valor_total': '10',
+        'itens': [{'insumo_id': arroz_id, 'quantidade': '2', 'valor_unitario': '5', 'valor_total': '10'}]
+    })
+    assert resposta.status_code == 201
+    client.post('/api/auth/login', json={'email': 'ninguem@teste.com', 'senha': 'x'})
+
+    depois = _amostras(client)
+    notas = ('notas_fiscais_importadas_total', ())
+    falhas = ('login_falhas_total', (('motivo', 'usuario_nao_encontrado'),))
+    assert depois[notas] - antes.get(notas, 0) == 1
+    assert depois[falhas] - antes.get(falhas, 0) == 1
+
+    # A latência da rota de notas fiscais foi registrada com o status da resposta
+    latencia = ('http_requisicao_duracao_segundos_count',
+                (('endpoint', 'nfe.post_nota_fiscal'), ('metodo', 'POST'), ('status', '201')))
+    assert depois[latencia] - antes.get(latencia, 0) == 1
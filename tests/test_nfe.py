@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+from backend import db
+from backend.models.catalogo_models import VersaoCatalogo
+from backend.models.nfe_models import Fornecedor, Insumo
+from backend.services.catalogo_service import (
+    catalogo, criar_versoes_catalogo, incrementar_versao_catalogo, insumo_existe, obter_fornecedor_por_cnpj,
+    obter_insumo, obter_insumo_por_codigo
+)
+
+
+def _criar_cadastros(app):
+    with app.app_context():
+        fornecedor = Fornecedor(nome='Distribuidora Sul', cnpj='12.345.678/0001-90')
+        arroz = Insumo(nome='Arroz', codigo='ARR', unidade_medida='kg')
+        feijao = Insumo(nome='Feijão', codigo='FEI', unidade_medida='kg', ativo=False)
+        db.session.add_all([fornecedor, arroz, feijao])
+        db.session.commit()
+        return fornecedor.id, arroz.id, feijao.id
+
+
+def test_catalogo_contem_apenas_cadastros_ativos(app):
+    fornecedor_id, arroz_id, feijao_id = _criar_cadastros(app)
+
+    with app.app_context():
+        assert obter_insumo(arroz_id).nome == 'Arroz'
+        assert obter_insumo_por_codigo('ARR').id == arroz_id
+        assert obter_insumo(feijao_id) is None
+        # Inativo não está no catálogo, mas continua existindo
+        assert insumo_existe(feijao_id)
+        assert obter_fornecedor_por_cnpj('12.345.678/0001-90').id == fornecedor_id
+
+        # Uma nova versão do catálogo faz os outros processos recarregarem
+        db.session.get(Insumo, arroz_id).ativo = False
+        incrementar_versao_catalogo('insumos')
+        db.session.commit()
+        assert obter_insumo(arroz_id) is None
+
+
+
+def test_catalogo_invalidado_apenas_no_commit(app):
+    _, arroz_id, _ = _criar_cadastros(app)
+
+    with app.app_context():
+        assert criar_versoes_catalogo() == 2
+        assert criar_versoes_catalogo() == 0
+
+        assert obter_insumo(arroz_id) is not None
+        incrementar_versao_catalogo('insumos')
+        # Antes do commit o catálogo carregado continua valendo; o rollback descarta a invalidação
+        assert catalogo._versoes is not None
+        db.session.rollback()
+        assert catalogo._versoes is not None
+        db.session.commit()
+        assert catalogo._versoes is not None
+
+        incrementar_versao_catalogo('insumos')
+        db.session.commit()
+        assert catalogo._versoes is None
+        assert db.session.get(VersaoCatalogo, 'insumos').versao == 1
+
+def test_nota_fiscal_movimenta_o_estoque(app, client):
+    fornecedor_id, arroz_id, _ = _criar_cadastros(app)
+
+    resposta = client.post('/api/nfe', json={
+        'numero': '1001', 'serie': '1', 'data_emissao': '2026-03-02', 'data_recebimento': '2026-03-03',
+        'fornecedor_id': fornecedor_id, 'valor_total': '62.5',
+        'itens': [{'insumo_id': arroz_id, 'quantidade': '12.5', 'valor_unitario': '5', 'valor_total': '62.5'}]
+    })
+    assert resposta.status_code == 201
+    nota = resposta.get_json()
+    assert (nota['data_recebimento'], nota['status']) == ('2026-03-03', 'ativo')
+    assert [(item['insumo_id'], item['quantidade']) for item in nota['itens']] == [(arroz_id, 12.5)]
+
+    with app.app_context():
+        assert db.session.get(Insumo, arroz_id).estoque_atual == Decimal('12.5')
+
+    # A exclusão é lógica e reverte o estoque uma única vez
+    assert client.delete(f"/api/nfe/{nota['id']}").status_code == 200
+    assert client.delete(f"/api/nfe/{nota['id']}").status_code == 200
+
+    with app.app_context():
+        assert db.session.get(Insumo, arroz_id).estoque_atual == Decimal('0')
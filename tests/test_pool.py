@@ -0,0 +1,65 @@
+from sqlalchemy.pool import NullPool
+
+from backend import create_app, db
+from backend.config import obter_opcoes_engine
+from backend.utils.metricas_pool import estatisticas_pool
+
+
+def test_opcoes_do_pool_vem_das_variaveis_db(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.setenv('DB_MAX_OVERFLOW', '1')
+    monkeypatch.setenv('DB_STATEMENT_TIMEOUT', '15000')
+
+    opcoes = obter_opcoes_engine('postgresql://usuario@banco/nutricao')
+    assert (opcoes['pool_size'], opcoes['max_overflow'], opcoes['pool_pre_ping']) == (3, 1, True)
+    assert opcoes['connect_args'] == {'options': '-c statement_timeout=15000'}
+    # No SQLite as variáveis são ignoradas
+    assert obter_opcoes_engine('sqlite:///teste.db') == {}
+
+    monkeypatch.setenv('DB_NULLPOOL', 'true')
+    assert obter_opcoes_engine('postgresql://usuario@banco/nutricao')['poolclass'] is NullPool
+
+
+def test_estado_do_pool_em_uso(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'pool.db'}",
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2, 'max_overflow': 1, 'pool_pre_ping': True},
+        'HISTORICO_DIR': str(tmp_path / 'historico'),
+    })
+    cliente = app.test_client()
+
+    with app.app_context():
+        conexoes = [db.engine.connect() for _ in range(3)]
+        try:
+            pool = cliente.get('/metrics/pool').get_json()['pool']['default']
+            # Duas conexões do pool e uma de overflow em uso
+            assert (pool['tipo'], pool['size'], pool['checkedout'], pool['overflow']) == ('QueuePool', 2, 3, 1)
+        finally:
+            for conexao in conexoes:
+                conexao.close()
+            db.engine.dispose()
+
+
+def test_contadores_continuam_depois_do_dispose(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'pool.db'}",
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2, 'max_overflow': 1},
+        'HISTORICO_DIR': str(tmp_path / 'historico'),
+    })
+
+    with app.app_context():
+        def contadores():
+            return estatisticas_pool(db)['default']
+
+        db.engine.connect().close()
+        antes = contadores()
+        assert (antes['conexoes_criadas'], antes['checkouts']) == (1, 1)
+
+        # Como no post_fork do gunicorn: o pool é trocado, os contadores e os eventos continuam
+        db.engine.dispose(close=False)
+        db.engine.connect().close()
+        depois = contadores()
+        assert (depois['conexoes_criadas'], depois['checkouts'], depois['checkins']) == (2, 2, 2)
+        db.engine.dispose()
@@ -0,0 +1,67 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from backend import db
+from backend.models.controle_mensal_models import EntregaMensal, RegistroMensal
+from backend.models.nfe_models import Insumo
+from backend.services.controle_mensal_service import iterar_entregas_mensais
+from backend.services.relatorios_service import gerar_relatorio_tendencia_precos, linhas_relatorio_tendencia_precos
+from backend.utils import exportacao
+
+
+def _criar_entregas(app, quantidade=10):
+    """Entregas de março de dois insumos; o preço do arroz sobe 1 por entrega"""
+    with app.app_context():
+        arroz = Insumo(nome='Arroz', unidade_medida='kg')
+        feijao = Insumo(nome='Feijão', unidade_medida='kg')
+        db.session.add_all([arroz, feijao])
+        db.session.flush()
+        registro = RegistroMensal(mes=3, ano=2026, insumo_id=arroz.id)
+        db.session.add(registro)
+        db.session.flush()
+        for dia in range(1, quantidade + 1):
+            db.session.add(EntregaMensal(registro_mensal_id=registro.id, insumo_id=arroz.id,
+                                         data_entrega=date(2026, 3, dia), quantidade=2,
+                                         valor_unitario=dia, valor_total=2 * dia))
+        # Entrega de outro insumo no mesmo registro: fica fora da tendência do arroz
+        db.session.add(EntregaMensal(registro_mensal_id=registro.id, insumo_id=feijao.id,
+                                     data_entrega=date(2026, 3, 5), quantidade=1, valor_unitario=50, valor_total=50))
+        db.session.commit()
+        return arroz.id, registro.id
+
+
+def test_tendencia_de_precos_usa_o_insumo_da_entrega(app):
+    arroz_id, _ = _criar_entregas(app)
+    filtros = {'insumo_id': str(arroz_id), 'data_inicio': '2026-03-01', 'data_fim': '2026-03-04'}
+
+    with app.test_request_context():
+        relatorio = gerar_relatorio_tendencia_precos(filtros)
+
+    assert [linha['preco_unitario'] for linha in relatorio['dados_entregas']] == [1.0, 2.0, 3.0, 4.0]
+    assert (relatorio['variacao_percentual'], relatorio['tendencia']) == (300.0, 'alta')
+
+
+def test_iteradores_leem_em_blocos(app, monkeypatch):
+    arroz_id, registro_id = _criar_entregas(app)
+    monkeypatch.setattr(exportacao, 'TAMANHO_BLOCO_CONSULTA', 3)
+
+    with app.test_request_context():
+        consultas = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+
+        linhas = linhas_relatorio_tendencia_precos(
+            {'insumo_id': str(arroz_id), 'data_inicio': '2026-03-01', 'data_fim': '2026-03-31'}
+        )
+        entregas = iterar_entregas_mensais(registro_id)
+        # Nada é lido antes de o gerador ser consumido
+        assert not any('entregas_mensais' in sql for sql in consultas)
+
+        assert next(linhas)['data'] == '01/03/2026'
+        primeira = next(entregas)
+        # Apenas o primeiro bloco de entregas foi montado na sessão
+        assert len([o for o in db.session.identity_map.values() if isinstance(o, EntregaMensal)]) <= 3
+        assert primeira.data_entrega == date(2026, 3, 10)
+
+        assert len(list(linhas)) == 9
+        assert len(list(entregas)) == 10
@@ -0,0 +1,68 @@
+import importlib
+
+import pytest
+
+from backend import create_app, db
+from backend.cli import MODELOS
+from backend.models.nfe_models import Insumo
+from backend.services.busca_service import preparar_busca
+from backend.services.nfe_service import criar_insumo, listar_insumos
+
+
+@pytest.fixture
+def app_replica(tmp_path):
+    """Primário e réplica em arquivos SQLite separados, para saber de onde cada leitura veio"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primario.db'}",
+        'SQLALCHEMY_BINDS': {'replica': f"sqlite:///{tmp_path / 'replica.db'}"},
+        'LOG_ACESSO_ASSINCRONO': False,
+        'HISTORICO_DIR': str(tmp_path / 'historico'),
+    })
+    with app.app_context():
+        for modulo in MODELOS:
+            importlib.import_module(modulo)
+        db.create_all()
+        db.metadata.create_all(db.engines['replica'])
+        preparar_busca()
+
+        db.session.add(Insumo(nome='Arroz (primário)', codigo='ARR', unidade_medida='kg'))
+        db.session.commit()
+        with db.engines['replica'].begin() as conexao:
+            conexao.execute(Insumo.__table__.insert(), {'nome': 'Arroz (réplica)', 'codigo': 'ARR', 'unidade_medida': 'kg'})
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # O Flask-SQLAlchemy guarda um MetaData por bind no objeto db (global); sem removê-lo,
+    # o create_all das aplicações dos outros testes procuraria a réplica
+    db.metadatas.pop('replica', None)
+
+
+def test_listagem_le_da_replica(app_replica):
+    resposta = app_replica.test_client().get('/api/insumos')
+    assert [i['nome'] for i in resposta.get_json()] == ['Arroz (réplica)']
+
+    # Fora de @somente_leitura a consulta vai para o primário
+    with app_replica.app_context():
+        assert [i.nome for i in Insumo.query.all()] == ['Arroz (primário)']
+
+
+def test_leitura_apos_escrita_fica_no_primario(app_replica):
+    with app_replica.app_context():
+        criar_insumo({'nome': 'Feijão', 'codigo': 'FEI', 'unidade_medida': 'kg'})
+        assert sorted(i.nome for i in listar_insumos()) == ['Arroz (primário)', 'Feijão']
+
+    # Em um novo contexto (nova requisição) a leitura volta para a réplica
+    with app_replica.app_context():
+        assert [i.nome for i in listar_insumos()] == ['Arroz (réplica)']
+
+
+def test_leitura_apos_update_em_massa_fica_no_primario(app_replica):
+    with app_replica.app_context():
+        # Sem flush: o UPDATE vai direto ao banco
+        Insumo.query.filter_by(codigo='ARR').update({Insumo.nome: 'Arroz Tipo 1'}, synchronize_session=False)
+        assert [i.nome for i in listar_insumos()] == ['Arroz Tipo 1']
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import text
+
+from backend import db
+from backend.utils import saude
+
+
+@pytest.fixture(autouse=True)
+def _sem_resultado_anterior(monkeypatch):
+    # O resultado da prontidão é reaproveitado pelo processo; cada teste começa sem ele
+    monkeypatch.setattr(saude, '_cache', {'resultado': None, 'expira_em': 0})
+
+
+def test_prontidao_verifica_o_banco_do_teste(app, client):
+    assert client.get('/health/live').status_code == 200
+
+    resposta = client.get('/health/ready')
+    assert resposta.status_code == 200
+    dados = resposta.get_json()
+    verificacoes = dados['verificacoes']
+    assert dados['status'] == 'pronto'
+    assert verificacoes['banco_default']['status'] == 'ok'
+    assert verificacoes['banco_default']['latencia_ms'] >= 0
+    assert (verificacoes['migracao'], verificacoes['cache']['backend']) == ({'status': 'ok'}, 'memoria')
+
+
+def test_banco_acima_do_orcamento_deixa_indisponivel_ate_expirar(app, client):
+    app.config.update(HEALTH_ORCAMENTO_MS=0, HEALTH_CACHE_SEGUNDOS=60)
+
+    resposta = client.get('/health/ready')
+    assert resposta.status_code == 503
+    assert resposta.get_json()['verificacoes']['banco_default']['status'] == 'lento'
+
+    # Dentro de HEALTH_CACHE_SEGUNDOS o resultado é reaproveitado, mesmo com o orçamento corrigido
+    app.config['HEALTH_ORCAMENTO_MS'] = 500
+    assert client.get('/health/ready').status_code == 503
+
+    saude._cache['expira_em'] = 0
+    assert client.get('/health/ready').status_code == 200
+
+
+def test_coluna_sem_migracao_deixa_indisponivel(app, client):
+    with app.app_context():
+        # Banco anterior à coluna, sem o init-db
+        db.session.execute(text("ALTER TABLE movimentacoes_estoque DROP COLUMN registrado_em"))
+        db.session.commit()
+
+    resposta = client.get('/health/ready')
+    assert resposta.status_code == 503
+    assert resposta.get_json()['verificacoes']['migracao'] == {
+        'status': 'pendente', 'pendentes': ['movimentacoes_estoque.registrado_em']
+    }
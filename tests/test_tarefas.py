@@ -0,0 +1,123 @@
+import time
+from datetime import datetime, timedelta
+
+from backend import db, worker
+from backend.models.auth_models import Usuario
+from backend.models.fechamento_models import CustoMedio
+from backend.models.nfe_models import Insumo
+from backend.models.tarefas_models import Tarefa
+from backend.services.tarefas_service import (
+    executar_tarefa, recuperar_tarefas_abandonadas, registrar_batimento, reservar_tarefa
+)
+
+
+def _criar_custos(app):
+    with app.app_context():
+        arroz = Insumo(nome='Arroz', unidade_medida='kg')
+        db.session.add(arroz)
+        db.session.flush()
+        for mes, custo in ((2, 5), (3, 7)):
+            db.session.add(CustoMedio(insumo_id=arroz.id, mes=mes, ano=2026, quantidade_total=10,
+                                      valor_total=10 * custo, custo_medio=custo))
+        db.session.commit()
+        return arroz.id
+
+
+def test_tarefa_grava_parametros_e_resultado_como_json(app, client):
+    arroz_id = _criar_custos(app)
+
+    resposta = client.post('/api/jobs', json={
+        'tipo': 'relatorio_custo_medio', 'parametros': {'insumo_id': arroz_id, 'ano': 2026}
+    })
+    assert resposta.status_code == 202
+    tarefa_id = resposta.get_json()['id']
+
+    with app.app_context():
+        tarefa = reservar_tarefa('teste/0')
+        assert tarefa.id == tarefa_id
+        # A coluna devolve o dicionário, sem json.loads
+        assert tarefa.parametros == {'insumo_id': arroz_id, 'ano': 2026}
+        assert executar_tarefa(tarefa.id).status == 'concluida'
+
+    dados = client.get(f'/api/jobs/{tarefa_id}').get_json()
+    assert (dados['status'], dados['progresso']) == ('concluida', 100)
+    assert dados['resultado']['media_anual'] == 6.0
+
+
+def test_linhas_gravadas_como_texto_continuam_legiveis(app):
+    # No SQLite, o JSON serializado das versões anteriores é lido pela coluna JSON sem conversão
+    with app.app_context():
+        db.session.execute(db.text(
+            "INSERT INTO tarefas (tipo, parametros, status, progresso, resultado, tentativas) "
+            "VALUES ('analise', '{\"insumo_id\": 1}', 'concluida', 100, '{\"total\": 2.5}', 1)"
+        ))
+        db.session.commit()
+
+        tarefa = Tarefa.query.one()
+        assert (tarefa.to_dict()['parametros'], tarefa.to_dict()['resultado']) == ({'insumo_id': 1}, {'total': 2.5})
+
+
+def _tarefa_em_execucao(app, atualizado_ha, worker='teste/0'):
+    with app.app_context():
+        agora = datetime.now()
+        tarefa = Tarefa(tipo='analise', parametros={}, status='executando', worker=worker, tentativas=1,
+                        iniciado_em=agora - timedelta(hours=2), atualizado_em=agora - atualizado_ha)
+        db.session.add(tarefa)
+        db.session.commit()
+        return tarefa.id
+
+
+def test_recuperacao_considera_o_ultimo_batimento(app):
+    # Ambas começaram há duas horas; só a que parou de sinalizar volta para a fila
+    ativa_id = _tarefa_em_execucao(app, timedelta(seconds=10))
+    parada_id = _tarefa_em_execucao(app, timedelta(minutes=10), worker='teste/1')
+
+    with app.app_context():
+        assert recuperar_tarefas_abandonadas(timeout=300, max_tentativas=3) == (1, 0)
+        assert db.session.get(Tarefa, ativa_id).status == 'executando'
+        assert db.session.get(Tarefa, parada_id).status == 'pendente'
+
+
+def test_batimento_renova_apenas_a_tarefa_do_worker(app):
+    tarefa_id = _tarefa_em_execucao(app, timedelta(minutes=10))
+
+    with app.app_context():
+        assert not registrar_batimento(tarefa_id, 'outro/0')
+        assert registrar_batimento(tarefa_id, 'teste/0')
+        assert recuperar_tarefas_abandonadas(timeout=300, max_tentativas=3) == (0, 0)
+
+
+def test_worker_sinaliza_enquanto_a_tarefa_executa(app, monkeypatch):
+    tarefa_id = _tarefa_em_execucao(app, timedelta(minutes=10))
+    app.config['TAREFAS_BATIMENTO'] = 0.05
+
+    def executar_devagar(tarefa_id):
+        time.sleep(0.3)
+        return db.session.get(Tarefa, tarefa_id)
+
+    monkeypatch.setattr(worker, 'executar_tarefa', executar_devagar)
+    with app.app_context():
+        worker._executar_com_batimento(app, db.session.get(Tarefa, tarefa_id), 'teste/0')
+        db.session.expire_all()
+        assert datetime.now() - db.session.get(Tarefa, tarefa_id).atualizado_em < timedelta(seconds=1)
+
+
+def test_tarefa_criada_com_token_registra_o_usuario(app, client):
+    with app.app_context():
+        usuario = Usuario(nome='Ana', email='ana@teste.com', nivel_acesso='admin', ativo=True)
+        usuario.set_password('segredo123')
+        db.session.add(usuario)
+        db.session.commit()
+        usuario_id = usuario.id
+
+    acesso = client.post('/api/auth/login', json={'email': 'ana@teste.com', 'senha': 'segredo123'}).get_json()['access_token']
+    com_token = client.post('/api/jobs', json={'tipo': 'analise'}, headers={'Authorization': f'Bearer {acesso}'})
+    sem_token = client.post('/api/jobs', json={'tipo': 'analise'})
+    assert (com_token.status_code, sem_token.status_code) == (202, 202)
+
+    with app.app_context():
+        assert db.session.get(Tarefa, com_token.get_json()['id']).usuario_id == usuario_id
+        assert db.session.get(Tarefa, sem_token.get_json()['id']).usuario_id is None
+
+    invalido = client.post('/api/jobs', json={'tipo': 'analise'}, headers={'Authorization': 'Bearer x.y.z'})
+    assert invalido.status_code == 401